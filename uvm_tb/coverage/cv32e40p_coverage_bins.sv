@@ -0,0 +1,98 @@
+// CV32E40P Coverage Bins
+// Per-bin hit counts of the coverage models, dumped for merging across runs
+
+`ifndef CV32E40P_COVERAGE_BINS_SV
+`define CV32E40P_COVERAGE_BINS_SV
+
+import uvm_pkg::*;
+`include "uvm_macros.svh"
+
+// get_inst_coverage() only reports a percentage per covergroup, which cannot be
+// merged across runs. The models therefore mirror their bins here as counters
+// named "<group>.<coverpoint or cross>.<bin>" and dump them at the end of the
+// run, one "<bin> <hits>" line per bin. Crosses with named bins export those;
+// crosses without export their automatic bins minus the ignore_bins.
+class cv32e40p_coverage_bins;
+
+  // Default dump file when +COVERAGE_BINS=<file> is not given
+  static string DEFAULT_FILE = "coverage.bins";
+  // First line of the dump, versioning the format
+  static string FORMAT_HEADER = "# cv32e40p coverage bins v1";
+
+  // Bin names of the shared coverpoints, indexed by sampled value
+  static string INSTR_TYPE_BINS[14] = '{
+    "alu_ops", "mul_ops", "div_ops", "load_ops", "store_ops", "branch_ops", "jump_ops",
+    "csr_ops", "pulp_alu_ops", "pulp_mul_ops", "pulp_simd_ops", "pulp_hwloop_ops",
+    "pulp_postinc_ops", "fpu_ops"
+  };
+  static string REG_BINS[10] = '{
+    "zero_reg", "ra_reg", "sp_reg", "gp_reg", "tp_reg", "temp_regs", "saved_regs",
+    "arg_regs", "saved_regs2", "temp_regs2"
+  };
+  static string ALU_OP_BINS[5] = '{"add_sub", "logical", "shifts", "compare", "immediate"};
+
+  int unsigned hits[string];
+
+  // Register a bin so it is dumped even when never hit
+  function void declare(string name);
+    if (!hits.exists(name)) hits[name] = 0;
+  endfunction
+
+  function void hit(string name);
+    if (!hits.exists(name))
+      `uvm_warning("COVERAGE_BINS", $sformatf("Hit on undeclared bin %s", name))
+    hits[name]++;
+  endfunction
+
+  // Bin of an instruction type, "" outside the first `count` types
+  static function string instr_type_bin(int itype, int count = 14);
+    return (itype >= 0 && itype < count) ? INSTR_TYPE_BINS[itype] : "";
+  endfunction
+
+  static function string reg_bin(bit [4:0] r);
+    if (r < 5) return REG_BINS[r];
+    if (r < 8) return "temp_regs";
+    if (r < 10) return "saved_regs";
+    if (r < 18) return "arg_regs";
+    if (r < 28) return "saved_regs2";
+    return "temp_regs2";
+  endfunction
+
+  static function string alu_op_bin(int op);
+    if (op < 0 || op > 16) return "";
+    if (op < 2) return "add_sub";
+    if (op < 5) return "logical";
+    if (op < 8) return "shifts";
+    if (op < 10) return "compare";
+    return "immediate";
+  endfunction
+
+  // Declare the first `count` instruction type bins of a coverpoint
+  function void declare_instr_types(string prefix, int count = 14);
+    for (int i = 0; i < count; i++) declare({prefix, ".", INSTR_TYPE_BINS[i]});
+  endfunction
+
+  function void declare_registers(string prefix);
+    foreach (REG_BINS[i]) declare({prefix, ".", REG_BINS[i]});
+  endfunction
+
+  // Write the counters to +COVERAGE_BINS=<file>, or DEFAULT_FILE
+  function void dump();
+    string filename;
+    int fd;
+
+    if (!$value$plusargs("COVERAGE_BINS=%s", filename)) filename = DEFAULT_FILE;
+    fd = $fopen(filename, "w");
+    if (fd == 0) begin
+      `uvm_warning("COVERAGE_BINS", $sformatf("Cannot write coverage bins to %s", filename))
+      return;
+    end
+    $fdisplay(fd, FORMAT_HEADER);
+    foreach (hits[name]) $fdisplay(fd, "%s %0d", name, hits[name]);
+    $fclose(fd);
+    `uvm_info("COVERAGE_BINS", $sformatf("Wrote %0d coverage bins to %s", hits.num(), filename), UVM_LOW)
+  endfunction
+
+endclass
+
+`endif // CV32E40P_COVERAGE_BINS_SV
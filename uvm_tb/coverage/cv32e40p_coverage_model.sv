@@ -6,6 +6,7 @@
 
 import uvm_pkg::*;
 `include "uvm_macros.svh"
+`include "cv32e40p_coverage_bins.sv"
 
 // Forward declaration - actual item will be included by environment
 typedef class cv32e40p_enhanced_instruction_item;
@@ -273,6 +274,22 @@ class cv32e40p_coverage_model extends uvm_subscriber #(cv32e40p_enhanced_instruc
   int instruction_count;
   int coverage_hits[string];
   real coverage_percentages[string];
+  cv32e40p_coverage_bins bin_counts;
+
+  // Bin names of the coverpoints counted in count_bins()
+  static string IMM_VALUE_BINS[8] = '{
+    "zero", "small_pos", "medium_pos", "large_pos", "small_neg", "medium_neg", "large_neg", "corner_cases"
+  };
+  static string BRANCH_OP_BINS[6] = '{"beq", "bne", "blt", "bge", "bltu", "bgeu"};
+  static string MEM_OP_BINS[8] = '{
+    "load_byte", "load_byte", "load_half", "load_half", "load_word", "store_byte", "store_half", "store_word"
+  };
+  static string HAZARD_DISTANCE_BINS[4] = '{"immediate", "one_cycle", "two_cycle", "resolved"};
+  static string CYCLE_COUNT_BINS[5] = '{
+    "single_cycle", "multi_cycle_2", "multi_cycle_3_5", "high_latency", "very_high_latency"
+  };
+  // INSTR_TYPE values left in IMM_INSTR_CROSS by its ignore_bins
+  static int IMM_CROSS_TYPES[4] = '{0, 3, 4, 7};
 
   function new(string name = "cv32e40p_coverage_model", uvm_component parent = null);
     super.new(name, parent);
@@ -289,6 +306,168 @@ class cv32e40p_coverage_model extends uvm_subscriber #(cv32e40p_enhanced_instruc
     performance_scenarios_cg = new();
     
     instruction_count = 0;
+    declare_bins();
+  endfunction
+
+  // Register every bin of the covergroups above with the bin counters
+  function void declare_bins();
+    bin_counts = new();
+    bin_counts.declare_instr_types("instruction_type.INSTR_TYPE");
+    foreach (cv32e40p_coverage_bins::ALU_OP_BINS[i])
+      bin_counts.declare({"alu_operations.ALU_OP.", cv32e40p_coverage_bins::ALU_OP_BINS[i]});
+    bin_counts.declare_registers("register_usage.RS1_REG");
+    bin_counts.declare_registers("register_usage.RS2_REG");
+    bin_counts.declare_registers("register_usage.RD_REG");
+    bin_counts.declare("register_usage.REG_DEPENDENCY.raw_hazard");
+    
+    bin_counts.declare_instr_types("immediate_values.INSTR_TYPE", 8);
+    foreach (IMM_VALUE_BINS[i]) begin
+      bin_counts.declare({"immediate_values.IMM_VALUE.", IMM_VALUE_BINS[i]});
+      foreach (IMM_CROSS_TYPES[j])
+        bin_counts.declare({"immediate_values.IMM_INSTR_CROSS.", IMM_VALUE_BINS[i], ".",
+                            cv32e40p_coverage_bins::instr_type_bin(IMM_CROSS_TYPES[j])});
+    end
+    
+    foreach (BRANCH_OP_BINS[i]) begin
+      bin_counts.declare({"branch_conditions.BRANCH_OP.", BRANCH_OP_BINS[i]});
+      bin_counts.declare({"branch_conditions.BRANCH_BEHAVIOR.", BRANCH_OP_BINS[i], ".taken"});
+      bin_counts.declare({"branch_conditions.BRANCH_BEHAVIOR.", BRANCH_OP_BINS[i], ".not_taken"});
+    end
+    bin_counts.declare("branch_conditions.BRANCH_TAKEN.taken");
+    bin_counts.declare("branch_conditions.BRANCH_TAKEN.not_taken");
+    
+    for (int op = 0; op < 8; op++) begin
+      bin_counts.declare({"memory_access.MEM_OP.", MEM_OP_BINS[op]});
+      for (int align = 0; align < 4; align++) begin
+        if (!ignored_mem_align(op, align))
+          bin_counts.declare($sformatf("memory_access.MEM_ALIGN_CROSS.%s.aligned_%0d", MEM_OP_BINS[op], align));
+      end
+    end
+    for (int align = 0; align < 4; align++)
+      bin_counts.declare($sformatf("memory_access.ADDR_ALIGN.aligned_%0d", align));
+    
+    bin_counts.declare("corner_cases.CORNER_CASE.enabled");
+    bin_counts.declare("corner_cases.CORNER_CASE.disabled");
+    bin_counts.declare_instr_types("corner_cases.INSTR_TYPE", 8);
+    bin_counts.declare("corner_cases.CORNER_INSTR_CROSS.corner_alu");
+    bin_counts.declare("corner_cases.CORNER_INSTR_CROSS.corner_div");
+    bin_counts.declare("corner_cases.CORNER_INSTR_CROSS.corner_mem");
+    
+    foreach (HAZARD_DISTANCE_BINS[i])
+      bin_counts.declare({"hazard_scenarios.HAZARD_DISTANCE.", HAZARD_DISTANCE_BINS[i]});
+    bin_counts.declare("hazard_scenarios.RAW_HAZARD_RS1.hazard_present");
+    bin_counts.declare("hazard_scenarios.RAW_HAZARD_RS1.no_hazard");
+    bin_counts.declare("hazard_scenarios.RAW_HAZARD_RS2.hazard_present");
+    bin_counts.declare("hazard_scenarios.RAW_HAZARD_RS2.no_hazard");
+    bin_counts.declare("hazard_scenarios.HAZARD_DISTANCE_CROSS.immediate_raw_rs1");
+    bin_counts.declare("hazard_scenarios.HAZARD_DISTANCE_CROSS.delayed_raw_rs1");
+    
+    bin_counts.declare_instr_types("performance_scenarios.INSTR_TYPE", 8);
+    foreach (CYCLE_COUNT_BINS[i])
+      bin_counts.declare({"performance_scenarios.CYCLE_COUNT.", CYCLE_COUNT_BINS[i]});
+    bin_counts.declare("performance_scenarios.PERF_CROSS.fast_alu");
+    bin_counts.declare("performance_scenarios.PERF_CROSS.slow_div");
+    bin_counts.declare("performance_scenarios.PERF_CROSS.mem_access");
+  endfunction
+
+  // MEM_ALIGN_CROSS ignore_bins
+  static function bit ignored_mem_align(int op, int align);
+    return (op inside {2, 3} && align inside {1, 3}) || (op == 4 && align != 0);
+  endfunction
+
+  // IMM_VALUE bins of an immediate; the ranges overlap at their ends, so several can hit
+  static function void immediate_bins(bit [31:0] imm, ref string names[$]);
+    names.delete();
+    if (imm == 0) names.push_back("zero");
+    if (imm inside {[1:15]}) names.push_back("small_pos");
+    if (imm inside {[16:2047]}) names.push_back("medium_pos");
+    if (imm inside {[2048:32'h7FFFFFFF]}) names.push_back("large_pos");
+    if (imm inside {[32'hFFFFFFF0:32'hFFFFFFFF]}) names.push_back("small_neg");
+    if (imm inside {[32'hFFFFF800:32'hFFFFFFF0]}) names.push_back("medium_neg");
+    if (imm inside {[32'h80000000:32'hFFFFF800]}) names.push_back("large_neg");
+    if (imm inside {32'h7FFFFFFF, 32'h80000000, 32'hFFFFFFFF}) names.push_back("corner_cases");
+  endfunction
+
+  static function string cycle_count_bin(int cycles);
+    if (cycles == 1) return "single_cycle";
+    if (cycles == 2) return "multi_cycle_2";
+    if (cycles inside {[3:5]}) return "multi_cycle_3_5";
+    if (cycles inside {[6:32]}) return "high_latency";
+    if (cycles inside {[33:100]}) return "very_high_latency";
+    return "";
+  endfunction
+
+  // Count the bins the samples of write() hit
+  function void count_bins(cv32e40p_enhanced_instruction_item t);
+    int itype = int'(t.instr_type);
+    string type_bin = cv32e40p_coverage_bins::instr_type_bin(itype, 8);
+    string imm_bins[$];
+    string name;
+    bit rs1_hazard, rs2_hazard;
+    int distance = 1; // As sampled in write()
+    
+    name = cv32e40p_coverage_bins::instr_type_bin(itype);
+    if (name != "") bin_counts.hit({"instruction_type.INSTR_TYPE.", name});
+    
+    name = cv32e40p_coverage_bins::alu_op_bin(int'(t.alu_op));
+    if (itype == 0 && name != "") bin_counts.hit({"alu_operations.ALU_OP.", name});
+    
+    bin_counts.hit({"register_usage.RS1_REG.", cv32e40p_coverage_bins::reg_bin(t.rs1)});
+    bin_counts.hit({"register_usage.RS2_REG.", cv32e40p_coverage_bins::reg_bin(t.rs2)});
+    bin_counts.hit({"register_usage.RD_REG.", cv32e40p_coverage_bins::reg_bin(t.rd)});
+    if (t.rs1 != 0 && t.rd != 0) bin_counts.hit("register_usage.REG_DEPENDENCY.raw_hazard");
+    
+    immediate_bins(t.immediate, imm_bins);
+    foreach (imm_bins[i]) begin
+      bin_counts.hit({"immediate_values.IMM_VALUE.", imm_bins[i]});
+      if (itype inside {IMM_CROSS_TYPES})
+        bin_counts.hit({"immediate_values.IMM_INSTR_CROSS.", imm_bins[i], ".", type_bin});
+    end
+    if (type_bin != "") bin_counts.hit({"immediate_values.INSTR_TYPE.", type_bin});
+    
+    if (itype == 5 && int'(t.branch_op) inside {[0:5]}) begin // INSTR_BRANCH
+      name = t.branch_taken ? "taken" : "not_taken";
+      bin_counts.hit({"branch_conditions.BRANCH_OP.", BRANCH_OP_BINS[int'(t.branch_op)]});
+      bin_counts.hit({"branch_conditions.BRANCH_TAKEN.", name});
+      bin_counts.hit({"branch_conditions.BRANCH_BEHAVIOR.", BRANCH_OP_BINS[int'(t.branch_op)], ".", name});
+    end
+    
+    if (itype == 3 || itype == 4) begin // INSTR_LOAD || INSTR_STORE
+      bin_counts.hit($sformatf("memory_access.ADDR_ALIGN.aligned_%0d", t.address[1:0]));
+      if (int'(t.mem_op) inside {[0:7]}) begin
+        bin_counts.hit({"memory_access.MEM_OP.", MEM_OP_BINS[int'(t.mem_op)]});
+        if (!ignored_mem_align(int'(t.mem_op), t.address[1:0]))
+          bin_counts.hit($sformatf("memory_access.MEM_ALIGN_CROSS.%s.aligned_%0d",
+                                   MEM_OP_BINS[int'(t.mem_op)], t.address[1:0]));
+      end
+    end
+    
+    bin_counts.hit(t.enable_corner_case ? "corner_cases.CORNER_CASE.enabled" : "corner_cases.CORNER_CASE.disabled");
+    if (type_bin != "") bin_counts.hit({"corner_cases.INSTR_TYPE.", type_bin});
+    if (t.enable_corner_case) begin
+      if (itype == 0) bin_counts.hit("corner_cases.CORNER_INSTR_CROSS.corner_alu");
+      if (itype == 2) bin_counts.hit("corner_cases.CORNER_INSTR_CROSS.corner_div");
+      if (itype inside {3, 4}) bin_counts.hit("corner_cases.CORNER_INSTR_CROSS.corner_mem");
+    end
+    
+    if (instruction_count > 1) begin
+      rs1_hazard = (t.rd == t.rs1 && t.rd != 0);
+      rs2_hazard = (t.rd == t.rs2 && t.rd != 0);
+      bin_counts.hit({"hazard_scenarios.HAZARD_DISTANCE.", HAZARD_DISTANCE_BINS[distance - 1]});
+      bin_counts.hit(rs1_hazard ? "hazard_scenarios.RAW_HAZARD_RS1.hazard_present" : "hazard_scenarios.RAW_HAZARD_RS1.no_hazard");
+      bin_counts.hit(rs2_hazard ? "hazard_scenarios.RAW_HAZARD_RS2.hazard_present" : "hazard_scenarios.RAW_HAZARD_RS2.no_hazard");
+      if (rs1_hazard && distance == 1) bin_counts.hit("hazard_scenarios.HAZARD_DISTANCE_CROSS.immediate_raw_rs1");
+      if (rs1_hazard && distance == 2) bin_counts.hit("hazard_scenarios.HAZARD_DISTANCE_CROSS.delayed_raw_rs1");
+    end
+    
+    name = cycle_count_bin(t.estimated_cycles);
+    if (type_bin != "") bin_counts.hit({"performance_scenarios.INSTR_TYPE.", type_bin});
+    if (name != "") begin
+      bin_counts.hit({"performance_scenarios.CYCLE_COUNT.", name});
+      if (itype == 0 && name == "single_cycle") bin_counts.hit("performance_scenarios.PERF_CROSS.fast_alu");
+      if (itype == 2 && name == "high_latency") bin_counts.hit("performance_scenarios.PERF_CROSS.slow_div");
+      if (itype inside {3, 4} && name == "multi_cycle_2") bin_counts.hit("performance_scenarios.PERF_CROSS.mem_access");
+    end
   endfunction
 
   function void write(cv32e40p_enhanced_instruction_item t);
@@ -320,6 +499,7 @@ class cv32e40p_coverage_model extends uvm_subscriber #(cv32e40p_enhanced_instruc
     end
     
     performance_scenarios_cg.sample(int'(t.instr_type), t.estimated_cycles);
+    count_bins(t);
   endfunction
 
   function void report_coverage();
@@ -358,6 +538,7 @@ class cv32e40p_coverage_model extends uvm_subscriber #(cv32e40p_enhanced_instruc
   function void final_phase(uvm_phase phase);
     super.final_phase(phase);
     report_coverage();
+    bin_counts.dump();
   endfunction
 
 endclass
@@ -6,6 +6,7 @@
 
 import uvm_pkg::*;
 `include "uvm_macros.svh"
+`include "cv32e40p_coverage_bins.sv"
 
 class cv32e40p_simple_coverage_model extends uvm_component;
   `uvm_component_utils(cv32e40p_simple_coverage_model)
@@ -101,6 +102,7 @@ class cv32e40p_simple_coverage_model extends uvm_component;
   int instruction_count;
   int coverage_hits[string];
   real coverage_percentages[string];
+  cv32e40p_coverage_bins bin_counts;
   
   // Sample variables
   int instr_type_sample;
@@ -116,18 +118,32 @@ class cv32e40p_simple_coverage_model extends uvm_component;
     register_usage_cg = new();
     
     instruction_count = 0;
+    
+    // Bin counters mirroring the covergroups above
+    bin_counts = new();
+    bin_counts.declare_instr_types("instruction_type.INSTR_TYPE");
+    foreach (cv32e40p_coverage_bins::ALU_OP_BINS[i])
+      bin_counts.declare({"alu_operations.ALU_OP.", cv32e40p_coverage_bins::ALU_OP_BINS[i]});
+    bin_counts.declare_registers("register_usage.RS1_REG");
+    bin_counts.declare_registers("register_usage.RS2_REG");
+    bin_counts.declare_registers("register_usage.RD_REG");
+    bin_counts.declare("register_usage.REG_DEPENDENCY.raw_hazard");
   endfunction
 
   // Manual sampling functions
   function void sample_instruction_type(int itype);
     instr_type_sample = itype;
     instruction_type_cg.sample();
+    if (cv32e40p_coverage_bins::instr_type_bin(itype) != "")
+      bin_counts.hit({"instruction_type.INSTR_TYPE.", cv32e40p_coverage_bins::instr_type_bin(itype)});
     instruction_count++;
   endfunction
   
   function void sample_alu_operation(int alu_op);
     alu_op_sample = alu_op;
     alu_operations_cg.sample();
+    if (cv32e40p_coverage_bins::alu_op_bin(alu_op) != "")
+      bin_counts.hit({"alu_operations.ALU_OP.", cv32e40p_coverage_bins::alu_op_bin(alu_op)});
   endfunction
   
   function void sample_register_usage(bit [4:0] rs1, bit [4:0] rs2, bit [4:0] rd);
@@ -135,6 +151,10 @@ class cv32e40p_simple_coverage_model extends uvm_component;
     rs2_sample = rs2;
     rd_sample = rd;
     register_usage_cg.sample();
+    bin_counts.hit({"register_usage.RS1_REG.", cv32e40p_coverage_bins::reg_bin(rs1)});
+    bin_counts.hit({"register_usage.RS2_REG.", cv32e40p_coverage_bins::reg_bin(rs2)});
+    bin_counts.hit({"register_usage.RD_REG.", cv32e40p_coverage_bins::reg_bin(rd)});
+    if (rs1 != 0 && rd != 0) bin_counts.hit("register_usage.REG_DEPENDENCY.raw_hazard");
   endfunction
 
   function void report_coverage();
@@ -167,6 +187,7 @@ class cv32e40p_simple_coverage_model extends uvm_component;
   function void final_phase(uvm_phase phase);
     super.final_phase(phase);
     report_coverage();
+    bin_counts.dump();
   endfunction
 
 endclass
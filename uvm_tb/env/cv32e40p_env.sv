@@ -55,6 +55,27 @@ class cv32e40p_env extends uvm_env;
     end
   endfunction
 
+  // Post-reset checkpoint: returns once reset is over and the driver is ready.
+  // With +CHECKPOINT the simulation stops here so the runner can save it; a run
+  // restored from that save reseeds the calling thread from +RESTORE_SEED and
+  // rereads the stimulus plusargs before any stimulus is generated. Without
+  // either plusarg it returns at once, so ordinary runs start as before.
+  task wait_for_checkpoint();
+    int unsigned seed;
+    if (!$test$plusargs("CHECKPOINT") && !$test$plusargs("RESTORE_SEED")) return;
+    @(posedge agent.monitor.vif.rst_ni);
+    repeat(5) @(posedge agent.monitor.vif.clk_i);
+    if ($test$plusargs("CHECKPOINT")) begin
+      `uvm_info("ENV", "Reached post-reset checkpoint", UVM_LOW)
+      $stop;
+    end
+    if ($value$plusargs("RESTORE_SEED=%d", seed)) begin
+      process::self().srandom(seed);
+      cfg.load_from_env();
+      `uvm_info("ENV", $sformatf("Restored from post-reset checkpoint with seed %0d", seed), UVM_LOW)
+    end
+  endtask
+
 endclass
 
 // Scoreboard for checking ALU operations
@@ -6,17 +6,51 @@ Analyzes functional coverage results from UVM testbench runs
 
 import argparse
 import json
+import mmap
 import re
+import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple
-import matplotlib.pyplot as plt
-import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from parse_cache import DEFAULT_CACHE_MB, PARSE_CACHE, CV32E40PParseCache, parse_logs
+from results_db import RESULTS_DB, CV32E40PResultsDatabase
+
+try:
+    import numpy as np
+    from coverage_merge import BINS_SUFFIX, CV32E40PCoverageMerger, bins_file, write_bins
+except ImportError:  # NumPy is only required to merge and rank the per-bin coverage dumps
+    np = None
+
+# Parse cache entries of other versions are discarded; bump when parse_uvm_log's output changes
+PARSER_NAME = 'coverage'
+PARSER_VERSION = 1
+
+# Covergroups reported by the coverage model as "<category> Coverage: <percent>%"
+COVERAGE_CATEGORIES = (
+    'instruction_type', 'alu_operations', 'register_usage', 'immediate_values', 'branch_conditions',
+    'memory_access', 'corner_cases', 'hazard_scenarios', 'performance_scenarios',
+)
+
+# Every value parse_uvm_log extracts, as one pattern applied to the lines holding an anchor
+COVERAGE_LINE_RE = re.compile(
+    rb'(?P<category>' + b'|'.join(c.encode() for c in COVERAGE_CATEGORIES) + rb') Coverage: (?P<percent>[\d.]+)%'
+    rb'|Overall Functional Coverage: (?P<overall>[\d.]+)%'
+    rb'|Total Instructions Processed: (?P<instructions>\d+)')
+# Fixed text each value follows; finding these is far cheaper than trying the pattern at every offset
+VALUE_ANCHORS = (b' Coverage: ', b'Total Instructions Processed: ')
+
+# The coverage model's report_phase block, printed once near the end of the log
+REPORT_START = b'=== COVERAGE REPORT ==='
+REPORT_END = b'=== END COVERAGE REPORT ==='
 
 class CoverageAnalyzer:
     def __init__(self):
         self.coverage_data = {}
         self.test_results = {}
+        self.log_files = {}
+        # Bin-level coverage of the runs that dumped their bins, set by merge_bins()
+        self.merger = None
         
     def parse_uvm_log(self, log_file: str) -> Dict:
         """Parse UVM log file to extract coverage information"""
@@ -35,48 +69,155 @@ class CoverageAnalyzer:
         }
         
         try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-                
-            # Extract coverage percentages
-            coverage_patterns = {
-                'instruction_type': r'instruction_type Coverage: ([\d.]+)%',
-                'alu_operations': r'alu_operations Coverage: ([\d.]+)%',
-                'register_usage': r'register_usage Coverage: ([\d.]+)%',
-                'immediate_values': r'immediate_values Coverage: ([\d.]+)%',
-                'branch_conditions': r'branch_conditions Coverage: ([\d.]+)%',
-                'memory_access': r'memory_access Coverage: ([\d.]+)%',
-                'corner_cases': r'corner_cases Coverage: ([\d.]+)%',
-                'hazard_scenarios': r'hazard_scenarios Coverage: ([\d.]+)%',
-                'performance_scenarios': r'performance_scenarios Coverage: ([\d.]+)%',
-            }
-            
-            for category, pattern in coverage_patterns.items():
-                match = re.search(pattern, content)
-                if match:
-                    coverage_info[category] = float(match.group(1))
-                    
-            # Extract overall coverage
-            overall_match = re.search(r'Overall Functional Coverage: ([\d.]+)%', content)
-            if overall_match:
-                coverage_info['overall_coverage'] = float(overall_match.group(1))
-                
-            # Extract instruction count
-            instr_match = re.search(r'Total Instructions Processed: (\d+)', content)
-            if instr_match:
-                coverage_info['total_instructions'] = int(instr_match.group(1))
-                
+            with open(log_file, 'rb') as f:
+                # mmap keeps memory flat for multi-gigabyte logs; an empty file cannot be mapped
+                if f.seek(0, 2) == 0:
+                    return coverage_info
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    self._parse_coverage_report(content, coverage_info)
         except FileNotFoundError:
             print(f"Warning: Log file {log_file} not found")
             
         return coverage_info
     
+    def _parse_coverage_report(self, content: mmap.mmap, coverage_info: Dict):
+        """Fill coverage_info from the last coverage report block of a mapped log.
+        
+        The block is located by searching back from the end, so only the
+        report itself is scanned. Logs without a complete block (a run cut
+        short) are searched from the start instead, stopping once every
+        value has been found; the first occurrence of each value is kept.
+        """
+        end = content.rfind(REPORT_END)
+        start = content.rfind(REPORT_START, 0, end) if end >= 0 else -1
+        if start < 0:
+            start, end = 0, len(content)
+        wanted = len(COVERAGE_CATEGORIES) + 2
+        found = set()
+        for anchor in VALUE_ANCHORS:
+            pos = content.find(anchor, start, end)
+            while pos >= 0 and len(found) < wanted:
+                line_start = content.rfind(b'\n', start, pos) + 1
+                line_end = content.find(b'\n', pos, end)
+                if line_end < 0:
+                    line_end = end
+                match = COVERAGE_LINE_RE.search(content, line_start, line_end)
+                if match:
+                    key = match.lastgroup
+                    if key == 'percent':
+                        key = match.group('category').decode()
+                    if key not in found:
+                        found.add(key)
+                        value = match.group(match.lastindex)
+                        if key == 'instructions':
+                            coverage_info['total_instructions'] = int(value)
+                        elif key == 'overall':
+                            coverage_info['overall_coverage'] = float(value)
+                        else:
+                            coverage_info[key] = float(value)
+                pos = content.find(anchor, line_end, end)
+    
+    def analyze_logs(self, log_files: Dict[str, str], jobs: int = 1, cache: CV32E40PParseCache = None):
+        """Analyze coverage of many tests, parsing their logs in `jobs` processes.
+        
+        Logs unchanged since they were cached are not parsed again. Results
+        are merged in log_files order, so the analysis matches a serial one
+        whatever order the workers finish in.
+        """
+        parsed = parse_logs(log_files, parse_uvm_log, jobs, cache)
+        for (test_name, log_file), coverage_data in zip(log_files.items(), parsed.values()):
+            print(f"Analyzing coverage for test: {test_name}")
+            self.coverage_data[test_name] = coverage_data
+            self.log_files[test_name] = log_file
+    
+    def merge_bins(self) -> Optional['CV32E40PCoverageMerger']:
+        """Load the bin dump beside each analyzed log for merged coverage across runs; None without NumPy"""
+        if np is None:
+            return None
+        merger = CV32E40PCoverageMerger()
+        for test_name, log_file in self.log_files.items():
+            path = bins_file(log_file)
+            if path.exists():
+                merger.add_bins_file(test_name, path)
+        self.merger = merger if merger.runs else None
+        return merger
+    
+    def run_metrics(self, test_name: str) -> Dict:
+        """Test, seed, simulation wall seconds and outcome of an analyzed run.
+        
+        They come from the metrics run_test.py writes beside each log; a
+        log without them is taken to have passed, its seed read from the
+        log name and its cost left unknown. None when there is no seed.
+        """
+        log_file = Path(self.log_files[test_name])
+        try:
+            with open(log_file.with_suffix('.metrics.json'), 'r') as f:
+                metrics = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            metrics = None
+        if metrics is not None and metrics.get('seed') is not None:
+            return {'test': metrics['test'], 'seed': metrics['seed'],
+                    'seconds': metrics['simulate']['wall_seconds'],
+                    'passed': metrics['returncode'] == 0 and not metrics['killed']}
+        test, _, seed = log_file.stem.rpartition('_')
+        if not test or not seed.isdigit():
+            return None
+        return {'test': test, 'seed': int(seed), 'seconds': None, 'passed': True}
+    
+    def rank_runs(self, run_list: Path) -> List[Dict]:
+        """Write the cheapest passing runs that keep the merged coverage of all of them as a run list.
+        
+        Runs are picked by greedy weighted set cover over their hit bins,
+        costed by simulation wall time; runs with no recorded time cost the
+        mean of the others. Returns the kept runs in pick order.
+        """
+        merger = self.merger
+        runs = [self.run_metrics(name) for name in merger.runs]
+        usable = [row for row, run in enumerate(runs) if run is not None and run['passed']]
+        known = [runs[row]['seconds'] for row in usable if runs[row]['seconds'] is not None]
+        default = float(np.mean(known)) if known else 1.0
+        costs = np.array([default if run is None or run['seconds'] is None else run['seconds'] for run in runs])
+        chosen = merger.greedy_cover(costs, usable)
+        
+        print("\nCOVERAGE-RANKED RUN LIST")
+        print("-" * 40)
+        print(f"  {'Rank':>4s}  {'Test':40s} {'Seed':>10s} {'Wall':>8s} {'New bins':>9s} {'Merged':>8s}")
+        covered = np.zeros(len(merger.bin_names), dtype=bool)
+        kept = []
+        for rank, row in enumerate(chosen, 1):
+            hits = merger.counts[row] > 0
+            new_bins = int(np.count_nonzero(hits & ~covered))
+            covered |= hits
+            run = dict(runs[row], run=merger.runs[row], seconds=float(costs[row]), new_bins=new_bins,
+                       coverage=merger.coverage(covered)['overall_coverage'])
+            kept.append(run)
+            print(f"  {rank:>4d}  {run['test']:40s} {run['seed']:>10d} {run['seconds']:>7.1f}s "
+                  f"{new_bins:>9d} {run['coverage']:>7.2f}%")
+        
+        total = float(costs[usable].sum())
+        cost = sum(run['seconds'] for run in kept)
+        target = merger.merged_coverage(usable)['overall_coverage']
+        saved = 100.0 * (1 - cost / total) if total > 0 else 0.0
+        print(f"Kept {len(kept)} of {len(usable)} passing runs: {cost:.1f}s of {total:.1f}s simulation "
+              f"wall time ({saved:.1f}% less) for the same {target:.2f}% merged coverage")
+        skipped = len(runs) - len(usable)
+        if skipped:
+            print(f"  {skipped} failing or unidentified runs were not ranked")
+        
+        with open(run_list, 'w') as f:
+            f.write(f"# {len(kept)} of {len(usable)} runs keeping {target:.2f}% merged coverage "
+                    f"in {cost:.1f}s of {total:.1f}s, cheapest coverage first\n")
+            f.writelines(f"{run['test']} {run['seed']}\n" for run in kept)
+        print(f"Run list written to {run_list} (run it with run_test.py --run-list)")
+        return kept
+    
     def analyze_test_coverage(self, test_name: str, log_file: str) -> Dict:
         """Analyze coverage for a specific test"""
         print(f"Analyzing coverage for test: {test_name}")
         
         coverage_data = self.parse_uvm_log(log_file)
         self.coverage_data[test_name] = coverage_data
+        self.log_files[test_name] = log_file
         
         return coverage_data
     
@@ -118,6 +259,24 @@ class CoverageAnalyzer:
         gaps.sort(key=lambda x: x[1])
         return gaps
     
+    def coverage_deficits(self, coverage_data: Dict, target: float = 80.0) -> Dict[str, float]:
+        """Percentage points each coverage category is short of target (0 when met)"""
+        return {category: max(0.0, target - coverage)
+                for category, coverage in coverage_data.items()
+                if isinstance(coverage, (int, float))
+                and category not in ['overall_coverage', 'total_instructions']}
+    
+    def record_results(self, db_path: Path):
+        """Store each analyzed log's coverage in the results database"""
+        with CV32E40PResultsDatabase(db_path) as db:
+            for test_name, data in self.coverage_data.items():
+                # Categories the log did not report keep their empty placeholder and are skipped
+                coverage = {category: value for category, value in data.items()
+                            if isinstance(value, (int, float)) and category != 'total_instructions'}
+                db.record_analysis(test_name, self.log_files[test_name],
+                                   {'instructions': data.get('total_instructions') or None}, coverage)
+        print(f"Recorded {len(self.coverage_data)} runs in {db_path}")
+    
     def generate_coverage_report(self, output_file: str = None):
         """Generate comprehensive coverage report"""
         if not self.coverage_data:
@@ -147,8 +306,25 @@ class CoverageAnalyzer:
         report_lines.append(f"Total Tests Analyzed: {len(self.coverage_data)}")
         report_lines.append(f"Total Instructions Processed: {total_instructions}")
         report_lines.append(f"Average Overall Coverage: {avg_coverage:.2f}%")
+        merged = None
+        if self.merger is not None:
+            # Averaging per-run percentages undercounts bins hit by different runs; the union does not
+            merged = self.merger.merged_coverage()
+            report_lines.append(f"Merged Overall Coverage: {merged['overall_coverage']:.2f}% "
+                                f"(bins of {len(self.merger.runs)} runs)")
         report_lines.append("")
         
+        if merged is not None:
+            report_lines.append("MERGED COVERAGE (bins hit by any run)")
+            report_lines.append("-" * 40)
+            hit = np.count_nonzero(self.merger.hits(self.merger.union()))
+            report_lines.append(f"  Bins hit: {hit} of {len(self.merger.bin_names)}")
+            for category in sorted(c for c in merged if c != 'overall_coverage'):
+                coverage = merged[category]
+                status = "✓" if coverage >= 80.0 else "⚠" if coverage >= 50.0 else "✗"
+                report_lines.append(f"    {category:20s}: {coverage:6.2f}% {status}")
+            report_lines.append("")
+        
         # Per-test analysis
         report_lines.append("PER-TEST COVERAGE ANALYSIS")
         report_lines.append("-" * 40)
@@ -173,14 +349,23 @@ class CoverageAnalyzer:
         report_lines.append("-" * 40)
         
         all_gaps = {}
-        for test_name, data in self.coverage_data.items():
-            gaps = self.identify_coverage_gaps(data)
-            for category, coverage in gaps:
-                if category not in all_gaps:
-                    all_gaps[category] = []
-                all_gaps[category].append((test_name, coverage))
+        if merged is not None:
+            # A gap is what no run has covered, not what an average run misses
+            for category, coverage in self.identify_coverage_gaps(merged):
+                all_gaps[category] = [('merged', coverage)]
+        else:
+            for test_name, data in self.coverage_data.items():
+                gaps = self.identify_coverage_gaps(data)
+                for category, coverage in gaps:
+                    if category not in all_gaps:
+                        all_gaps[category] = []
+                    all_gaps[category].append((test_name, coverage))
         
-        if all_gaps:
+        if all_gaps and merged is not None:
+            report_lines.append("Categories with merged coverage < 80%:")
+            for category, test_coverages in all_gaps.items():
+                report_lines.append(f"  {category:20s}: {test_coverages[0][1]:6.2f}% (merged across {len(self.merger.runs)} runs)")
+        elif all_gaps:
             report_lines.append("Categories with coverage < 80%:")
             for category, test_coverages in all_gaps.items():
                 avg_gap_coverage = sum(cov for _, cov in test_coverages) / len(test_coverages)
@@ -233,6 +418,8 @@ class CoverageAnalyzer:
             return
             
         try:
+            import matplotlib.pyplot as plt
+            
             # Prepare data for plotting
             tests = list(self.coverage_data.keys())
             categories = []
@@ -297,12 +484,27 @@ class CoverageAnalyzer:
         except Exception as e:
             print(f"Error generating plots: {e}")
 
+def parse_uvm_log(test_name: str, log_file: str) -> Dict:
+    """Process pool entry point for CoverageAnalyzer.parse_uvm_log"""
+    return CoverageAnalyzer().parse_uvm_log(log_file)
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze CV32E40P functional coverage')
     parser.add_argument('--log-dir', '-d', default='logs', help='Directory containing log files')
     parser.add_argument('--output', '-o', help='Output report file')
     parser.add_argument('--plot', '-p', help='Output plot file')
     parser.add_argument('--tests', '-t', nargs='+', help='Specific tests to analyze')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Parse logs in this many processes, 0 for one per CPU (default 1)')
+    parser.add_argument('--parse-cache', help=f'Parse cache file (default {PARSE_CACHE} beside the log directory)')
+    parser.add_argument('--no-parse-cache', action='store_true', help='Parse every log again instead of reusing cached results')
+    parser.add_argument('--parse-cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                       help=f'Evict least recently used parse results beyond this size (default {DEFAULT_CACHE_MB})')
+    parser.add_argument('--merged-bins', help='Write the bin hit counts summed over all runs to this file')
+    parser.add_argument('--rank', metavar='RUN_LIST',
+                       help='Write the cheapest test/seed pairs keeping the merged coverage of all runs to RUN_LIST')
+    parser.add_argument('--db', help=f'Results database to record coverage in (default {RESULTS_DB} beside the log directory)')
+    parser.add_argument('--no-db', action='store_true', help='Do not record coverage in the results database')
     
     args = parser.parse_args()
     
@@ -318,8 +520,8 @@ def main():
     if args.tests:
         test_names = args.tests
     else:
-        # Find all test log files
-        log_files = list(log_dir.glob("cv32e40p_*.log"))
+        # Find all test log files, in a stable order so reports do not depend on the filesystem
+        log_files = sorted(log_dir.glob("cv32e40p_*.log"))
         test_names = [f.stem for f in log_files]
     
     if not test_names:
@@ -327,19 +529,47 @@ def main():
         return 1
     
     # Analyze each test
+    log_files = {}
     for test_name in test_names:
         log_file = log_dir / f"{test_name}.log"
         if log_file.exists():
-            analyzer.analyze_test_coverage(test_name, str(log_file))
+            log_files[test_name] = str(log_file)
         else:
             print(f"Warning: Log file for {test_name} not found")
+    cache = None
+    if not args.no_parse_cache:
+        cache = CV32E40PParseCache(Path(args.parse_cache) if args.parse_cache else log_dir.parent / PARSE_CACHE,
+                                   PARSER_NAME, PARSER_VERSION, int(args.parse_cache_mb * 2**20))
+    analyzer.analyze_logs(log_files, args.jobs or os.cpu_count() or 1, cache)
+    if cache is not None:
+        cache.close()
+        print(f"Parse cache: {cache.hits} logs reused, {cache.misses} parsed")
+    merger = analyzer.merge_bins()
+    if merger is None:
+        if args.merged_bins or args.rank:
+            print("Warning: merging and ranking coverage bins needs NumPy, skipping them")
+    elif merger.runs:
+        print(f"Merged coverage bins of {len(merger.runs)} of {len(log_files)} runs")
+        if args.merged_bins:
+            write_bins(Path(args.merged_bins), merger.bin_names, merger.merged_counts())
+            print(f"Merged bin counts written to {args.merged_bins}")
+    elif args.merged_bins or args.rank:
+        print(f"Warning: no {BINS_SUFFIX} files beside the logs, nothing to merge")
     
     # Generate report
     if analyzer.coverage_data:
+        if not args.no_db:
+            analyzer.record_results(Path(args.db) if args.db else log_dir.parent / RESULTS_DB)
         analyzer.generate_coverage_report(args.output)
         
         if args.plot:
             analyzer.plot_coverage_comparison(args.plot)
+        
+        if args.rank and merger is not None:
+            if analyzer.merger is None:
+                print("Error: Ranking needs the per-bin coverage dumps of the runs")
+                return 1
+            analyzer.rank_runs(Path(args.rank))
     else:
         print("No coverage data found to analyze")
         return 1
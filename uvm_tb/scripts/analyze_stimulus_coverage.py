@@ -7,14 +7,23 @@ Analyzes the coverage achieved by our Stage 2 stimulus generation
 import argparse
 import json
 import re
+import os
 import sys
 from pathlib import Path
 from typing import Dict, List, Tuple, Set
 from collections import defaultdict, Counter
 
+from parse_cache import DEFAULT_CACHE_MB, PARSE_CACHE, CV32E40PParseCache, parse_logs
+from results_db import RESULTS_DB, CV32E40PResultsDatabase
+
+# Parse cache entries of other versions are discarded; bump when parse_test_log's output changes
+PARSER_NAME = 'stimulus'
+PARSER_VERSION = 1
+
 class StimulusCoverageAnalyzer:
     def __init__(self):
         self.test_data = {}
+        self.log_files = {}
         self.instruction_coverage = defaultdict(set)
         self.sequence_coverage = defaultdict(list)
         self.performance_data = {}
@@ -96,6 +105,15 @@ class StimulusCoverageAnalyzer:
             
         return coverage_data
     
+    def parse_test_logs(self, log_files: Dict[str, str], jobs: int = 1,
+                        cache: CV32E40PParseCache = None) -> Dict[str, Dict]:
+        """Parse many test logs in `jobs` processes, reusing cached results of unchanged logs"""
+        parsed = parse_logs(log_files, parse_test_log, jobs, cache)
+        for data in parsed.values():
+            # Cached results come back from JSON as plain dicts
+            data['instruction_types'] = defaultdict(int, data['instruction_types'])
+        return parsed
+    
     def _estimate_instruction_distribution(self, coverage_data: Dict, test_name: str):
         """Estimate instruction type distribution based on test characteristics"""
         total_instructions = coverage_data['total_instructions']
@@ -200,7 +218,7 @@ class StimulusCoverageAnalyzer:
         if missing_types:
             gaps.append({
                 'type': 'Missing Instruction Types',
-                'description': f'Instruction types not covered: {", ".join(missing_types)}',
+                'description': f'Instruction types not covered: {", ".join(sorted(missing_types))}',
                 'severity': 'High',
                 'recommendation': 'Add sequences to cover missing instruction types'
             })
@@ -273,6 +291,18 @@ class StimulusCoverageAnalyzer:
         
         return tradeoffs
     
+    def record_results(self, db_path: Path):
+        """Store each analyzed log's outcome and counts in the results database"""
+        with CV32E40PResultsDatabase(db_path) as db:
+            for test_name, data in self.test_data.items():
+                fields = {
+                    'status': 'PASS' if data['test_passed'] else 'FAIL',
+                    'errors': data['errors'],
+                    'warnings': data['warnings'],
+                }
+                db.record_analysis(test_name, self.log_files[test_name], fields)
+        print(f"Recorded {len(self.test_data)} runs in {db_path}")
+    
     def generate_coverage_report(self, output_file: str = None) -> str:
         """Generate comprehensive coverage analysis report"""
         if not self.test_data:
@@ -406,11 +436,23 @@ class StimulusCoverageAnalyzer:
         
         return report_text
 
+def parse_test_log(test_name: str, log_file: str) -> Dict:
+    """Process pool entry point for StimulusCoverageAnalyzer.parse_test_log"""
+    return StimulusCoverageAnalyzer().parse_test_log(test_name, log_file)
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze CV32E40P stimulus coverage')
     parser.add_argument('--log-dir', '-d', default='work/logs', help='Directory containing log files')
     parser.add_argument('--output', '-o', help='Output report file')
     parser.add_argument('--tests', '-t', nargs='+', help='Specific tests to analyze')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Parse logs in this many processes, 0 for one per CPU (default 1)')
+    parser.add_argument('--parse-cache', help=f'Parse cache file (default {PARSE_CACHE} beside the log directory)')
+    parser.add_argument('--no-parse-cache', action='store_true', help='Parse every log again instead of reusing cached results')
+    parser.add_argument('--parse-cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                       help=f'Evict least recently used parse results beyond this size (default {DEFAULT_CACHE_MB})')
+    parser.add_argument('--db', help=f'Results database to record runs in (default {RESULTS_DB} beside the log directory)')
+    parser.add_argument('--no-db', action='store_true', help='Do not record runs in the results database')
     
     args = parser.parse_args()
     
@@ -426,8 +468,8 @@ def main():
     if args.tests:
         test_names = args.tests
     else:
-        # Find all test log files
-        log_files = list(log_dir.glob("cv32e40p_*.log"))
+        # Find all test log files, in a stable order so reports do not depend on the filesystem
+        log_files = sorted(log_dir.glob("cv32e40p_*.log"))
         test_names = [f.stem for f in log_files]
     
     if not test_names:
@@ -435,17 +477,30 @@ def main():
         return 1
     
     # Analyze each test
+    log_files = {}
     for test_name in test_names:
         log_file = log_dir / f"{test_name}.log"
         if log_file.exists():
-            test_data = analyzer.parse_test_log(test_name, str(log_file))
-            analyzer.test_data[test_name] = test_data
-            print(f"Analyzed {test_name}: {test_data['total_instructions']} instructions, {'PASSED' if test_data['test_passed'] else 'FAILED'}")
+            log_files[test_name] = str(log_file)
         else:
             print(f"Warning: Log file for {test_name} not found")
+    cache = None
+    if not args.no_parse_cache:
+        cache = CV32E40PParseCache(Path(args.parse_cache) if args.parse_cache else log_dir.parent / PARSE_CACHE,
+                                   PARSER_NAME, PARSER_VERSION, int(args.parse_cache_mb * 2**20))
+    parsed = analyzer.parse_test_logs(log_files, args.jobs or os.cpu_count() or 1, cache)
+    if cache is not None:
+        cache.close()
+        print(f"Parse cache: {cache.hits} logs reused, {cache.misses} parsed")
+    for test_name, test_data in parsed.items():
+        analyzer.test_data[test_name] = test_data
+        analyzer.log_files[test_name] = log_files[test_name]
+        print(f"Analyzed {test_name}: {test_data['total_instructions']} instructions, {'PASSED' if test_data['test_passed'] else 'FAILED'}")
     
     # Generate report
     if analyzer.test_data:
+        if not args.no_db:
+            analyzer.record_results(Path(args.db) if args.db else log_dir.parent / RESULTS_DB)
         report = analyzer.generate_coverage_report(args.output)
         if not args.output:
             print(report)
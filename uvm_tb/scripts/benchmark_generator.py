@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Stimulus Generator Benchmark
+Measures generate_assembly.py throughput and memory across distribution
+profiles, feature switches and program sizes, and flags slowdowns against
+a saved baseline
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROFILES = ('default', 'performance', 'stress')
+DEFAULT_SIZES = (100, 10000, 1000000)
+FULL_SIZES = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Fields identifying a benchmark case, used to match results across revisions
+CASE_KEY = ('engine', 'profile', 'hazards', 'pulp', 'instructions')
+
+GENERATOR = Path(__file__).parent / 'generate_assembly.py'
+
+def run_case(engine: str, profile: str, hazards: bool, pulp: bool, instructions: int,
+             workdir: str, seed: int = 1) -> Dict:
+    """Generate one program in a child process and measure it"""
+    output = os.path.join(workdir, f"bench_{engine}_{profile}_{instructions}.s")
+    cmd = [sys.executable, str(GENERATOR), '-o', output, '-n', str(instructions),
+           '-d', profile, '--seed', str(seed)]
+    if hazards:
+        cmd.append('--hazards')
+    if pulp:
+        cmd.append('--pulp')
+    if engine == 'batch':
+        cmd.append('--batch')
+
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr)
+        # wait4 reaps the child with its own resource usage (peak RSS, CPU time)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        stderr.seek(0)
+        errors = stderr.read().decode(errors='replace').strip()
+
+    case = {
+        'engine': engine,
+        'profile': profile,
+        'hazards': hazards,
+        'pulp': pulp,
+        'instructions': instructions,
+    }
+    if process.returncode != 0:
+        case['error'] = errors.splitlines()[-1] if errors else f"exit status {process.returncode}"
+        return case
+
+    output_bytes = os.path.getsize(output)
+    os.remove(output)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss_scale = 1 if sys.platform == 'darwin' else 1024
+    case.update({
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 4),
+        'instructions_per_second': round(instructions / wall, 1),
+        'peak_rss_mb': round(usage.ru_maxrss * rss_scale / 2**20, 1),
+        'output_bytes': output_bytes,
+        'bytes_per_second': round(output_bytes / wall, 1),
+    })
+    return case
+
+def run_suite(engines: List[str], profiles: List[str], sizes: List[int], repeat: int = 1,
+              workdir: str = None) -> List[Dict]:
+    """Every engine/profile/feature/size combination; the fastest of `repeat` runs is kept"""
+    cases = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for engine, profile, hazards, pulp, size in itertools.product(
+                engines, profiles, (False, True), (False, True), sizes):
+            runs = [run_case(engine, profile, hazards, pulp, size, tmp) for _ in range(repeat)]
+            case = min(runs, key=lambda r: r.get('wall_seconds', float('inf')))
+            cases.append(case)
+            print(format_case(case))
+    return cases
+
+def format_case(case: Dict) -> str:
+    features = '+'.join(f for f in ('hazards', 'pulp') if case[f]) or 'base'
+    label = f"{case['engine']:6s} {case['profile']:11s} {features:12s} {case['instructions']:>9d}"
+    if 'error' in case:
+        return f"{label}  FAILED: {case['error']}"
+    return (f"{label}  {case['instructions_per_second']:>12,.0f} instr/s  "
+            f"{case['bytes_per_second'] / 2**20:>7.1f} MB/s  {case['peak_rss_mb']:>7.1f} MB RSS")
+
+def compare(cases: List[Dict], baseline: List[Dict], threshold: float,
+            min_seconds: float = 0.0) -> List[str]:
+    """Cases whose throughput fell more than threshold below the baseline's.
+
+    Cases that took less than min_seconds in the baseline are skipped:
+    interpreter startup dominates them and they are mostly noise.
+    """
+    previous = {tuple(c[k] for k in CASE_KEY): c for c in baseline
+                if 'error' not in c and c['wall_seconds'] >= min_seconds}
+    regressions = []
+    for case in cases:
+        before = previous.get(tuple(case[k] for k in CASE_KEY))
+        if before is None:
+            continue
+        if 'error' in case:
+            regressions.append(format_case(case))
+            continue
+        ratio = case['instructions_per_second'] / before['instructions_per_second']
+        if ratio < 1 - threshold:
+            regressions.append(f"{format_case(case)}  ({ratio - 1:+.1%} vs baseline "
+                               f"{before['instructions_per_second']:,.0f} instr/s)")
+    return regressions
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=GENERATOR.parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark generate_assembly.py throughput and memory')
+    parser.add_argument('--sizes',
+                       help='Comma-separated program sizes (default 100,10000,1000000)')
+    parser.add_argument('--full', action='store_true',
+                       help='Benchmark every decade from 100 to 10M instructions')
+    parser.add_argument('--profiles', default=','.join(PROFILES),
+                       help='Comma-separated distribution profiles')
+    parser.add_argument('--engines', default='scalar,batch',
+                       help='Comma-separated generator engines: scalar, batch')
+    parser.add_argument('--repeat', type=int, default=1,
+                       help='Runs per case; the fastest is reported')
+    parser.add_argument('--output', '-o', default='generator_benchmark.json',
+                       help='Results JSON file')
+    parser.add_argument('--baseline',
+                       help='Results JSON of an earlier revision to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                       help='Fail when a case is this fraction slower than the baseline (default 0.15)')
+    parser.add_argument('--min-seconds', type=float, default=0.5,
+                       help='Only compare cases that took at least this long in the baseline (default 0.5)')
+    parser.add_argument('--workdir',
+                       help='Directory for temporary program files (default system temp)')
+
+    args = parser.parse_args()
+
+    if args.full:
+        sizes = list(FULL_SIZES)
+    elif args.sizes:
+        sizes = [int(s) for s in args.sizes.split(',')]
+    else:
+        sizes = list(DEFAULT_SIZES)
+    profiles = args.profiles.split(',')
+    engines = args.engines.split(',')
+    unknown = [p for p in profiles if p not in PROFILES] + [e for e in engines if e not in ('scalar', 'batch')]
+    if unknown:
+        print(f"Error: Unknown profile or engine: {', '.join(unknown)}")
+        return 1
+
+    cases = run_suite(engines, profiles, sizes, args.repeat, args.workdir)
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': cases,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+
+    failed = [c for c in cases if 'error' in c]
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(cases, baseline['cases'], args.threshold, args.min_seconds)
+        if regressions:
+            print(f"Slowdowns beyond {args.threshold:.0%} vs {baseline.get('revision', args.baseline)}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No slowdowns beyond {args.threshold:.0%} vs {baseline.get('revision', args.baseline)}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
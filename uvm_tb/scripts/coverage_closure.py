@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+CV32E40P Coverage Closure Script
+Closed loop between stimulus generation and coverage analysis: every batch of
+generated programs is steered toward the categories earlier batches left open
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+from analyze_coverage import CoverageAnalyzer
+from generate_assembly import (IMMEDIATE_CORNERS, IMMEDIATE_RANGES, PULP_TYPES, SELECTABLE_REGISTERS,
+                               CV32E40PAssemblyGenerator, InstructionType, derive_program_seed,
+                               generate_program_pool)
+from program_encoder import REGISTER_NUMBERS
+
+# Instruction types whose stimulus closes each coverage category. instruction_type
+# is spread over every enabled type, hazard_scenarios and the immediate categories
+# are also steered through the hazard and immediate settings, and register_usage
+# has no stimulus knob (registers are already drawn uniformly).
+CATEGORY_STIMULUS = {
+    'alu_operations': [InstructionType.ALU],
+    'immediate_values': [InstructionType.ALU, InstructionType.LOAD, InstructionType.STORE],
+    'branch_conditions': [InstructionType.BRANCH],
+    'memory_access': [InstructionType.LOAD, InstructionType.STORE],
+    'corner_cases': [InstructionType.ALU, InstructionType.DIV, InstructionType.LOAD, InstructionType.STORE],
+    'performance_scenarios': [InstructionType.MUL, InstructionType.DIV, InstructionType.LOAD,
+                              InstructionType.STORE],
+}
+
+# Hazard mix used while hazard_scenarios is below target: every distance the
+# coverage model bins, on both source operands
+DIRECTED_HAZARD_DISTANCES = {1: 1, 2: 1, 3: 1, 4: 1}
+DIRECTED_HAZARD_OPERANDS = {'rs1': 1, 'rs2': 1, 'both': 1}
+MAX_HAZARD_RATE = 0.9
+MAX_IMMEDIATE_CORNER_RATE = 0.5
+
+# Bins of the static estimate, mirroring cv32e40p_coverage_model.sv
+INSTRUCTION_TYPE_BINS = ['alu', 'mul', 'div', 'load', 'store', 'branch', 'jump', 'csr', 'pulp_alu',
+                         'pulp_mul', 'pulp_simd', 'pulp_hwloop', 'pulp_postinc', 'fpu']
+ALU_OPERATION_BINS = {
+    'add': 'add_sub', 'sub': 'add_sub',
+    'and': 'logical', 'or': 'logical', 'xor': 'logical',
+    'sll': 'shifts', 'srl': 'shifts', 'sra': 'shifts',
+    'slt': 'compare', 'sltu': 'compare',
+    'addi': 'immediate', 'andi': 'immediate', 'ori': 'immediate', 'xori': 'immediate',
+    'slli': 'immediate', 'srli': 'immediate', 'srai': 'immediate',
+}
+REGISTER_BINS = [('zero_reg', 0, 0), ('ra_reg', 1, 1), ('sp_reg', 2, 2), ('gp_reg', 3, 3),
+                 ('tp_reg', 4, 4), ('temp_regs', 5, 7), ('saved_regs', 8, 9), ('arg_regs', 10, 17),
+                 ('saved_regs2', 18, 27), ('temp_regs2', 28, 31)]
+IMMEDIATE_BINS = ['zero', 'small_pos', 'medium_pos', 'large_pos', 'small_neg', 'medium_neg',
+                  'large_neg', 'corner_cases']
+MEMORY_ACCESS_BINS = {'lb': 'load_byte', 'lbu': 'load_byte', 'lh': 'load_half', 'lhu': 'load_half',
+                      'lw': 'load_word', 'sb': 'store_byte', 'sh': 'store_half', 'sw': 'store_word'}
+HAZARD_DISTANCE_BINS = [('immediate', 1, 1), ('one_cycle', 2, 2), ('two_cycle', 3, 3), ('resolved', 4, 10)]
+CYCLE_COUNT_BINS = [('single_cycle', 1, 1), ('multi_cycle_2', 2, 2), ('multi_cycle_3_5', 3, 5),
+                    ('high_latency', 6, 32), ('very_high_latency', 33, 100)]
+BASE_INSTRUCTION_TYPES = INSTRUCTION_TYPE_BINS[:8]
+
+def _bin_of(bins: List[Tuple[str, int, int]], value: int) -> str:
+    for name, low, high in bins:
+        if low <= value <= high:
+            return name
+    return None
+
+def _immediate_bins(value: int) -> List[str]:
+    """Bins of IMM_VALUE hit by a sign-extended immediate"""
+    value &= 0xFFFFFFFF
+    hits = []
+    if value == 0:
+        hits.append('zero')
+    elif value <= 15:
+        hits.append('small_pos')
+    elif value <= 2047:
+        hits.append('medium_pos')
+    elif value <= 0x7FFFFFFF:
+        hits.append('large_pos')
+    if value >= 0xFFFFFFF0:
+        hits.append('small_neg')
+    if 0xFFFFF800 <= value <= 0xFFFFFFF0:
+        hits.append('medium_neg')
+    if 0x80000000 <= value <= 0xFFFFF800:
+        hits.append('large_neg')
+    if value in (0x7FFFFFFF, 0x80000000, 0xFFFFFFFF):
+        hits.append('corner_cases')
+    return hits
+
+class ProgramCoverageEstimator:
+    """Static coverage estimate of generated programs, for closing the loop without a simulator.
+
+    Mirrors the coverpoints of cv32e40p_coverage_model.sv that can be decided
+    from program text, with bins accumulated over every program sampled, over
+    the bins the generator can reach.
+    Outcomes only known at run time (branch direction, address alignment) are
+    not binned, crosses are not modelled, and corner cases are immediates at
+    the boundary of their range, so the numbers track the simulator's rather
+    than reproduce them.
+    """
+
+    def __init__(self, generator: CV32E40PAssemblyGenerator = None,
+                 instruction_types: Iterable[InstructionType] = None):
+        generator = generator or CV32E40PAssemblyGenerator()
+        self.encoder = generator.create_encoder()
+        self.templates = {t.mnemonic: (instr_type, t)
+                          for instr_type, templates in generator.instruction_templates.items()
+                          for t in templates}
+        self.bins = self.reachable_bins(generator, instruction_types)
+        self.hits = {category: set() for category in self.bins}
+        self.total_instructions = 0
+
+    @staticmethod
+    def reachable_bins(generator: CV32E40PAssemblyGenerator,
+                       instruction_types: Iterable[InstructionType] = None) -> Dict[str, set]:
+        """Bins per category the generator's templates and register pool can hit.
+
+        Bins of types without templates (pulp_mul, fpu, ...), of x0 and of
+        immediates no template field can hold are left out, so they neither
+        cap a category nor keep drawing stimulus toward it. instruction_types
+        limits the templates to those of the enabled types (all by default).
+        """
+        if instruction_types is None:
+            instruction_types = list(generator.instruction_templates)
+        templates = [(instr_type, t) for instr_type in instruction_types
+                     for t in generator.instruction_templates.get(instr_type, [])]
+        types = {instr_type.value for instr_type, _ in templates}
+        mnemonics = {t.mnemonic for _, t in templates}
+        registers = {_bin_of(REGISTER_BINS, reg) for reg in SELECTABLE_REGISTERS}
+        immediates = set()
+        for name in {t.immediate_field for _, t in templates if t.immediate_field}:
+            low, high = IMMEDIATE_RANGES[name]
+            for value in range(low, high + 1):
+                immediates.update(_immediate_bins(value))
+        # Every immediate range has boundary values besides -1, 0 and 1
+        corner_types = {instr_type for instr_type, t in templates if t.immediate_field}
+        return {
+            'instruction_type': {b for b in INSTRUCTION_TYPE_BINS if b in types},
+            'alu_operations': {b for m, b in ALU_OPERATION_BINS.items() if m in mnemonics},
+            'register_usage': {f"{field}.{name}" for field in ('rs1', 'rs2', 'rd') for name in registers},
+            'immediate_values': immediates,
+            'branch_conditions': {t.mnemonic for instr_type, t in templates if instr_type == InstructionType.BRANCH},
+            'memory_access': {b for m, b in MEMORY_ACCESS_BINS.items() if m in mnemonics},
+            'corner_cases': ({'corner_alu'} if InstructionType.ALU in corner_types else set()) |
+                            ({'corner_mem'} if corner_types & {InstructionType.LOAD, InstructionType.STORE}
+                             else set()),
+            'hazard_scenarios': {f"{field}.{name}" for field in ('rs1', 'rs2')
+                                 for name, _, _ in HAZARD_DISTANCE_BINS},
+            'performance_scenarios': ({f"type.{t}" for t in BASE_INSTRUCTION_TYPES if t in types} |
+                                      {f"cycles.{_bin_of(CYCLE_COUNT_BINS, t.cycles)}" for _, t in templates}),
+        }
+
+    def sample_program(self, path: str):
+        """Accumulate the bins hit by one assembly program"""
+        hits = self.hits
+        last_write = {}
+        position = 0
+        with open(path, 'r') as f:
+            for line in f:
+                kind, value = self.encoder.parse_line(line)
+                if kind != 'instr':
+                    continue
+                mnemonic, operands = value
+                position += 1
+                if mnemonic not in self.templates:
+                    continue  # la before register jumps, and the program footer
+                instr_type, template = self.templates[mnemonic]
+                self.total_instructions += 1
+
+                hits['instruction_type'].add(instr_type.value)
+                if mnemonic in ALU_OPERATION_BINS:
+                    hits['alu_operations'].add(ALU_OPERATION_BINS[mnemonic])
+                if instr_type == InstructionType.BRANCH:
+                    hits['branch_conditions'].add(mnemonic)
+                if mnemonic in MEMORY_ACCESS_BINS:
+                    hits['memory_access'].add(MEMORY_ACCESS_BINS[mnemonic])
+                if instr_type.value in BASE_INSTRUCTION_TYPES:
+                    hits['performance_scenarios'].add(f"type.{instr_type.value}")
+                hits['performance_scenarios'].add(f"cycles.{_bin_of(CYCLE_COUNT_BINS, template.cycles)}")
+
+                for name, text in operands.items():
+                    if name in ('rd', 'rs1', 'rs2'):
+                        reg = REGISTER_NUMBERS[text]
+                        hits['register_usage'].add(f"{name}.{_bin_of(REGISTER_BINS, reg)}")
+                        if name != 'rd' and reg in last_write:
+                            distance = _bin_of(HAZARD_DISTANCE_BINS, position - last_write[reg])
+                            if distance:
+                                hits['hazard_scenarios'].add(f"{name}.{distance}")
+                    elif name in IMMEDIATE_RANGES:
+                        imm = int(text)
+                        hits['immediate_values'].update(_immediate_bins(imm))
+                        if imm in IMMEDIATE_CORNERS[name] and imm not in (-1, 0, 1):
+                            if instr_type == InstructionType.ALU:
+                                hits['corner_cases'].add('corner_alu')
+                            elif instr_type in (InstructionType.LOAD, InstructionType.STORE):
+                                hits['corner_cases'].add('corner_mem')
+                if 'rd' in operands and REGISTER_NUMBERS[operands['rd']]:
+                    last_write[REGISTER_NUMBERS[operands['rd']]] = position
+
+    def coverage(self) -> Dict:
+        """Coverage per category in the format of CoverageAnalyzer.parse_uvm_log"""
+        coverage_info = {category: 100.0 * len(self.hits[category] & bins) / len(bins)
+                         for category, bins in self.bins.items() if bins}
+        coverage_info['overall_coverage'] = sum(coverage_info.values()) / len(coverage_info)
+        coverage_info['total_instructions'] = self.total_instructions
+        return coverage_info
+
+class CoverageClosureLoop:
+    """Generate, evaluate and reweight until coverage reaches the target.
+
+    Each iteration generates a batch of programs, evaluates them, and turns the
+    per-category deficits of the coverage accumulated so far into the settings
+    of the next batch: instruction type weights (the base profile plus an
+    additive boost per open category), hazard rate and mix, and the fraction
+    of boundary immediates. Settings are derived from the base profile and the
+    current deficits, so they relax as categories close.
+
+    Without a run command programs are scored by ProgramCoverageEstimator.
+    With one, the command is run per program and its UVM log parsed; since
+    logs only report percentages, a category's accumulated coverage is then
+    its best run so far.
+    """
+
+    def __init__(self, output_dir: str, num_instructions: int = 1000, programs: int = 4,
+                 distribution: str = 'default', enable_pulp: bool = False,
+                 target: float = 90.0, max_iterations: int = 10, gain: float = 1.0,
+                 seed: int = 0, jobs: int = 1, run_command: str = None,
+                 closed_loop: bool = True):
+        self.output_dir = output_dir
+        self.num_instructions = num_instructions
+        self.programs = programs
+        self.enable_pulp = enable_pulp
+        self.target = target
+        self.max_iterations = max_iterations
+        self.gain = gain
+        self.seed = seed
+        self.jobs = jobs
+        self.run_command = run_command
+        self.closed_loop = closed_loop
+        self.analyzer = CoverageAnalyzer()
+
+        generator = CV32E40PAssemblyGenerator()
+        base = generator.get_distribution(distribution)
+        # Types the generator has no templates for cannot be sampled, so they get no weight
+        self.stimulus_types = [t for t in InstructionType if (enable_pulp or t not in PULP_TYPES)
+                               and generator.instruction_templates.get(t)]
+        self.estimator = ProgramCoverageEstimator(generator, self.stimulus_types)
+        total = sum(base.values())
+        self.base_distribution = {t: w / total for t, w in base.items() if t in self.stimulus_types}
+        self.coverage = {}
+
+    def directed_settings(self, deficits: Dict[str, float]) -> Dict:
+        """Generator options for the next batch, from per-category deficits in percentage points"""
+        weights = {t: self.base_distribution.get(t, 0.0) for t in self.stimulus_types}
+        for category, deficit in deficits.items():
+            types = [t for t in CATEGORY_STIMULUS.get(category, []) if t in self.stimulus_types]
+            if category == 'instruction_type':
+                types = self.stimulus_types
+            for t in types:
+                weights[t] += self.gain * deficit / 100 / len(types)
+        total = sum(weights.values())
+        settings = {
+            'distribution': {t.value: round(w / total, 6) for t, w in weights.items() if w > 0},
+            'enable_hazards': False,
+            'immediate_corner_rate': round(min(MAX_IMMEDIATE_CORNER_RATE, self.gain * max(
+                deficits.get('immediate_values', 0), deficits.get('corner_cases', 0)) / 100), 6),
+        }
+        hazard_deficit = deficits.get('hazard_scenarios', 0)
+        if hazard_deficit:
+            settings['enable_hazards'] = True
+            settings['hazard_profile'] = {
+                'rate': round(min(MAX_HAZARD_RATE, 0.3 + self.gain * hazard_deficit / 100), 6),
+                'distances': dict(DIRECTED_HAZARD_DISTANCES),
+                'operands': dict(DIRECTED_HAZARD_OPERANDS),
+            }
+        return settings
+
+    def _base_settings(self) -> Dict:
+        return {
+            'distribution': {t.value: round(w, 6) for t, w in self.base_distribution.items()},
+            'enable_hazards': False,
+            'immediate_corner_rate': 0.0,
+        }
+
+    def _evaluate(self, manifest: Dict) -> int:
+        """Score a generated batch and return the instructions it simulated"""
+        if self.run_command is None:
+            before = self.estimator.total_instructions
+            for program in manifest['programs']:
+                self.estimator.sample_program(program['output'])
+            self.coverage = self.estimator.coverage()
+            return self.estimator.total_instructions - before
+
+        instructions = 0
+        for program in manifest['programs']:
+            stem = os.path.splitext(program['output'])[0]
+            log_file = stem + '.log'
+            command = self.run_command.format(program=program['output'], hex=stem + '.hex',
+                                              log=log_file, seed=program['seed'])
+            result = subprocess.run(shlex.split(command), capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"Warning: run command failed for {program['output']}: {result.stderr.strip()}")
+            run = self.analyzer.parse_uvm_log(log_file)
+            instructions += run['total_instructions'] or program['stats']['total_instructions']
+            for category, value in run.items():
+                if category not in ['overall_coverage', 'total_instructions']:
+                    self.coverage[category] = max(self.coverage.get(category, 0.0), value)
+        categories = [c for c in self.coverage if c not in ['overall_coverage', 'total_instructions']]
+        self.coverage['overall_coverage'] = (sum(self.coverage[c] for c in categories) / len(categories)
+                                             if categories else 0.0)
+        return instructions
+
+    def run(self) -> Dict:
+        """Iterate until the overall coverage target or max_iterations; return the report"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        settings = self._base_settings()
+        history = []
+        cumulative = 0
+
+        for iteration in range(self.max_iterations):
+            batch_dir = os.path.join(self.output_dir, f"iter{iteration:02d}")
+            os.makedirs(batch_dir, exist_ok=True)
+            manifest = generate_program_pool(
+                os.path.join(batch_dir, 'program.s'), self.programs, self.jobs,
+                derive_program_seed(self.seed, iteration), num_instructions=self.num_instructions,
+                enable_pulp=self.enable_pulp, batch=False,
+                write_hex=self.run_command is not None and '{hex}' in self.run_command, **settings)
+            with open(os.path.join(batch_dir, 'program_manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            instructions = self._evaluate(manifest)
+            cumulative += instructions
+            deficits = self.analyzer.coverage_deficits(self.coverage, self.target)
+            history.append({
+                'iteration': iteration,
+                'programs': self.programs,
+                'instructions': instructions,
+                'cumulative_instructions': cumulative,
+                'overall_coverage': self.coverage['overall_coverage'],
+                'coverage': {c: v for c, v in self.coverage.items()
+                             if c not in ['overall_coverage', 'total_instructions']},
+                'settings': settings,
+            })
+            print(f"Iteration {iteration}: {cumulative} instructions, "
+                  f"overall coverage {self.coverage['overall_coverage']:.2f}%")
+
+            if self.coverage['overall_coverage'] >= self.target:
+                break
+            if self.closed_loop:
+                settings = self.directed_settings(deficits)
+
+        converged = self.coverage['overall_coverage'] >= self.target
+        return {
+            'target': self.target,
+            'closed_loop': self.closed_loop,
+            'evaluator': 'command' if self.run_command else 'static',
+            'converged': converged,
+            'instructions_to_target': cumulative if converged else None,
+            'iterations': history,
+        }
+
+def format_report(report: Dict) -> str:
+    """Coverage-vs-instructions table of a closure run"""
+    lines = [
+        "=" * 80,
+        "CV32E40P COVERAGE CLOSURE REPORT",
+        "=" * 80,
+        f"Mode: {'closed loop' if report['closed_loop'] else 'open loop'} "
+        f"({report['evaluator']} coverage), target {report['target']:.2f}%",
+        "",
+        f"{'Iter':>4s} {'Instructions':>12s} {'Cumulative':>12s} {'Overall':>8s}  Lowest category",
+        "-" * 80,
+    ]
+    for entry in report['iterations']:
+        lowest = min(entry['coverage'].items(), key=lambda x: x[1]) if entry['coverage'] else ('-', 0.0)
+        lines.append(f"{entry['iteration']:4d} {entry['instructions']:12d} {entry['cumulative_instructions']:12d} "
+                     f"{entry['overall_coverage']:7.2f}%  {lowest[0]} ({lowest[1]:.2f}%)")
+    lines.append("")
+    if report['converged']:
+        lines.append(f"Target reached after {report['instructions_to_target']} instructions")
+    else:
+        lines.append("Target not reached")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Coverage-directed CV32E40P stimulus generation')
+    parser.add_argument('--output-dir', '-o', default='closure',
+                       help='Directory for generated programs and the report')
+    parser.add_argument('--target', type=float, default=90.0,
+                       help='Overall coverage target in percent')
+    parser.add_argument('--max-iterations', type=int, default=10,
+                       help='Maximum number of generate/evaluate iterations')
+    parser.add_argument('--programs', '-c', type=int, default=4,
+                       help='Programs generated per iteration')
+    parser.add_argument('--instructions', '-n', type=int, default=1000,
+                       help='Instructions per program')
+    parser.add_argument('--distribution', '-d', choices=['default', 'performance', 'stress'],
+                       default='default', help='Base instruction distribution profile')
+    parser.add_argument('--pulp', action='store_true',
+                       help='Enable PULP extensions')
+    parser.add_argument('--gain', type=float, default=1.0,
+                       help='Strength of the reweighting toward open categories')
+    parser.add_argument('--seed', type=int, default=0,
+                       help='Base seed; iteration i generates with a seed derived from it')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Worker processes for program generation')
+    parser.add_argument('--run-command',
+                       help='Simulation command run per program, with {program}, {hex}, {log} and {seed} '
+                            'placeholders; without it coverage is estimated statically from the programs')
+    parser.add_argument('--open-loop', action='store_true',
+                       help='Keep the base settings every iteration (baseline for measuring the saving)')
+    parser.add_argument('--report', '-r',
+                       help='JSON report file (default <output-dir>/closure_report.json)')
+
+    args = parser.parse_args()
+
+    if args.programs < 1 or args.max_iterations < 1 or args.jobs < 1:
+        parser.error('--programs, --max-iterations and --jobs must be at least 1')
+
+    loop = CoverageClosureLoop(args.output_dir, args.instructions, args.programs, args.distribution,
+                               args.pulp, args.target, args.max_iterations, args.gain, args.seed,
+                               args.jobs, args.run_command, closed_loop=not args.open_loop)
+    report = loop.run()
+
+    print(format_report(report))
+
+    report_file = args.report or os.path.join(args.output_dir, 'closure_report.json')
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Closure report written to {report_file}")
+
+    return 0 if report['converged'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Coverage Bin Merging
+Merges the per-bin hit counts the coverage models dump at the end of each run
+into true cumulative coverage, per covergroup and overall
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Suffix of the bin dump the runner places beside each run's log
+BINS_SUFFIX = '.bins'
+
+# First line of a bin dump, written by cv32e40p_coverage_bins::dump()
+FORMAT_HEADER = '# cv32e40p coverage bins v1'
+
+# Floor on a run's cost in greedy_cover, keeping coverage per cost finite for instant runs
+MIN_COST = 1e-3
+
+def read_bins(path: Path) -> Tuple[Tuple[str, ...], np.ndarray]:
+    """Bin names and hit counts of a "<group>.<coverpoint>.<bin> <hits>" dump"""
+    names, counts = [], []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            fields = line.split()
+            if len(fields) == 2:
+                names.append(fields[0])
+                counts.append(fields[1])
+    return tuple(names), np.array(counts, dtype=np.uint32)
+
+def write_bins(path: Path, names: Iterable[str], counts: np.ndarray) -> None:
+    """Write bin counts in the coverage models' dump format"""
+    with open(path, 'w') as f:
+        f.write(FORMAT_HEADER + '\n')
+        f.writelines(f"{name} {count}\n" for name, count in zip(names, counts.tolist()))
+
+class CV32E40PCoverageMerger:
+    """Bin hit counts of many runs over the union of the bins they declare.
+
+    Each run is a row of a runs x bins count matrix, and a row of packed
+    hit bits; merging any set of runs is an OR over their bit rows. Group
+    coverage follows the simulator's get_inst_coverage(): the mean over
+    the group's coverpoints and crosses of the fraction of bins hit, and
+    overall coverage is the mean over groups, as in report_coverage().
+    """
+
+    def __init__(self):
+        self.runs: List[str] = []
+        self.bin_names: List[str] = []
+        self.bin_index: Dict[str, int] = {}
+        # Per run, the global bin index of each dumped bin and its count
+        self._rows: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Global indices of bin name layouts already seen; runs of one model share a layout
+        self._layouts: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._counts: Optional[np.ndarray] = None
+        self._bits: Optional[np.ndarray] = None
+        self._item_map: Optional[Tuple[np.ndarray, np.ndarray, List[str]]] = None
+
+    def add_run(self, run_name: str, names: Tuple[str, ...], counts: np.ndarray) -> None:
+        indices = self._layouts.get(names)
+        if indices is None:
+            for name in names:
+                if name not in self.bin_index:
+                    self.bin_index[name] = len(self.bin_names)
+                    self.bin_names.append(name)
+            indices = np.array([self.bin_index[name] for name in names], dtype=np.intp)
+            self._layouts[names] = indices
+            self._item_map = None
+        self.runs.append(run_name)
+        self._rows.append((indices, counts))
+        self._counts = self._bits = None
+
+    def add_bins_file(self, run_name: str, path: Path) -> None:
+        self.add_run(run_name, *read_bins(path))
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Runs x bins hit counts; bins a run did not declare count 0"""
+        if self._counts is None:
+            self._counts = np.zeros((len(self.runs), len(self.bin_names)), dtype=np.uint32)
+            for row, (indices, counts) in enumerate(self._rows):
+                self._counts[row, indices] = counts
+        return self._counts
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Runs x ceil(bins / 8) packed hit bitsets"""
+        if self._bits is None:
+            self._bits = np.packbits(self.counts > 0, axis=1)
+        return self._bits
+
+    def hits(self, bits: np.ndarray) -> np.ndarray:
+        """Boolean hit vector of one packed bitset"""
+        return np.unpackbits(bits, count=len(self.bin_names)).astype(bool)
+
+    def union(self, rows: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Packed bitset of the bins hit by any of the given runs (all by default)"""
+        bits = self.bits if rows is None else self.bits[np.asarray(list(rows), dtype=np.intp)]
+        if len(bits) == 0:
+            return np.zeros(self.bits.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(bits, axis=0)
+
+    def merged_counts(self) -> np.ndarray:
+        """Hit counts of each bin summed over all runs"""
+        return self.counts.sum(axis=0, dtype=np.uint64)
+
+    def _items(self) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Coverpoint/cross of each bin, group of each coverpoint/cross, and the group names"""
+        if self._item_map is not None:
+            return self._item_map
+        items, groups = {}, {}
+        bin_item, item_group = [], []
+        for name in self.bin_names:
+            group, item = name.split('.', 2)[:2]
+            key = (group, item)
+            if key not in items:
+                items[key] = len(items)
+                item_group.append(groups.setdefault(group, len(groups)))
+            bin_item.append(items[key])
+        self._item_map = (np.array(bin_item, dtype=np.intp), np.array(item_group, dtype=np.intp), list(groups))
+        return self._item_map
+
+    def coverage(self, hits: np.ndarray) -> Dict:
+        """Covergroup and overall coverage percentages of a boolean hit vector, keyed like the log reports"""
+        bin_item, item_group, groups = self._items()
+        if not groups:
+            return {'overall_coverage': 0.0}
+        item_coverage = np.bincount(bin_item, weights=hits) / np.bincount(bin_item)
+        group_coverage = np.bincount(item_group, weights=item_coverage) / np.bincount(item_group) * 100.0
+        result = {group: float(value) for group, value in zip(groups, group_coverage)}
+        result['overall_coverage'] = float(group_coverage.mean())
+        return result
+
+    def merged_coverage(self, rows: Optional[Iterable[int]] = None) -> Dict:
+        """Coverage of the given runs taken together (all by default)"""
+        return self.coverage(self.hits(self.union(rows)))
+
+    def greedy_cover(self, costs: np.ndarray, rows: Optional[Iterable[int]] = None) -> List[int]:
+        """Low-cost runs hitting every bin the given runs hit together, by greedy weighted set cover.
+
+        Each step takes the run with the most not yet covered bins per unit
+        cost, and only the gains of runs sharing the newly covered bins are
+        updated. Runs made redundant by later picks are then dropped, most
+        expensive first. Returns row indices in pick order.
+        """
+        candidates = np.arange(len(self.runs)) if rows is None else np.asarray(list(rows), dtype=np.intp)
+        hits = self.counts[candidates] > 0
+        costs = np.maximum(np.asarray(costs, dtype=np.float64)[candidates], MIN_COST)
+        uncovered = hits.any(axis=0)
+        gains = hits.sum(axis=1)
+        chosen = []
+        while uncovered.any():
+            pick = int(np.argmax(np.where(gains > 0, gains / costs, -1.0)))
+            newly = hits[pick] & uncovered
+            uncovered &= ~newly
+            gains -= hits[:, newly].sum(axis=1)
+            chosen.append(pick)
+        # Bins hit by only one chosen run keep that run
+        cover_count = hits[chosen].sum(axis=0)
+        for pick in sorted(chosen, key=lambda r: -costs[r]):
+            if np.all(cover_count[hits[pick]] > 1):
+                chosen.remove(pick)
+                cover_count -= hits[pick]
+        return [int(candidates[pick]) for pick in chosen]
+
+def bins_file(log_file) -> Path:
+    """Bin dump of the run that wrote log_file"""
+    return Path(log_file).with_suffix(BINS_SUFFIX)
@@ -5,12 +5,32 @@ Generates assembly files with target instruction distributions for verification
 """
 
 import argparse
+import hashlib
+import os
 import random
 import json
-from typing import Dict, List, Tuple
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import cached_property, reduce
+from itertools import islice
+from math import gcd
+from string import Formatter
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from pipeline_model import CV32E40PPipelineModel
+from program_encoder import (CSR_ADDRESSES, ENCODINGS, JAL_RANGE, CV32E40PInstructionEncoder, EncodingError,
+                             pack_instruction, write_images)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only required by the batch engine
+    np = None
+
 class InstructionType(Enum):
     ALU = "alu"
     MUL = "mul"
@@ -30,14 +50,587 @@ class InstructionTemplate:
     operands: str
     cycles: int
     description: str
+    weight: float = 1  # Relative weight among the templates of its InstructionType
+    # Preceded by "la {rs1}, {label}", so a register jump lands on a label of the program
+    loads_target: bool = False
+
+    @cached_property
+    def fields(self) -> Tuple[str, ...]:
+        """Operand placeholder names in the order they appear, then the la target if any"""
+        names = tuple(name for _, name, _, _ in Formatter().parse(self.operands) if name)
+        return names + ('label',) if self.loads_target else names
+
+    @property
+    def words(self) -> int:
+        """Instruction words, counting the auipc/addi pair of a leading la"""
+        return 3 if self.loads_target else 1
+
+    @cached_property
+    def immediate_field(self) -> str:
+        """Name of the immediate placeholder, or None"""
+        return next((name for name in self.fields if name in IMMEDIATE_RANGES), None)
+
+# Operand placeholders carrying a non-register value, with their random ranges
+IMMEDIATE_RANGES = {
+    'imm12': (-2048, 2047),
+    'offset': (-2048, 2047),
+    'shamt': (0, 31),
+    'uimm5': (0, 31),
+    'imm5': (-16, 15),
+}
+
+# Boundary values of each immediate range, drawn instead of a uniform value at
+# the generator's immediate_corner_rate
+IMMEDIATE_CORNERS = {name: sorted({low, low + 1, -1, 0, 1, high - 1, high} & set(range(low, high + 1)))
+                     for name, (low, high) in IMMEDIATE_RANGES.items()}
+
+CSR_NAMES = ['mstatus', 'mie', 'mtvec', 'mepc', 'mcause', 'mcycle', 'minstret']
+
+# Register names as printed in generated programs
+REGISTER_NAMES = [f"x{i}" for i in range(32)]
+REGISTER_NAMES[0] = "zero"  # x0 is always zero
+REGISTER_NAMES[1] = "ra"    # Return address
+REGISTER_NAMES[2] = "sp"    # Stack pointer
+
+# Registers drawn for operands (x0 is never selected)
+SELECTABLE_REGISTERS = range(1, 32)
+
+PULP_TYPES = [InstructionType.PULP_ALU, InstructionType.PULP_SIMD, InstructionType.PULP_HWLOOP]
+
+# Branches and jumps target one of the next LABEL_LOOKAHEAD labels to be defined,
+# so every target exists and control flow always moves forward
+LABEL_LOOKAHEAD = 4
+
+# Instructions per program chunk: drawn per vectorized step of the batch engine,
+# and held in memory at a time while a program is streamed
+BATCH_CHUNK_SIZE = 65536
+
+# Source operand positions a hazard can be injected into
+HAZARD_OPERANDS = ('rs1', 'rs2', 'both')
+
+# Longest producer-consumer distance a hazard profile may target
+MAX_HAZARD_DISTANCE = 16
+
+# Hazards owed per distance while no valid producer is available
+HAZARD_BACKLOG_LIMIT = 4
+
+class AliasSampler:
+    """Alias table (Walker/Vose) drawing from a fixed discrete distribution in O(1).
+
+    Weights are converted to exact integers, so every outcome is drawn with
+    exactly its share of the total weight, with no floating-point rounding.
+    """
+
+    def __init__(self, weights: Sequence):
+        fractions = [Fraction(w) for w in weights]
+        if not fractions or any(f < 0 for f in fractions) or not any(fractions):
+            raise ValueError("Weights must be non-negative with a positive sum")
+        denominator = reduce(lambda a, b: a * b // gcd(a, b), (f.denominator for f in fractions))
+        integers = [int(f * denominator) for f in fractions]
+        common = reduce(gcd, integers)
+        integers = [w // common for w in integers]
+
+        self.size = len(integers)
+        self.total = sum(integers)
+
+        # Each bucket holds `total` units: prob[i] of its own outcome, the rest of alias[i]
+        prob = [w * self.size for w in integers]
+        alias = list(range(self.size))
+        small = [i for i, p in enumerate(prob) if p < self.total]
+        large = [i for i, p in enumerate(prob) if p >= self.total]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            alias[s] = l
+            prob[l] -= self.total - prob[s]
+            (small if prob[l] < self.total else large).append(l)
+        for i in small + large:
+            prob[i] = self.total
+        self.prob = prob
+        self.alias = alias
+        self._arrays = None
+
+    def sample(self, rng: random.Random) -> int:
+        """Draw one outcome index"""
+        bucket, r = divmod(rng.randrange(self.size * self.total), self.total)
+        return bucket if r < self.prob[bucket] else self.alias[bucket]
+
+    def sample_many(self, size: int, np_rng) -> 'np.ndarray':
+        """Draw `size` outcome indices as a NumPy array"""
+        if self._arrays is None:
+            exact = self.size * self.total < 2**63
+            if exact:
+                prob = np.array(self.prob, dtype=np.int64)
+            else:
+                prob = np.array([float(Fraction(p, self.total)) for p in self.prob])
+            self._arrays = (exact, prob, np.array(self.alias))
+        exact, prob, alias = self._arrays
+        if exact:
+            bucket, r = np.divmod(np_rng.integers(0, self.size * self.total, size=size), self.total)
+        else:
+            # Weights too fine-grained for 64-bit integers: threshold in floating point
+            bucket = np_rng.integers(0, self.size, size=size)
+            r = np_rng.random(size)
+        return np.where(r < prob[bucket], bucket, alias[bucket])
+
+class InstructionSampler:
+    """Precompiled sampler over the (InstructionType, InstructionTemplate) pairs of a distribution.
+
+    A type is drawn with its distribution weight and a template within it with
+    the template's weight (or template_weights[mnemonic] when given). Built
+    once per distribution and reusable across programs.
+    """
+
+    def __init__(self, distribution: Dict[InstructionType, float],
+                 templates: Dict[InstructionType, List[InstructionTemplate]],
+                 template_weights: Dict[str, float] = None):
+        template_weights = template_weights or {}
+        self.types = []           # Instruction types with non-zero weight
+        self.templates = []       # Flattened template table
+        self.template_types = []  # Index into self.types for each template
+        weights = []
+        for instr_type, type_weight in distribution.items():
+            candidates = [(t, Fraction(template_weights.get(t.mnemonic, t.weight)))
+                          for t in templates[instr_type]]
+            type_total = sum(w for _, w in candidates)
+            if not type_weight or not type_total:
+                continue
+            self.types.append(instr_type)
+            for template, weight in candidates:
+                if weight:
+                    self.templates.append(template)
+                    self.template_types.append(len(self.types) - 1)
+                    weights.append(Fraction(type_weight) * weight / type_total)
+        self.alias = AliasSampler(weights)
+
+    def sample(self, rng: random.Random) -> Tuple[InstructionType, InstructionTemplate]:
+        """Draw one (type, template) pair"""
+        i = self.alias.sample(rng)
+        return self.types[self.template_types[i]], self.templates[i]
+
+    def sample_index(self, rng: random.Random) -> int:
+        """Draw one index into self.templates"""
+        return self.alias.sample(rng)
+
+    def sample_many(self, size: int, np_rng) -> 'np.ndarray':
+        """Draw `size` indices into self.templates as a NumPy array"""
+        return self.alias.sample_many(size, np_rng)
+
+@dataclass
+class HazardProfile:
+    """Target mix of read-after-write hazards injected when hazards are enabled"""
+    rate: float = 0.3  # Fraction of register-reading instructions made dependent on a recent writer
+    distances: Dict[int, float] = field(default_factory=lambda: {1: 1})  # Weight per producer distance
+    operands: Dict[str, float] = field(default_factory=lambda: {'rs1': 1})  # Weight per HAZARD_OPERANDS entry
+
+    def __post_init__(self):
+        self.distances = {int(d): w for d, w in self.distances.items()}
+        if not 0 <= self.rate <= 1:
+            raise ValueError(f"Hazard rate must be between 0 and 1, got {self.rate}")
+        if not self.distances or not all(1 <= d <= MAX_HAZARD_DISTANCE for d in self.distances):
+            raise ValueError(f"Hazard distances must be between 1 and {MAX_HAZARD_DISTANCE}")
+        if not self.operands or not set(self.operands) <= set(HAZARD_OPERANDS):
+            raise ValueError(f"Hazard operands must be among {', '.join(HAZARD_OPERANDS)}")
+        for name, weights in (('distance', self.distances), ('operand', self.operands)):
+            if any(w < 0 for w in weights.values()) or not sum(weights.values()) > 0:
+                raise ValueError(f"Hazard {name} weights must be non-negative with a positive sum")
+
+class HazardInjector:
+    """Injects read-after-write hazards at target distances, O(1) per instruction.
+
+    A ring of the last `window` destination registers and a per-register index
+    of the last writing position tell in constant time whether the instruction
+    `d` positions back is still the live producer of its register. Each drawn
+    hazard is owed per operand choice and distance until an instruction can
+    take it, so hazards whose producer is missing (a store or branch, or an
+    overwritten register) or whose operand the instruction lacks are made up
+    shortly afterwards. A 'both' hazard is taken by every operand the
+    instruction reads, so each drawn hazard makes exactly one hazard
+    instruction. Source reads that are not hazards are steered
+    away from registers written within the window, so the achieved distance
+    histogram follows the target.
+    """
+
+    def __init__(self, profile: HazardProfile):
+        self.profile = profile
+        self.distances = sorted(profile.distances)
+        self.window = self.distances[-1]
+        self.distance_sampler = AliasSampler([profile.distances[d] for d in self.distances])
+        self.operand_sampler = AliasSampler([profile.operands.get(op, 0) for op in HAZARD_OPERANDS])
+        self.position = 0
+        self.ring = [0] * (self.window + 1)  # Register written at each recent position, 0 if none
+        self.last_write = [-MAX_HAZARD_DISTANCE - 1] * 32
+        self.owed = {op: {d: 0 for d in self.distances} for op in HAZARD_OPERANDS}
+        self.achieved = {'rs1': {}, 'rs2': {}}
+        self.hazard_instructions = 0
+        self.reading_instructions = 0
+        self._profiles = {}
+
+    def _profile(self, template) -> Tuple[bool, bool, bool]:
+        """(reads rs1, reads rs2, writes rd) of a template"""
+        profile = self._profiles.get(template.mnemonic)
+        if profile is None:
+            fields = template.fields
+            # The la before a register jump writes its rs1, so no hazard reaches it
+            profile = ('rs1' in fields and not template.loads_target, 'rs2' in fields, 'rd' in fields)
+            self._profiles[template.mnemonic] = profile
+        return profile
+
+    def draw(self, rng: random.Random) -> Tuple[bool, int, int]:
+        """Draw (hazard, distance, operand index) for one instruction"""
+        if rng.random() >= self.profile.rate:
+            return False, 0, 0
+        return (True, self.distances[self.distance_sampler.sample(rng)],
+                self.operand_sampler.sample(rng))
+
+    def draw_many(self, size: int, np_rng) -> Tuple[List[bool], List[int], List[int]]:
+        """Draw `size` (hazard, distance, operand index) triples as lists"""
+        distances = np.array(self.distances)[self.distance_sampler.sample_many(size, np_rng)]
+        return ((np_rng.random(size) < self.profile.rate).tolist(), distances.tolist(),
+                self.operand_sampler.sample_many(size, np_rng).tolist())
+
+    def inject(self, template, rd: int, rs1: int, rs2: int,
+               draw: Tuple[bool, int, int]) -> Tuple[int, int]:
+        """Return the (rs1, rs2) of one instruction after hazard injection"""
+        hazard, distance, operand = draw
+        rs1, rs2 = self.inject_many([template], [0], [rd], [rs1], [rs2],
+                                    [hazard], [distance], [operand])
+        return rs1[0], rs2[0]
+
+    def inject_many(self, templates: Sequence, template_idx: Sequence[int],
+                    rd: Sequence[int], rs1: Sequence[int], rs2: Sequence[int],
+                    hazard: Sequence[bool], distance: Sequence[int],
+                    operand: Sequence[int]) -> Tuple[List[int], List[int]]:
+        """Return the (rs1, rs2) lists of a run of instructions after hazard injection"""
+        profiles = [self._profile(t) for t in templates]
+        ring, last_write, owed = self.ring, self.last_write, self.owed
+        window, span = self.window, self.window + 1
+        achieved_rs1, achieved_rs2 = self.achieved['rs1'], self.achieved['rs2']
+        pos = self.position
+        out_rs1, out_rs2 = list(rs1), list(rs2)
+
+        for k, t in enumerate(template_idx):
+            reads_rs1, reads_rs2, writes_rd = profiles[t]
+            if reads_rs1 or reads_rs2:
+                self.reading_instructions += 1
+                if hazard[k]:
+                    op = HAZARD_OPERANDS[operand[k]]
+                    d = distance[k]
+                    owed[op][d] = min(owed[op][d] + 1, HAZARD_BACKLOG_LIMIT)
+
+                # Pay one owed hazard from a live producer: 'both' (into every operand read), then
+                # rs2, then rs1, each at its largest debt
+                read = [s for s, reads in (('rs1', reads_rs1), ('rs2', reads_rs2)) if reads]
+                injected = {}
+                for op in HAZARD_OPERANDS[::-1]:
+                    targets = [s for s in read if op in ('both', s)]
+                    if not targets:
+                        continue
+                    debts = owed[op]
+                    best = 0
+                    for d in self.distances:
+                        producer = ring[(pos - d) % span]
+                        if (debts[d] and d <= pos and producer and last_write[producer] == pos - d
+                                and (not best or debts[d] > debts[best])):
+                            best = d
+                    if best:
+                        debts[best] -= 1
+                        for s in targets:
+                            injected[s] = ring[(pos - best) % span]
+                        break
+
+                # Every other source read stays clear of the recent writers
+                sources = []
+                for s, reads, reg in (('rs1', reads_rs1, out_rs1[k]), ('rs2', reads_rs2, out_rs2[k])):
+                    if not reads:
+                        sources.append(reg)
+                        continue
+                    if s in injected:
+                        reg = injected[s]
+                    else:
+                        while pos - last_write[reg] <= window:
+                            reg = reg % 31 + 1
+                    sources.append(reg)
+                    d = pos - last_write[reg]
+                    if d <= window:
+                        achieved = achieved_rs1 if s == 'rs1' else achieved_rs2
+                        achieved[d] = achieved.get(d, 0) + 1
+                out_rs1[k], out_rs2[k] = sources
+                if injected:
+                    self.hazard_instructions += 1
+
+            ring[pos % span] = rd[k] if writes_rd else 0
+            if writes_rd:
+                last_write[rd[k]] = pos
+            pos += 1
+
+        self.position = pos
+        return out_rs1, out_rs2
+
+    def report(self) -> Dict:
+        """Target and achieved hazard distributions"""
+        target_total = sum(self.profile.distances.values())
+        counts = {}
+        for achieved in self.achieved.values():
+            for d, n in achieved.items():
+                counts[d] = counts.get(d, 0) + n
+        total = sum(counts.values())
+        return {
+            'target_rate': self.profile.rate,
+            'target_distances': {d: self.profile.distances[d] / target_total for d in self.distances},
+            'target_operands': dict(self.profile.operands),
+            'achieved_rate': (self.hazard_instructions / self.reading_instructions
+                              if self.reading_instructions else 0),
+            'achieved_distances': {d: counts[d] / total for d in sorted(counts)},
+            'achieved_counts': {s: dict(sorted(a.items())) for s, a in self.achieved.items()},
+            'hazard_instructions': self.hazard_instructions,
+            'reading_instructions': self.reading_instructions,
+            'unmet': sum(sum(debts.values()) for debts in self.owed.values()),
+        }
+
+class CompactProgram:
+    """Struct-of-arrays instruction stream of a generated program.
+
+    Each instruction is one entry per column: template_id indexes templates
+    (the only copy of mnemonic and operand strings), rd, rs1 and rs2 are
+    register numbers, imm is the template's immediate, and symbol is an index
+    into CSR_NAMES or, for branches and jumps, the target's position among
+    the next LABEL_LOOKAHEAD labels. Label first_label + k follows instruction
+    label_positions[k]. That is under 8 bytes per instruction, so a
+    10M-instruction program takes about 75 MB. An instruction of a
+    loads_target template is written and encoded after its la, as three
+    words.
+
+    Assembly text, statistics and machine code are all derived from the
+    columns. A chunk of a longer program starts at first_label, and its
+    branches may target labels defined after it.
+    """
+
+    COLUMNS = ('template_id', 'rd', 'rs1', 'rs2', 'imm', 'symbol')
+
+    def __init__(self, templates: Sequence[InstructionTemplate],
+                 template_types: Sequence[InstructionType], first_label: int = 0):
+        self.templates = list(templates)
+        self.template_types = list(template_types)  # InstructionType of each template
+        self.first_label = first_label
+        self.template_id = array('B')
+        self.rd = array('B')
+        self.rs1 = array('B')
+        self.rs2 = array('B')
+        self.imm = array('h')
+        self.symbol = array('B')
+        self.label_positions = array('I')
+        self._formats = [self._format(t) for t in self.templates]
+        # Rows of loads_target templates format as two lines, split apart by lines()
+        self._multiline = any(t.loads_target for t in self.templates)
+
+    @staticmethod
+    def _format(template: InstructionTemplate) -> str:
+        """Format string of a template's assembly, taking its operands by field position"""
+        index = {name: f"{{{i}}}" for i, name in enumerate(template.fields)}
+        text = f"    {template.mnemonic} " + template.operands.format(**index)
+        if template.loads_target:
+            text = f"    la {index['rs1']}, {index['label']}\n" + text
+        return text
+
+    def __len__(self) -> int:
+        return len(self.template_id)
+
+    @property
+    def next_label(self) -> int:
+        """Id of the first label after this program"""
+        return self.first_label + len(self.label_positions)
+
+    def append(self, template_id: int, rd: int, rs1: int, rs2: int, imm: int = 0, symbol: int = 0):
+        self.template_id.append(template_id)
+        self.rd.append(rd)
+        self.rs1.append(rs1)
+        self.rs2.append(rs2)
+        self.imm.append(imm)
+        self.symbol.append(symbol)
+
+    def define_label(self):
+        """Define the next label after the last instruction"""
+        self.label_positions.append(len(self) - 1)
+
+    def extend(self, template_id, rd, rs1, rs2, imm, symbol, label_mask):
+        """Append a run of instructions given as NumPy arrays; label_mask marks those followed by a label"""
+        base = len(self)
+        for name, column in zip(self.COLUMNS, (template_id, rd, rs1, rs2, imm, symbol)):
+            target = getattr(self, name)
+            target.frombytes(np.asarray(column, dtype=target.typecode).tobytes())
+        positions = np.nonzero(label_mask)[0] + base
+        self.label_positions.frombytes(positions.astype(self.label_positions.typecode).tobytes())
+
+    def extend_program(self, chunk: 'CompactProgram'):
+        """Append a chunk that continues this program"""
+        if chunk.first_label != self.next_label:
+            raise ValueError(f"Chunk starts at label {chunk.first_label}, expected {self.next_label}")
+        base = len(self)
+        for name in self.COLUMNS:
+            getattr(self, name).extend(getattr(chunk, name))
+        self.label_positions.extend(p + base for p in chunk.label_positions)
+
+    def type_counts(self) -> Dict[str, int]:
+        """Instruction count per InstructionType value, in template order"""
+        if np is not None:
+            per_template = np.bincount(np.frombuffer(self.template_id, dtype=np.uint8),
+                                       minlength=len(self.templates)).tolist()
+        else:
+            per_template = [0] * len(self.templates)
+            for t in self.template_id:
+                per_template[t] += 1
+        counts = {}
+        for instr_type, n in zip(self.template_types, per_template):
+            if n:
+                counts[instr_type.value] = counts.get(instr_type.value, 0) + n
+        return counts
+
+    def lines(self, start: int = 0, stop: int = None) -> List[str]:
+        """Assembly lines of instructions start..stop-1, each followed by the label it defines"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if np is not None:
+            text = self._format_columns(start, stop)
+        else:
+            text = [self._formats[t].format(*[self._operand(name, i) for name in self.templates[t].fields])
+                    for i, t in zip(range(start, stop), self.template_id[start:stop])]
+
+        positions = self.label_positions
+        first, last = bisect_left(positions, start), bisect_left(positions, stop)
+        if first == last:
+            lines = text
+        else:
+            lines, done = [], 0
+            for k in range(first, last):
+                end = positions[k] - start + 1
+                lines.extend(text[done:end])
+                lines.append(f"label_{self.first_label + k}:")
+                done = end
+            lines.extend(text[done:])
+        if self._multiline and lines:
+            lines = '\n'.join(lines).split('\n')
+        return lines
+
+    def iter_lines(self, chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[str]:
+        """All assembly lines, formatted chunk_size instructions at a time"""
+        for start in range(0, len(self), chunk_size):
+            yield from self.lines(start, start + chunk_size)
+
+    def _operand(self, name: str, i: int):
+        """Text of one operand of instruction i"""
+        if name in ('rd', 'rs1', 'rs2'):
+            return REGISTER_NAMES[getattr(self, name)[i]]
+        if name == 'csr':
+            return CSR_NAMES[self.symbol[i]]
+        if name == 'label':
+            return f"label_{self.first_label + bisect_left(self.label_positions, i) + self.symbol[i]}"
+        return self.imm[i]
+
+    def _columns(self, start: int, stop: int) -> Dict[str, 'np.ndarray']:
+        """NumPy views of the columns over instructions start..stop-1"""
+        return {name: np.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)[start:stop]
+                for name in self.COLUMNS}
+
+    def _label_ids(self, start: int, positions: 'np.ndarray', symbol: 'np.ndarray') -> 'np.ndarray':
+        """Target label ids of the branches at positions (relative to start)"""
+        defined = np.frombuffer(self.label_positions, dtype=self.label_positions.typecode)
+        return self.first_label + np.searchsorted(defined, positions + start) + symbol
+
+    def _format_columns(self, start: int, stop: int) -> List[str]:
+        """Instruction text of start..stop-1, formatted one template at a time"""
+        columns = self._columns(start, stop)
+        template_id = columns['template_id']
+        registers = np.array(REGISTER_NAMES, dtype=object)
+        text = np.empty(stop - start, dtype=object)
+        for tid in np.unique(template_id).tolist():
+            positions = np.nonzero(template_id == tid)[0]
+            args = []
+            for name in self.templates[tid].fields:
+                if name in ('rd', 'rs1', 'rs2'):
+                    args.append(registers[columns[name][positions]].tolist())
+                elif name == 'csr':
+                    args.append([CSR_NAMES[s] for s in columns['symbol'][positions].tolist()])
+                elif name == 'label':
+                    label_ids = self._label_ids(start, positions, columns['symbol'][positions])
+                    args.append([f"label_{k}" for k in label_ids.tolist()])
+                else:
+                    args.append(columns['imm'][positions].tolist())
+            fmt = self._formats[tid]
+            text[positions] = [fmt.format(*row) for row in zip(*args)]
+        return text.tolist()
+
+    def word_offsets(self) -> 'np.ndarray':
+        """Word offset of each instruction from the first, then of the end (requires NumPy)"""
+        sizes = np.array([t.words for t in self.templates], dtype=np.int64)
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(sizes[np.frombuffer(self.template_id, dtype=np.uint8)], out=offsets[1:])
+        return offsets
+
+    def encode(self, following: Sequence[int] = None) -> array:
+        """Machine code of the instructions, the first at address 0 (requires NumPy).
+
+        following holds the word offsets, relative to the first instruction,
+        of the LABEL_LOOKAHEAD labels defined after this program. By default
+        they are the program footer's, at the word following the last
+        instruction.
+        """
+        n = len(self)
+        offsets = self.word_offsets()
+        if following is None:
+            following = [offsets[-1]] * LABEL_LOOKAHEAD
+        columns = {name: column.astype(np.int64) for name, column in self._columns(0, n).items()}
+        template_id = columns['template_id']
+        # Address of every label a branch can reach, those after this program included
+        label_addresses = 4 * np.concatenate([
+            offsets[np.frombuffer(self.label_positions, dtype=self.label_positions.typecode).astype(np.int64) + 1],
+            np.asarray(following, dtype=np.int64)])
+        csr_addresses = np.array([CSR_ADDRESSES[name] for name in CSR_NAMES])
+
+        words = np.zeros(offsets[-1], dtype=np.int64)
+        for tid in np.unique(template_id).tolist():
+            template = self.templates[tid]
+            fields = template.fields
+            fmt, opcode, funct3, funct7 = ENCODINGS[template.mnemonic]
+            positions = np.nonzero(template_id == tid)[0]
+            starts = offsets[positions]
+            # Register fields the template lacks encode as x0
+            rd, rs1, rs2 = (columns[name][positions] if name in fields else 0 for name in ('rd', 'rs1', 'rs2'))
+            imm, symbol = columns['imm'][positions], columns['symbol'][positions]
+            if template.loads_target:
+                # la: auipc and addi build the target address in rs1, then the jump uses it
+                targets = self._label_ids(0, positions, symbol) - self.first_label
+                offset = label_addresses[targets] - 4 * starts
+                low = offset - (((offset + 0x800) >> 12) << 12)
+                words[starts] = pack_instruction(*ENCODINGS['auipc'], rs1, 0, 0, offset)
+                words[starts + 1] = pack_instruction(*ENCODINGS['addi'], rs1, rs1, 0, low)
+                starts = starts + 2
+            elif 'label' in fields:
+                targets = self._label_ids(0, positions, symbol) - self.first_label
+                imm = label_addresses[targets] - 4 * starts
+                low, high = (-4096, 4094) if fmt == 'B' else (-(1 << 20), (1 << 20) - 2)
+                if ((imm < low) | (imm > high)).any():
+                    raise EncodingError(f"{template.mnemonic} target out of range")
+            elif 'csr' in fields:
+                if fmt == 'CSRI':
+                    rs1 = imm
+                imm = csr_addresses[symbol]
+            elif fmt == 'R' and template.immediate_field:
+                rs2 = imm & 0x1F
+            words[starts] = pack_instruction(fmt, opcode, funct3, funct7, rd, rs1, rs2, imm)
+
+        encoded = array('I')
+        encoded.frombytes(words.astype(np.uint32).tobytes())
+        return encoded
 
 class CV32E40PAssemblyGenerator:
-    def __init__(self):
+    def __init__(self, seed: int = None):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed) if np is not None else None
         self.instruction_templates = self._build_instruction_templates()
-        self.registers = [f"x{i}" for i in range(32)]
-        self.registers[0] = "zero"  # x0 is always zero
-        self.registers[1] = "ra"    # Return address
-        self.registers[2] = "sp"    # Stack pointer
+        self._samplers = {}
+        self.branch_taken_probability = 0.5  # Assumed by the pipeline timing model
+        self.hazard_profile = HazardProfile()  # Hazard mix injected when hazards are enabled
+        self.immediate_corner_rate = 0.0  # Fraction of immediates drawn from IMMEDIATE_CORNERS
+        self.registers = list(REGISTER_NAMES)
         
         # Default instruction distribution (based on typical RISC-V workloads)
         self.default_distribution = {
@@ -135,7 +728,8 @@ class CV32E40PAssemblyGenerator:
             
             InstructionType.JUMP: [
                 InstructionTemplate("jal", "{rd}, {label}", 2, "Jump and link"),
-                InstructionTemplate("jalr", "{rd}, {rs1}, {imm12}", 2, "Jump and link register"),
+                InstructionTemplate("jalr", "{rd}, {rs1}, 0", 2, "Jump and link register to a label",
+                                    loads_target=True),
             ],
             
             InstructionType.CSR: [
@@ -162,77 +756,44 @@ class CV32E40PAssemblyGenerator:
         }
         return templates
 
-    def generate_instruction(self, instr_type: InstructionType, 
-                           enable_hazards: bool = False,
-                           prev_rd: str = None) -> Tuple[str, Dict]:
-        """Generate a single instruction of the specified type"""
-        templates = self.instruction_templates[instr_type]
-        template = random.choice(templates)
-        
-        # Generate operands
-        operands = {}
-        
-        # Register selection with hazard consideration
-        if enable_hazards and prev_rd and random.random() < 0.3:
-            # 30% chance to create a hazard by using previous destination
-            operands['rs1'] = prev_rd
-        else:
-            operands['rs1'] = random.choice(self.registers[1:32])  # Avoid x0 for source
-            
-        operands['rs2'] = random.choice(self.registers[1:32])
-        operands['rd'] = random.choice(self.registers[1:32])
-        
-        # Generate immediates and offsets
-        operands['imm12'] = random.randint(-2048, 2047)
-        operands['offset'] = random.randint(-2048, 2047)
-        operands['shamt'] = random.randint(0, 31)
-        operands['uimm5'] = random.randint(0, 31)
-        operands['imm5'] = random.randint(-16, 15)
-        
-        # CSR addresses
-        csr_addrs = ['mstatus', 'mie', 'mtvec', 'mepc', 'mcause', 'mcycle', 'minstret']
-        operands['csr'] = random.choice(csr_addrs)
-        
-        # Labels for branches and jumps
-        operands['label'] = f"label_{random.randint(1000, 9999)}"
-        
-        # Format the instruction
-        instruction = f"{template.mnemonic} {template.operands.format(**operands)}"
-        
-        metadata = {
-            'type': instr_type.value,
-            'cycles': template.cycles,
-            'description': template.description,
-            'rd': operands.get('rd'),
-            'rs1': operands.get('rs1'),
-            'rs2': operands.get('rs2')
-        }
-        
-        return instruction, metadata
+    def get_distribution(self, name: str) -> Dict[InstructionType, int]:
+        """Look up a distribution profile by name ('default', 'performance' or 'stress')"""
+        if name == 'performance':
+            return self.performance_distribution
+        elif name == 'stress':
+            return self.stress_distribution
+        return self.default_distribution
 
-    def generate_assembly_program(self, 
-                                num_instructions: int,
-                                distribution: Dict[InstructionType, int],
-                                enable_hazards: bool = False,
-                                enable_pulp: bool = False) -> Tuple[str, Dict]:
-        """Generate a complete assembly program"""
-        
-        # Filter out PULP instructions if not enabled
-        if not enable_pulp:
-            distribution = {k: v for k, v in distribution.items() 
-                          if k not in [InstructionType.PULP_ALU, InstructionType.PULP_SIMD, InstructionType.PULP_HWLOOP]}
-        
-        # Normalize distribution
-        total_weight = sum(distribution.values())
-        normalized_dist = {k: v/total_weight for k, v in distribution.items()}
-        
-        # Generate instruction sequence
-        instructions = []
-        metadata_list = []
-        prev_rd = None
-        
-        # Program header
-        program = [
+    def create_encoder(self) -> CV32E40PInstructionEncoder:
+        """Machine code encoder covering every instruction template"""
+        return CV32E40PInstructionEncoder(
+            t for templates in self.instruction_templates.values() for t in templates)
+
+    def get_sampler(self, distribution: Union[Dict[InstructionType, float], InstructionSampler],
+                    enable_pulp: bool = False) -> InstructionSampler:
+        """Sampler for a distribution, built on first use and cached.
+
+        A prebuilt InstructionSampler is returned unchanged.
+        """
+        if isinstance(distribution, InstructionSampler):
+            return distribution
+        key = (tuple(distribution.items()), enable_pulp)
+        if key not in self._samplers:
+            self._samplers[key] = InstructionSampler(
+                self._filter_distribution(distribution, enable_pulp), self.instruction_templates)
+        return self._samplers[key]
+
+    def _filter_distribution(self, distribution: Dict[InstructionType, int],
+                             enable_pulp: bool) -> Dict[InstructionType, int]:
+        """Drop PULP instruction types unless PULP extensions are enabled"""
+        if enable_pulp:
+            return dict(distribution)
+        return {k: v for k, v in distribution.items() if k not in PULP_TYPES}
+
+    def _program_header(self, num_instructions: int, enable_hazards: bool,
+                        enable_pulp: bool) -> List[str]:
+        """Program header lines"""
+        return [
             ".section .text",
             ".global _start",
             "_start:",
@@ -242,61 +803,539 @@ class CV32E40PAssemblyGenerator:
             f"    # PULP enabled: {enable_pulp}",
             ""
         ]
-        
-        for i in range(num_instructions):
-            # Select instruction type based on distribution
-            rand_val = random.random()
-            cumulative = 0
-            selected_type = None
-            
-            for instr_type, weight in normalized_dist.items():
-                cumulative += weight
-                if rand_val <= cumulative:
-                    selected_type = instr_type
-                    break
-            
-            if selected_type is None:
-                selected_type = list(normalized_dist.keys())[0]
-            
-            # Generate instruction
-            instruction, metadata = self.generate_instruction(
-                selected_type, enable_hazards, prev_rd)
-            
-            instructions.append(f"    {instruction}")
-            metadata_list.append(metadata)
-            prev_rd = metadata.get('rd')
-            
-            # Add occasional labels for branches
-            if random.random() < 0.1:  # 10% chance
-                instructions.append(f"label_{random.randint(1000, 9999)}:")
-        
-        # Program footer
-        program.extend(instructions)
-        program.extend([
+
+    def _program_footer(self, next_label: int, num_instructions: int) -> List[str]:
+        """Program footer lines, defining labels still reachable by forward branches"""
+        # Loop back with jal while _start is in range, else with an auipc/jalr pair
+        max_words = max(t.words for templates in self.instruction_templates.values() for t in templates)
+        loop_back = "j" if 4 * (max_words * num_instructions + 1) < JAL_RANGE else "tail"
+        return [
             "",
             "    # End of program",
+        ] + [f"label_{i}:" for i in range(next_label, next_label + LABEL_LOOKAHEAD)] + [
             "    nop",
-            "    j _start  # Loop back for continuous testing",
+            f"    {loop_back} _start  # Loop back for continuous testing",
             ""
-        ])
-        
-        # Calculate statistics
-        stats = {
+        ]
+
+    def create_hazard_injector(self) -> HazardInjector:
+        """Hazard injector for one program, following self.hazard_profile"""
+        return HazardInjector(self.hazard_profile)
+
+    def draw_operands(self, template: InstructionTemplate,
+                      hazards: HazardInjector = None) -> Tuple[int, int, int, int, int]:
+        """Draw (rd, rs1, rs2, imm, symbol) of one instruction of a template, as CompactProgram columns.
+
+        With a HazardInjector, source registers are chosen by it; it must see
+        every instruction of the program in order.
+        """
+        rng = self.rng
+
+        # Register selection (x0 is never selected)
+        rs1 = rng.choice(SELECTABLE_REGISTERS)
+        rs2 = rng.choice(SELECTABLE_REGISTERS)
+        rd = rng.choice(SELECTABLE_REGISTERS)
+
+        # Hazard injection: reuse the destination of a recent instruction as a source
+        if hazards is not None:
+            rs1, rs2 = hazards.inject(template, rd, rs1, rs2, hazards.draw(rng))
+
+        # Every immediate is drawn, so the random stream does not depend on the template
+        imm = 0
+        immediate_field = template.immediate_field
+        for name, (low, high) in IMMEDIATE_RANGES.items():
+            value = rng.randint(low, high)
+            if self.immediate_corner_rate and rng.random() < self.immediate_corner_rate:
+                value = rng.choice(IMMEDIATE_CORNERS[name])
+            if name == immediate_field:
+                imm = value
+
+        # CSR address, and the target among the next LABEL_LOOKAHEAD labels
+        csr = rng.randrange(len(CSR_NAMES))
+        label = rng.randrange(LABEL_LOOKAHEAD)
+        return rd, rs1, rs2, imm, label if 'label' in template.fields else csr
+
+    def generate_instruction(self, instr_type: InstructionType, 
+                           enable_hazards: bool = False,
+                           hazards: HazardInjector = None,
+                           next_label: int = 0,
+                           template: InstructionTemplate = None) -> Tuple[str, Dict]:
+        """Generate a single instruction of the specified type.
+
+        The template is drawn by template weight unless given. With hazards
+        enabled, source registers are chosen by the program's HazardInjector,
+        which must see every instruction of the program in order. Branch and
+        jump targets are drawn from the next LABEL_LOOKAHEAD labels, starting
+        at next_label.
+        """
+        if template is None:
+            sampler = self.get_sampler({instr_type: 1}, enable_pulp=True)
+            _, template = sampler.sample(self.rng)
+
+        rd, rs1, rs2, imm, symbol = self.draw_operands(template, hazards if enable_hazards else None)
+        program = CompactProgram([template], [instr_type], first_label=next_label)
+        program.append(0, rd, rs1, rs2, imm, symbol)
+        instruction = '; '.join(line.strip() for line in program.lines())
+
+        metadata = {
+            'type': instr_type.value,
+            'cycles': template.cycles,
+            'description': template.description,
+            'rd': REGISTER_NAMES[rd],
+            'rs1': REGISTER_NAMES[rs1],
+            'rs2': REGISTER_NAMES[rs2]
+        }
+
+        return instruction, metadata
+
+    def _new_stats(self, num_instructions: int) -> Dict:
+        """Empty statistics, filled in incrementally while a program is generated"""
+        return {
             'total_instructions': num_instructions,
             'instruction_types': {},
             'estimated_cycles': 0,
             'estimated_ipc': 0
         }
-        
-        for metadata in metadata_list:
-            instr_type = metadata['type']
-            stats['instruction_types'][instr_type] = stats['instruction_types'].get(instr_type, 0) + 1
-            stats['estimated_cycles'] += metadata['cycles']
-        
-        if stats['estimated_cycles'] > 0:
-            stats['estimated_ipc'] = num_instructions / stats['estimated_cycles']
-        
-        return '\n'.join(program), stats
+
+    def _finish_stats(self, stats: Dict, model: CV32E40PPipelineModel,
+                      hazards: HazardInjector = None):
+        """Fill in the cycle estimates from the pipeline timing model and the hazard mix"""
+        if hazards is not None:
+            stats['hazards'] = hazards.report()
+        report = model.report()
+        stats['estimated_cycles'] = int(round(report['predicted_cycles']))
+        stats['estimated_ipc'] = report['predicted_ipc']
+        stats['stall_cycles'] = report['stall_cycles']
+        stats['branch_taken_probability'] = report['branch_taken_probability']
+
+    def _new_program(self, sampler: InstructionSampler, first_label: int = 0) -> CompactProgram:
+        """Empty program over the templates of a sampler"""
+        return CompactProgram(sampler.templates, [sampler.types[t] for t in sampler.template_types],
+                              first_label)
+
+    def iter_program_chunks(self,
+                            num_instructions: int,
+                            distribution: Dict[InstructionType, int],
+                            enable_hazards: bool = False,
+                            enable_pulp: bool = False,
+                            stats: Dict = None,
+                            batch: bool = False,
+                            chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[CompactProgram]:
+        """Yield a program as consecutive CompactProgram chunks of up to chunk_size instructions.
+
+        batch selects the vectorized NumPy engine. If a stats dict is given it
+        is filled in chunk by chunk and is complete once the iterator is
+        exhausted. distribution may also be a prebuilt InstructionSampler.
+        """
+        if batch and np is None:
+            raise ImportError("The batch engine requires NumPy")
+        if stats is None:
+            stats = self._new_stats(num_instructions)
+        instruction_types = stats['instruction_types']
+
+        sampler = self.get_sampler(distribution, enable_pulp)
+        model = CV32E40PPipelineModel(self.branch_taken_probability)
+        hazards = self.create_hazard_injector() if enable_hazards else None
+
+        engine = self._batch_chunks if batch else self._scalar_chunks
+        for chunk in engine(num_instructions, sampler, hazards, chunk_size):
+            for instr_type, count in chunk.type_counts().items():
+                instruction_types[instr_type] = instruction_types.get(instr_type, 0) + count
+            model.issue_many(chunk.templates, chunk.template_id, chunk.rd, chunk.rs1, chunk.rs2)
+            yield chunk
+
+        self._finish_stats(stats, model, hazards)
+
+    def _scalar_chunks(self, num_instructions: int, sampler: InstructionSampler,
+                       hazards: HazardInjector, chunk_size: int) -> Iterator[CompactProgram]:
+        """Instruction-at-a-time engine on the generator's random.Random"""
+        templates = sampler.templates
+        next_label = 0
+        for chunk_start in range(0, num_instructions, chunk_size):
+            chunk = self._new_program(sampler, next_label)
+            for _ in range(min(chunk_size, num_instructions - chunk_start)):
+                # Select instruction type and template based on distribution
+                t = sampler.sample_index(self.rng)
+                chunk.append(t, *self.draw_operands(templates[t], hazards))
+
+                # Add occasional labels for branches
+                if self.rng.random() < 0.1:  # 10% chance
+                    chunk.define_label()
+            next_label = chunk.next_label
+            yield chunk
+
+    def _batch_chunks(self, num_instructions: int, sampler: InstructionSampler,
+                      hazards: HazardInjector, chunk_size: int) -> Iterator[CompactProgram]:
+        """Vectorized engine: each chunk is drawn as arrays on the generator's NumPy Generator"""
+        rng = self.np_rng
+        templates = sampler.templates
+
+        # Templates by non-register operand, in first-use order: set order would
+        # vary between processes and break seed reproducibility
+        value_templates = {}
+        for i, template in enumerate(templates):
+            for name in template.fields:
+                if name not in ('rd', 'rs1', 'rs2'):
+                    value_templates.setdefault(name, []).append(i)
+
+        next_label = 0
+        for chunk_start in range(0, num_instructions, chunk_size):
+            n = min(chunk_size, num_instructions - chunk_start)
+
+            # Instruction types and templates in one draw from the alias table
+            template_idx = sampler.sample_many(n, rng)
+
+            # Registers (x0 is never selected)
+            rd = rng.integers(1, 32, size=n)
+            rs1 = rng.integers(1, 32, size=n)
+            rs2 = rng.integers(1, 32, size=n)
+            if hazards is not None:
+                # Hazard injection walks the chunk in order, O(1) per instruction
+                new_rs1, new_rs2 = hazards.inject_many(
+                    templates, template_idx.tolist(), rd.tolist(), rs1.tolist(), rs2.tolist(),
+                    *hazards.draw_many(n, rng))
+                rs1, rs2 = np.array(new_rs1), np.array(new_rs2)
+
+            # 10% chance of a label after each instruction
+            label_mask = rng.random(n) < 0.1
+
+            imm = np.zeros(n, dtype=np.int64)
+            symbol = np.zeros(n, dtype=np.int64)
+            for name, ids in value_templates.items():
+                mask = np.isin(template_idx, ids)
+                count = int(mask.sum())
+                if name == 'csr':
+                    symbol[mask] = rng.integers(0, len(CSR_NAMES), size=count)
+                elif name == 'label':
+                    symbol[mask] = rng.integers(0, LABEL_LOOKAHEAD, size=count)
+                else:
+                    low, high = IMMEDIATE_RANGES[name]
+                    drawn = rng.integers(low, high + 1, size=count)
+                    if self.immediate_corner_rate:
+                        corner = rng.random(count) < self.immediate_corner_rate
+                        corners = np.array(IMMEDIATE_CORNERS[name])
+                        drawn[corner] = corners[rng.integers(0, len(corners), size=int(corner.sum()))]
+                    imm[mask] = drawn
+
+            chunk = self._new_program(sampler, next_label)
+            chunk.extend(template_idx, rd, rs1, rs2, imm, symbol, label_mask)
+            next_label = chunk.next_label
+            yield chunk
+
+    def iter_assembly_program(self,
+                              num_instructions: int,
+                              distribution: Dict[InstructionType, int],
+                              enable_hazards: bool = False,
+                              enable_pulp: bool = False,
+                              stats: Dict = None) -> Iterator[str]:
+        """Yield the lines of a complete assembly program one at a time.
+
+        Memory use does not grow with num_instructions. If a stats dict is
+        given it is filled in as lines are produced and is complete once the
+        iterator is exhausted. distribution may also be a prebuilt
+        InstructionSampler.
+        """
+        yield from self._iter_assembly(num_instructions, distribution, enable_hazards,
+                                       enable_pulp, stats, batch=False)
+
+    def _iter_assembly(self, num_instructions: int, distribution: Dict[InstructionType, int],
+                       enable_hazards: bool, enable_pulp: bool, stats: Dict, batch: bool,
+                       chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[str]:
+        next_label = 0
+        yield from self._program_header(num_instructions, enable_hazards, enable_pulp)
+        for chunk in self.iter_program_chunks(num_instructions, distribution, enable_hazards,
+                                              enable_pulp, stats, batch, chunk_size):
+            yield from chunk.lines()
+            next_label = chunk.next_label
+        yield from self._program_footer(next_label, num_instructions)
+
+    def generate_assembly_program(self, 
+                                num_instructions: int,
+                                distribution: Dict[InstructionType, int],
+                                enable_hazards: bool = False,
+                                enable_pulp: bool = False) -> Tuple[str, Dict]:
+        """Generate a complete assembly program"""
+        stats = self._new_stats(num_instructions)
+        program = '\n'.join(self.iter_assembly_program(
+            num_instructions, distribution, enable_hazards, enable_pulp, stats))
+        return program, stats
+
+    def iter_assembly_program_batch(self,
+                                    num_instructions: int,
+                                    distribution: Dict[InstructionType, int],
+                                    enable_hazards: bool = False,
+                                    enable_pulp: bool = False,
+                                    stats: Dict = None,
+                                    chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[str]:
+        """Yield the lines of a program built by the vectorized NumPy engine.
+
+        Instructions are drawn chunk_size at a time as arrays and only
+        formatted at output time, so memory use stays bounded by the chunk.
+        The distribution semantics match iter_assembly_program, and
+        distribution may also be a prebuilt InstructionSampler.
+        """
+        if np is None:
+            raise ImportError("The batch engine requires NumPy")
+        yield from self._iter_assembly(num_instructions, distribution, enable_hazards,
+                                       enable_pulp, stats, batch=True, chunk_size=chunk_size)
+
+    def generate_assembly_program_batch(self,
+                                        num_instructions: int,
+                                        distribution: Dict[InstructionType, int],
+                                        enable_hazards: bool = False,
+                                        enable_pulp: bool = False) -> Tuple[str, Dict]:
+        """Generate a complete assembly program with the vectorized NumPy engine"""
+        stats = self._new_stats(num_instructions)
+        program = '\n'.join(self.iter_assembly_program_batch(
+            num_instructions, distribution, enable_hazards, enable_pulp, stats))
+        return program, stats
+
+    def generate_program(self,
+                         num_instructions: int,
+                         distribution: Dict[InstructionType, int],
+                         enable_hazards: bool = False,
+                         enable_pulp: bool = False,
+                         stats: Dict = None,
+                         batch: bool = False) -> CompactProgram:
+        """Generate a whole program in memory, as the iterators above would produce it"""
+        program = None
+        for chunk in self.iter_program_chunks(num_instructions, distribution, enable_hazards,
+                                              enable_pulp, stats, batch):
+            if program is None:
+                program = chunk
+            else:
+                program.extend_program(chunk)
+        return program if program is not None else self._new_program(
+            self.get_sampler(distribution, enable_pulp))
+
+    def assembly_lines(self, program: CompactProgram, enable_hazards: bool = False,
+                       enable_pulp: bool = False) -> Iterator[str]:
+        """Lines of the complete assembly program for an in-memory program"""
+        yield from self._program_header(len(program), enable_hazards, enable_pulp)
+        yield from program.iter_lines()
+        yield from self._program_footer(program.next_label, len(program))
+
+    def iter_program_words(self, chunks: Iterable[CompactProgram], num_instructions: int) -> Iterator[int]:
+        """Machine code of a chunked program and its footer, the first instruction at address 0 (requires NumPy).
+
+        A chunk is encoded once the chunks after it define the labels its
+        branches can reach, so only a chunk or two is held at a time.
+        """
+        held = deque()  # (chunk, word offsets of its instructions)
+        ahead = 0  # Labels defined by the held chunks after the first
+        origin = 0  # Word offset of the first held chunk
+        next_label = 0
+
+        def encode_first(end):
+            nonlocal origin, ahead
+            chunk, offsets = held.popleft()
+            following, base = [], int(offsets[-1])
+            for later, later_offsets in held:
+                following.extend(int(later_offsets[p + 1]) + base
+                                 for p in later.label_positions[:LABEL_LOOKAHEAD - len(following)])
+                base += int(later_offsets[-1])
+            if len(following) < LABEL_LOOKAHEAD:
+                # Labels past the last chunk are the footer's, after the last instruction
+                following.extend([end - origin] * (LABEL_LOOKAHEAD - len(following)))
+            if held:
+                ahead -= len(held[0][0].label_positions)
+            origin += int(offsets[-1])
+            return chunk.encode(following)
+
+        for chunk in chunks:
+            if held:
+                ahead += len(chunk.label_positions)
+            held.append((chunk, chunk.word_offsets()))
+            next_label = chunk.next_label
+            while len(held) > 1 and ahead >= LABEL_LOOKAHEAD:
+                yield from encode_first(None)
+        end = origin + sum(int(offsets[-1]) for _, offsets in held)
+        while held:
+            yield from encode_first(end)
+        yield from self.create_encoder().assemble_stream(self._program_footer(next_label, num_instructions),
+                                                         origin=4 * end, labels={'_start': 0})
+
+    def encode_program(self, program: CompactProgram) -> array:
+        """Machine code of an in-memory program and its footer, the first instruction at address 0"""
+        encoder = self.create_encoder()
+        if np is None:
+            return array('I', encoder.assemble_stream(self.assembly_lines(program), forward_only=True))
+        words = program.encode()
+        words.extend(encoder.assemble_stream(self._program_footer(program.next_label, len(program)),
+                                             origin=4 * len(words), labels={'_start': 0}))
+        return words
+
+def write_lines(path: str, lines: Iterable[str], chunk_lines: int = 8192):
+    """Write newline-separated lines to path in buffered chunks"""
+    lines = iter(lines)
+    with open(path, 'w') as f:
+        separator = ''
+        chunk = list(islice(lines, chunk_lines))
+        while chunk:
+            f.write(separator + '\n'.join(chunk))
+            separator = '\n'
+            chunk = list(islice(lines, chunk_lines))
+
+class LineWriter:
+    """Writes a program's lines to a file as they pass through on their way to the encoder.
+
+    The file matches what write_lines() produces for the same lines.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.separator = ''
+
+    def write(self, lines: List[str]):
+        if lines:
+            self.f.write(self.separator + '\n'.join(lines))
+            self.separator = '\n'
+
+    def echo(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            self.write([line])
+            yield line
+
+    def echo_program(self, generator: 'CV32E40PAssemblyGenerator', chunks: Iterable[CompactProgram],
+                     num_instructions: int, enable_hazards: bool, enable_pulp: bool) -> Iterator[CompactProgram]:
+        """Pass chunks through, writing the program header, each chunk's lines and the footer"""
+        self.write(generator._program_header(num_instructions, enable_hazards, enable_pulp))
+        next_label = 0
+        for chunk in chunks:
+            self.write(chunk.lines())
+            next_label = chunk.next_label
+            yield chunk
+        self.write(generator._program_footer(next_label, num_instructions))
+
+def derive_program_seed(base_seed: int, index: int) -> int:
+    """Seed of program `index` in a sharded run; depends only on the base seed and index"""
+    digest = hashlib.sha256(f"{base_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'little') >> 1
+
+def generate_program_files(output: str, num_instructions: int,
+                           distribution: Union[str, Dict[str, float]],
+                           enable_hazards: bool, enable_pulp: bool, seed: int = None,
+                           batch: bool = False, write_hex: bool = False,
+                           write_bin: bool = False, hazard_profile: Dict = None,
+                           immediate_corner_rate: float = 0.0) -> Dict:
+    """Generate one program, write its assembly and machine code images, and return its stats.
+
+    The program is streamed to disk, so peak memory does not depend on its length.
+    distribution is a profile name or a weight per InstructionType value, and
+    hazard_profile holds HazardProfile fields overriding the default hazard mix.
+    """
+    generator = CV32E40PAssemblyGenerator(seed=seed)
+    if hazard_profile:
+        generator.hazard_profile = HazardProfile(**hazard_profile)
+    generator.immediate_corner_rate = immediate_corner_rate
+    if isinstance(distribution, str):
+        profile = generator.get_distribution(distribution)
+    else:
+        profile = {InstructionType(name): weight for name, weight in distribution.items()}
+    stats = generator._new_stats(num_instructions)
+
+    if not (write_hex or write_bin):
+        iter_program = generator.iter_assembly_program_batch if batch else generator.iter_assembly_program
+        write_lines(output, iter_program(num_instructions, profile, enable_hazards, enable_pulp, stats))
+        return stats
+
+    # The images are encoded directly, without an external assembler, as the
+    # assembly is written
+    image_base = os.path.splitext(output)[0]
+    with open(output, 'w') as f:
+        assembly = LineWriter(f)
+        if np is None:
+            lines = generator.iter_assembly_program(num_instructions, profile, enable_hazards, enable_pulp, stats)
+            words = generator.create_encoder().assemble_stream(assembly.echo(lines), forward_only=True)
+        else:
+            chunks = generator.iter_program_chunks(num_instructions, profile, enable_hazards, enable_pulp,
+                                                   stats, batch)
+            words = generator.iter_program_words(
+                assembly.echo_program(generator, chunks, num_instructions, enable_hazards, enable_pulp),
+                num_instructions)
+        write_images(words, image_base + '.hex' if write_hex else None, image_base + '.bin' if write_bin else None)
+
+    return stats
+
+def _generate_shard(task: Dict) -> Dict:
+    """Process pool entry point: generate one program of a sharded run"""
+    stats = generate_program_files(**task)
+    return {'output': task['output'], 'seed': task['seed'], 'stats': stats}
+
+def generate_program_pool(output: str, count: int, jobs: int, base_seed: int,
+                          **options) -> Dict:
+    """Generate `count` programs over `jobs` processes and return the merged manifest.
+
+    Program i is written to <output stem>_<i><ext> with seed
+    derive_program_seed(base_seed, i), so every program can be regenerated on
+    its own and the results do not depend on the job count.
+    """
+    stem, ext = os.path.splitext(output)
+    width = max(4, len(str(count - 1)))
+    tasks = [dict(options, output=f"{stem}_{i:0{width}d}{ext}",
+                  seed=derive_program_seed(base_seed, i))
+             for i in range(count)]
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_generate_shard, tasks,
+                                        chunksize=max(1, count // (jobs * 8))))
+    else:
+        results = [_generate_shard(task) for task in tasks]
+
+    summary = {
+        'total_instructions': 0,
+        'instruction_types': {},
+        'estimated_cycles': 0,
+        'estimated_ipc': 0,
+        'stall_cycles': {}
+    }
+    hazard_counts = {'rs1': {}, 'rs2': {}}
+    hazard_instructions = reading_instructions = 0
+    for result in results:
+        stats = result['stats']
+        if 'hazards' in stats:
+            for operand, achieved in stats['hazards']['achieved_counts'].items():
+                for d, n in achieved.items():
+                    hazard_counts[operand][d] = hazard_counts[operand].get(d, 0) + n
+            hazard_instructions += stats['hazards']['hazard_instructions']
+            reading_instructions += stats['hazards']['reading_instructions']
+        summary['total_instructions'] += stats['total_instructions']
+        summary['estimated_cycles'] += stats['estimated_cycles']
+        for cause, n in stats['stall_cycles'].items():
+            summary['stall_cycles'][cause] = round(summary['stall_cycles'].get(cause, 0) + n, 2)
+        for instr_type, n in stats['instruction_types'].items():
+            summary['instruction_types'][instr_type] = summary['instruction_types'].get(instr_type, 0) + n
+    if summary['estimated_cycles'] > 0:
+        summary['estimated_ipc'] = summary['total_instructions'] / summary['estimated_cycles']
+    if reading_instructions:
+        totals = {}
+        for achieved in hazard_counts.values():
+            for d, n in achieved.items():
+                totals[d] = totals.get(d, 0) + n
+        summary['hazards'] = {
+            'achieved_rate': hazard_instructions / reading_instructions,
+            'achieved_distances': {d: totals[d] / sum(totals.values()) for d in sorted(totals)},
+            'achieved_counts': {op: dict(sorted(a.items())) for op, a in hazard_counts.items()},
+            'hazard_instructions': hazard_instructions,
+            'reading_instructions': reading_instructions,
+        }
+
+    return {
+        'base_seed': base_seed,
+        'count': count,
+        'options': dict(options),
+        'summary': summary,
+        'programs': [dict(index=i, **result) for i, result in enumerate(results)],
+    }
+
+def parse_weights(text: str, key_type=str) -> Dict:
+    """Parse 'key:weight,key:weight' into a dict; a bare key has weight 1"""
+    weights = {}
+    for item in text.split(','):
+        key, _, weight = item.strip().partition(':')
+        weights[key_type(key)] = float(weight) if weight else 1
+    return weights
 
 def main():
     parser = argparse.ArgumentParser(description='Generate CV32E40P assembly test programs')
@@ -310,39 +1349,91 @@ def main():
                        help='Instruction distribution profile')
     parser.add_argument('--hazards', action='store_true',
                        help='Enable hazard injection')
+    parser.add_argument('--hazard-rate', type=float,
+                       help='Fraction of register-reading instructions given a hazard (default 0.3); implies --hazards')
+    parser.add_argument('--hazard-distances',
+                       help='Target producer distance histogram, e.g. 1:4,2:2,3:1 (default 1); implies --hazards')
+    parser.add_argument('--hazard-operands',
+                       help='Operand positions to inject into: rs1, rs2 or both, optionally weighted, '
+                            'e.g. rs1:2,rs2:1,both:1 (default rs1); implies --hazards')
+    parser.add_argument('--immediate-corner-rate', type=float, default=0.0,
+                       help='Fraction of immediates drawn from the boundaries of their range')
     parser.add_argument('--pulp', action='store_true',
                        help='Enable PULP extensions')
     parser.add_argument('--stats', action='store_true',
                        help='Output statistics to JSON file')
     parser.add_argument('--seed', type=int,
                        help='Random seed for reproducible generation')
+    parser.add_argument('--batch', action='store_true',
+                       help='Use the vectorized NumPy batch engine')
+    parser.add_argument('--hex', action='store_true',
+                       help='Also write a $readmemh machine code image (.hex)')
+    parser.add_argument('--bin', action='store_true',
+                       help='Also write a raw binary machine code image (.bin)')
+    parser.add_argument('--count', type=int, default=1,
+                       help='Number of programs to generate, each with a seed derived from --seed')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Worker processes used when --count > 1')
     
     args = parser.parse_args()
     
-    if args.seed:
-        random.seed(args.seed)
+    if args.batch and np is None:
+        parser.error('--batch requires NumPy')
+    if args.count < 1 or args.jobs < 1:
+        parser.error('--count and --jobs must be at least 1')
+    if not 0 <= args.immediate_corner_rate <= 1:
+        parser.error('--immediate-corner-rate must be between 0 and 1')
     
-    generator = CV32E40PAssemblyGenerator()
+    hazard_profile = {}
+    try:
+        if args.hazard_rate is not None:
+            hazard_profile['rate'] = args.hazard_rate
+        if args.hazard_distances:
+            hazard_profile['distances'] = parse_weights(args.hazard_distances, int)
+        if args.hazard_operands:
+            hazard_profile['operands'] = parse_weights(args.hazard_operands)
+        HazardProfile(**hazard_profile)
+    except ValueError as e:
+        parser.error(f'invalid hazard profile: {e}')
     
-    # Select distribution
-    if args.distribution == 'performance':
-        distribution = generator.performance_distribution
-    elif args.distribution == 'stress':
-        distribution = generator.stress_distribution
-    else:
-        distribution = generator.default_distribution
+    options = dict(num_instructions=args.instructions, distribution=args.distribution,
+                   enable_hazards=args.hazards or bool(hazard_profile), enable_pulp=args.pulp,
+                   batch=args.batch, write_hex=args.hex, write_bin=args.bin)
+    if hazard_profile:
+        options['hazard_profile'] = hazard_profile
+    if args.immediate_corner_rate:
+        options['immediate_corner_rate'] = args.immediate_corner_rate
     
-    # Generate program
-    program, stats = generator.generate_assembly_program(
-        args.instructions, distribution, args.hazards, args.pulp)
+    if args.count > 1:
+        # Record the base seed so an unseeded pool can still be reproduced
+        base_seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2**32)
+        manifest = generate_program_pool(args.output, args.count, args.jobs, base_seed, **options)
+        
+        manifest_file = os.path.splitext(args.output)[0] + '_manifest.json'
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        summary = manifest['summary']
+        print(f"Generated {args.count} programs ({summary['total_instructions']} instructions) "
+              f"with base seed {base_seed}")
+        print(f"Estimated IPC: {summary['estimated_ipc']:.2f}")
+        print(f"Manifest written to {manifest_file}")
+        return
     
-    # Write assembly file
-    with open(args.output, 'w') as f:
-        f.write(program)
+    stats = generate_program_files(args.output, seed=args.seed, **options)
     
     print(f"Generated {args.instructions} instructions in {args.output}")
     print(f"Estimated IPC: {stats['estimated_ipc']:.2f}")
     print(f"Estimated cycles: {stats['estimated_cycles']}")
+    if 'hazards' in stats:
+        achieved = ', '.join(f"{d}: {f:.1%}" for d, f in stats['hazards']['achieved_distances'].items())
+        print(f"Hazard rate: {stats['hazards']['achieved_rate']:.1%} (distances {achieved})")
+    
+    image_base = os.path.splitext(args.output)[0]
+    if args.hex:
+        print(f"Hex image written to {image_base}.hex")
+    if args.bin:
+        print(f"Binary image written to {image_base}.bin")
     
     # Output statistics if requested
     if args.stats:
@@ -352,4 +1443,4 @@ def main():
         print(f"Statistics written to {stats_file}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,774 @@
+#!/usr/bin/env python3
+"""
+CV32E40P Instruction Set Simulator
+Executes generated programs (RV32IM, Zicsr and the CORE-V instructions the
+generator emits) and computes their expected end-of-test signature
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import sys
+import time
+from array import array
+from typing import Callable, Dict, List, Tuple
+
+from program_encoder import CSR_ADDRESSES, ENCODINGS, OPCODE_AUIPC, OPCODE_JALR, EncodingError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up decoding and trace hashing
+    np = None
+
+MASK = 0xFFFFFFFF
+SIGN = 0x80000000
+
+# Boot address driven by the testbench (cv32e40p_driver)
+DEFAULT_BASE_ADDRESS = 0x180
+
+# Next-instruction index returned when control leaves the program image
+FAULT = 1 << 62
+
+# Retired instructions hashed per trace flush
+TRACE_CHUNK = 65536
+
+# Machine-mode CSRs: reset value and writable bits (CV32E40P user manual)
+CSR_RESET = {
+    'mstatus': 0x00001800,  # MPP is hardwired to machine mode
+    'mie': 0,
+    'mtvec': 0,
+    'mepc': 0,
+    'mcause': 0,
+}
+CSR_WRITE_MASKS = {
+    'mstatus': 0x00000088,  # MIE, MPIE
+    'mie': 0xFFFF0888,      # Fast interrupts, MEIE, MTIE, MSIE
+    'mtvec': 0xFFFFFF01,    # 256-byte aligned base, vectored mode bit
+    'mepc': 0xFFFFFFFE,
+    'mcause': 0x8000001F,
+}
+CSR_NAMES = {address: name for name, address in CSR_ADDRESSES.items()}
+
+# (opcode, funct3, funct7) / (opcode, funct3) / (opcode,) -> mnemonic
+DECODE_TABLE = {}
+for _mnemonic, (_fmt, _opcode, _funct3, _funct7) in ENCODINGS.items():
+    if _fmt in ('R', 'SHIFT'):
+        DECODE_TABLE[(_opcode, _funct3, _funct7)] = _mnemonic
+    elif _fmt in ('J', 'U'):
+        DECODE_TABLE[(_opcode,)] = _mnemonic
+    else:
+        DECODE_TABLE[(_opcode, _funct3)] = _mnemonic
+MNEMONICS = list(ENCODINGS)
+DECODE_FORMATS = ('R', 'SHIFT', 'I', 'S', 'B', 'J', 'U', 'CSR', 'CSRI')
+
+# Mnemonics whose operands are resolved when the image is loaded (PC-relative
+# targets and link addresses, CSR names, clip bounds, unsigned masks)
+LOAD_TIME_OPERANDS = {_mnemonic for _mnemonic, (_fmt, _, _, _) in ENCODINGS.items()
+                      if _fmt in ('S', 'B', 'J', 'CSR', 'CSRI')}
+LOAD_TIME_OPERANDS.update(('jalr', 'auipc', 'cv.clip', 'andi', 'ori', 'xori'))
+
+def _sign_extend(value: int, bits: int) -> int:
+    return value - (1 << bits) if value & (1 << (bits - 1)) else value
+
+def _signed(value: int) -> int:
+    return value - 0x100000000 if value & SIGN else value
+
+def decode(word: int) -> Tuple[str, int, int, int, int]:
+    """Decode a 32-bit word into (mnemonic, rd, rs1, rs2, immediate).
+
+    The immediate is sign-extended and in bytes for I/S/B/J formats, the
+    upper 20 bits for U, the shift amount for shifts, the CSR address for
+    CSR instructions and the 5-bit Is2 field for cv.clip.
+    """
+    opcode = word & 0x7F
+    rd = (word >> 7) & 0x1F
+    funct3 = (word >> 12) & 0x7
+    rs1 = (word >> 15) & 0x1F
+    rs2 = (word >> 20) & 0x1F
+    funct7 = word >> 25
+    mnemonic = (DECODE_TABLE.get((opcode, funct3, funct7)) or DECODE_TABLE.get((opcode, funct3))
+                or DECODE_TABLE.get((opcode,)))
+    if mnemonic is None:
+        raise EncodingError(f"Cannot decode instruction word 0x{word:08x}")
+
+    fmt = ENCODINGS[mnemonic][0]
+    if fmt == 'I':
+        imm = _sign_extend(word >> 20, 12)
+    elif fmt == 'S':
+        imm = _sign_extend((funct7 << 5) | rd, 12)
+    elif fmt == 'B':
+        imm = _sign_extend(((word >> 31) << 12) | (((word >> 7) & 1) << 11) |
+                           (((word >> 25) & 0x3F) << 5) | (((word >> 8) & 0xF) << 1), 13)
+    elif fmt == 'J':
+        imm = _sign_extend(((word >> 31) << 20) | (((word >> 12) & 0xFF) << 12) |
+                           (((word >> 20) & 1) << 11) | (((word >> 21) & 0x3FF) << 1), 21)
+    elif fmt == 'U':
+        imm = word & 0xFFFFF000
+    elif fmt == 'SHIFT':
+        imm = rs2
+    elif fmt in ('CSR', 'CSRI'):
+        imm = word >> 20
+    else:
+        imm = rs2
+    return mnemonic, rd, rs1, rs2, imm
+
+def decode_image(words: array) -> Tuple[List[str], List[int], List[int], List[int], List[int]]:
+    """decode() over a whole image: lists of mnemonics, rd, rs1, rs2 and immediates"""
+    if np is None or not len(words):
+        columns = tuple(zip(*(decode(word) for word in words)))
+        return tuple(list(column) for column in columns) if columns else ([], [], [], [], [])
+
+    w = np.asarray(words, dtype=np.uint32).astype(np.int64)
+    rd = (w >> 7) & 0x1F
+    rs1 = (w >> 15) & 0x1F
+    rs2 = (w >> 20) & 0x1F
+    funct7 = w >> 25
+    ids = _decode_lookup()[(w & 0x7F) | (((w >> 12) & 0x7) << 7) | (funct7 << 10)]
+    if (ids < 0).any():
+        raise EncodingError(f"Cannot decode instruction word 0x{int(w[np.argmax(ids < 0)]):08x}")
+
+    def sign_extend(value, bits):
+        return value - (((value >> (bits - 1)) & 1) << bits)
+
+    fmt = np.array([DECODE_FORMATS.index(ENCODINGS[m][0]) for m in MNEMONICS])[ids]
+    imm = np.select(
+        [fmt == DECODE_FORMATS.index('I'), fmt == DECODE_FORMATS.index('S'),
+         fmt == DECODE_FORMATS.index('B'), fmt == DECODE_FORMATS.index('J'),
+         fmt == DECODE_FORMATS.index('U'), fmt >= DECODE_FORMATS.index('CSR')],
+        [sign_extend(w >> 20, 12),
+         sign_extend((funct7 << 5) | rd, 12),
+         sign_extend(((w >> 31) << 12) | (((w >> 7) & 1) << 11) | (((w >> 25) & 0x3F) << 5) |
+                     (((w >> 8) & 0xF) << 1), 13),
+         sign_extend(((w >> 31) << 20) | (((w >> 12) & 0xFF) << 12) | (((w >> 20) & 1) << 11) |
+                     (((w >> 21) & 0x3FF) << 1), 21),
+         w & 0xFFFFF000,
+         w >> 20],
+        default=rs2)
+    mnemonics = [MNEMONICS[k] for k in ids.tolist()]
+    return mnemonics, rd.tolist(), rs1.tolist(), rs2.tolist(), imm.tolist()
+
+_lookup = None
+
+def _decode_lookup():
+    """Mnemonic index (-1 if undefined) for every opcode | funct3 << 7 | funct7 << 10 key"""
+    global _lookup
+    if _lookup is None:
+        _lookup = np.full(1 << 17, -1, dtype=np.int16)
+        funct7 = np.arange(128) << 10
+        # Shorter keys first, so (opcode, funct3, funct7) entries override wider ones
+        for key, mnemonic in sorted(DECODE_TABLE.items(), key=lambda item: len(item[0])):
+            for funct3 in (key[1:2] or range(8)):
+                columns = key[2] << 10 if len(key) > 2 else funct7
+                _lookup[key[0] | (funct3 << 7) | columns] = MNEMONICS.index(mnemonic)
+    return _lookup
+
+def _div(a: int, b: int) -> int:
+    a, b = _signed(a), _signed(b)
+    if b == 0:
+        return MASK
+    if a == -SIGN and b == -1:
+        return SIGN
+    q = abs(a) // abs(b)
+    return (-q if (a < 0) != (b < 0) else q) & MASK
+
+def _rem(a: int, b: int) -> int:
+    sa, sb = _signed(a), _signed(b)
+    if sb == 0:
+        return a
+    if sa == -SIGN and sb == -1:
+        return 0
+    r = abs(sa) % abs(sb)
+    return (-r if sa < 0 else r) & MASK
+
+def _simd(lane_bits: int, subtract: bool) -> Callable[[int, int], int]:
+    lane_mask = (1 << lane_bits) - 1
+    shifts = range(0, 32, lane_bits)
+    if subtract:
+        return lambda a, b: sum((((a >> s) - (b >> s)) & lane_mask) << s for s in shifts)
+    return lambda a, b: sum((((a >> s) + (b >> s)) & lane_mask) << s for s in shifts)
+
+# Register-register operations without a dedicated handler: mnemonic -> f(rs1, rs2)
+BINARY_OPERATIONS = {
+    'mulh': lambda a, b: ((_signed(a) * _signed(b)) >> 32) & MASK,
+    'mulhsu': lambda a, b: ((_signed(a) * b) >> 32) & MASK,
+    'mulhu': lambda a, b: (a * b) >> 32,
+    'div': _div,
+    'divu': lambda a, b: a // b if b else MASK,
+    'rem': _rem,
+    'remu': lambda a, b: a % b if b else a,
+    'cv.min': lambda a, b: a if (a ^ SIGN) < (b ^ SIGN) else b,
+    'cv.max': lambda a, b: a if (a ^ SIGN) > (b ^ SIGN) else b,
+    'cv.add.h': _simd(16, False),
+    'cv.sub.h': _simd(16, True),
+    'cv.add.b': _simd(8, False),
+    'cv.sub.b': _simd(8, True),
+}
+
+# Single-source operations: mnemonic -> f(rs1)
+UNARY_OPERATIONS = {
+    'cv.abs': lambda a: abs(_signed(a)) & MASK,
+    'cv.cnt': lambda a: bin(a).count('1'),
+}
+
+# Known results of the operation tables, checked by --self-check: (mnemonic, operands, result)
+REFERENCE_RESULTS = (
+    ('cv.abs', (5,), 5),
+    ('cv.abs', (0xFFFFFFFB,), 5),
+    ('cv.abs', (0,), 0),
+    ('cv.abs', (0x80000000,), 0x80000000),  # INT_MIN has no positive counterpart and stays INT_MIN
+    ('cv.cnt', (0xF0F0000F,), 12),
+    ('cv.min', (0xFFFFFFFF, 1), 0xFFFFFFFF),
+    ('cv.max', (0xFFFFFFFF, 1), 1),
+    ('mulh', (0x80000000, 0x80000000), 0x40000000),
+    ('mulhsu', (0xFFFFFFFF, 0xFFFFFFFF), 0xFFFFFFFF),
+    ('div', (0x80000000, 0xFFFFFFFF), 0x80000000),
+    ('div', (7, 0), MASK),
+    ('rem', (0xFFFFFFF9, 2), 0xFFFFFFFF),
+    ('remu', (7, 0), 7),
+    ('cv.add.h', (0x0001FFFF, 0x00010001), 0x00020000),
+    ('cv.sub.b', (0x00000000, 0x01010101), 0xFFFFFFFF),
+)
+
+# Generated programs --self-check runs to their end: (seed, distribution profile, PULP, hazards)
+SELF_CHECK_PROGRAMS = (
+    (1, 'default', False, False),
+    (2, 'performance', True, True),
+    (3, 'stress', True, False),
+)
+SELF_CHECK_INSTRUCTIONS = 2000
+
+def self_check() -> List[str]:
+    """Descriptions of the failed self-checks.
+
+    Each REFERENCE_RESULTS entry checks an operation table. Each of
+    SELF_CHECK_PROGRAMS is generated, must encode to the same words from its
+    columns as from its assembly text, and must run to its end.
+    """
+    failures = []
+    for mnemonic, operands, expected in REFERENCE_RESULTS:
+        operation = UNARY_OPERATIONS.get(mnemonic) or BINARY_OPERATIONS[mnemonic]
+        result = operation(*operands)
+        if result != expected:
+            arguments = ', '.join(f"0x{operand:08x}" for operand in operands)
+            failures.append(f"{mnemonic}({arguments}) = 0x{result:08x}, expected 0x{expected:08x}")
+
+    from generate_assembly import CV32E40PAssemblyGenerator
+    for seed, profile, pulp, hazards in SELF_CHECK_PROGRAMS:
+        name = f"{profile} program, seed {seed}"
+        generator = CV32E40PAssemblyGenerator(seed)
+        program = generator.generate_program(SELF_CHECK_INSTRUCTIONS, generator.get_distribution(profile),
+                                             hazards, pulp)
+        words = generator.encode_program(program)
+        lines = generator.assembly_lines(program, hazards, pulp)
+        if list(words) != list(generator.create_encoder().assemble_stream(lines)):
+            failures.append(f"{name}: machine code differs from its assembled text")
+        simulator = CV32E40PInstructionSetSimulator(words)
+        exit_reason = simulator.run()
+        if exit_reason != 'end_of_program':
+            failures.append(f"{name}: stopped with {exit_reason} at pc 0x{simulator.pc:08x} "
+                            f"after {simulator.retired} instructions")
+    return failures
+
+# mnemonic -> (access size in bytes, sign-extend)
+LOAD_ACCESSES = {'lb': (1, True), 'lbu': (1, False), 'lh': (2, True), 'lhu': (2, False), 'lw': (4, False)}
+STORE_SIZES = {'sb': 1, 'sh': 2, 'sw': 4}
+
+# Instruction handlers: h(x, d, a, b, imm, i) executes instruction i with
+# destination x[d] (d is 32 for x0), sources x[a] and x[b] and the predecoded
+# immediate, and returns the index of the next instruction. For branches and
+# jal, imm is the target index; for jumps, b is the link address.
+def _add(x, d, a, b, imm, i):
+    x[d] = (x[a] + x[b]) & MASK
+    return i + 1
+
+def _sub(x, d, a, b, imm, i):
+    x[d] = (x[a] - x[b]) & MASK
+    return i + 1
+
+def _and(x, d, a, b, imm, i):
+    x[d] = x[a] & x[b]
+    return i + 1
+
+def _or(x, d, a, b, imm, i):
+    x[d] = x[a] | x[b]
+    return i + 1
+
+def _xor(x, d, a, b, imm, i):
+    x[d] = x[a] ^ x[b]
+    return i + 1
+
+def _sll(x, d, a, b, imm, i):
+    x[d] = (x[a] << (x[b] & 31)) & MASK
+    return i + 1
+
+def _srl(x, d, a, b, imm, i):
+    x[d] = x[a] >> (x[b] & 31)
+    return i + 1
+
+def _sra(x, d, a, b, imm, i):
+    x[d] = (_signed(x[a]) >> (x[b] & 31)) & MASK
+    return i + 1
+
+def _slt(x, d, a, b, imm, i):
+    x[d] = int((x[a] ^ SIGN) < (x[b] ^ SIGN))
+    return i + 1
+
+def _sltu(x, d, a, b, imm, i):
+    x[d] = int(x[a] < x[b])
+    return i + 1
+
+def _mul(x, d, a, b, imm, i):
+    x[d] = (x[a] * x[b]) & MASK
+    return i + 1
+
+def _addi(x, d, a, b, imm, i):
+    x[d] = (x[a] + imm) & MASK
+    return i + 1
+
+def _andi(x, d, a, b, imm, i):
+    x[d] = x[a] & imm
+    return i + 1
+
+def _ori(x, d, a, b, imm, i):
+    x[d] = x[a] | imm
+    return i + 1
+
+def _xori(x, d, a, b, imm, i):
+    x[d] = x[a] ^ imm
+    return i + 1
+
+def _slli(x, d, a, b, imm, i):
+    x[d] = (x[a] << imm) & MASK
+    return i + 1
+
+def _srli(x, d, a, b, imm, i):
+    x[d] = x[a] >> imm
+    return i + 1
+
+def _srai(x, d, a, b, imm, i):
+    x[d] = (_signed(x[a]) >> imm) & MASK
+    return i + 1
+
+def _clip(x, d, a, b, imm, i):
+    x[d] = min(max(_signed(x[a]), imm[0]), imm[1]) & MASK
+    return i + 1
+
+def _auipc(x, d, a, b, imm, i):
+    x[d] = imm
+    return i + 1
+
+def _jal(x, d, a, b, imm, i):
+    x[d] = b
+    return imm
+
+def _beq(x, d, a, b, imm, i):
+    return imm if x[a] == x[b] else i + 1
+
+def _bne(x, d, a, b, imm, i):
+    return imm if x[a] != x[b] else i + 1
+
+def _blt(x, d, a, b, imm, i):
+    return imm if (x[a] ^ SIGN) < (x[b] ^ SIGN) else i + 1
+
+def _bge(x, d, a, b, imm, i):
+    return imm if (x[a] ^ SIGN) >= (x[b] ^ SIGN) else i + 1
+
+def _bltu(x, d, a, b, imm, i):
+    return imm if x[a] < x[b] else i + 1
+
+def _bgeu(x, d, a, b, imm, i):
+    return imm if x[a] >= x[b] else i + 1
+
+def _binary(operation: Callable[[int, int], int]) -> Callable:
+    def handler(x, d, a, b, imm, i):
+        x[d] = operation(x[a], x[b])
+        return i + 1
+    return handler
+
+def _unary(operation: Callable[[int], int]) -> Callable:
+    def handler(x, d, a, b, imm, i):
+        x[d] = operation(x[a])
+        return i + 1
+    return handler
+
+HANDLERS = {
+    'add': _add, 'sub': _sub, 'and': _and, 'or': _or, 'xor': _xor,
+    'sll': _sll, 'srl': _srl, 'sra': _sra, 'slt': _slt, 'sltu': _sltu, 'mul': _mul,
+    'addi': _addi, 'andi': _andi, 'ori': _ori, 'xori': _xori,
+    'slli': _slli, 'srli': _srli, 'srai': _srai,
+    'cv.clip': _clip, 'auipc': _auipc, 'jal': _jal,
+    'beq': _beq, 'bne': _bne, 'blt': _blt, 'bge': _bge, 'bltu': _bltu, 'bgeu': _bgeu,
+}
+HANDLERS.update({mnemonic: _binary(operation) for mnemonic, operation in BINARY_OPERATIONS.items()})
+HANDLERS.update({mnemonic: _unary(operation) for mnemonic, operation in UNARY_OPERATIONS.items()})
+
+class SparseMemory:
+    """Byte-addressable 32-bit memory in 4 KiB pages; unwritten bytes read as zero.
+
+    Misaligned accesses are allowed, as on CV32E40P. Words touched by stores
+    are tracked so the end state can report every memory write.
+    """
+
+    PAGE_BITS = 12
+    PAGE_SIZE = 1 << PAGE_BITS
+
+    def __init__(self):
+        self.pages = {}
+        self.written = set()
+
+    def _page(self, address: int) -> bytearray:
+        page = self.pages.get(address >> self.PAGE_BITS)
+        if page is None:
+            page = self.pages[address >> self.PAGE_BITS] = bytearray(self.PAGE_SIZE)
+        return page
+
+    def load(self, address: int, size: int) -> int:
+        offset = address & (self.PAGE_SIZE - 1)
+        if offset + size <= self.PAGE_SIZE:
+            page = self.pages.get(address >> self.PAGE_BITS)
+            return int.from_bytes(page[offset:offset + size], 'little') if page is not None else 0
+        return sum(self.load((address + k) & MASK, 1) << (8 * k) for k in range(size))
+
+    def store(self, address: int, value: int, size: int, track: bool = True):
+        offset = address & (self.PAGE_SIZE - 1)
+        if offset + size <= self.PAGE_SIZE:
+            self._page(address)[offset:offset + size] = value.to_bytes(size, 'little')
+        else:
+            for k in range(size):
+                self.store((address + k) & MASK, (value >> (8 * k)) & 0xFF, 1, False)
+        if track:
+            self.written.add(address & ~3)
+            if (address & 3) + size > 4:
+                self.written.add((address + 4) & ~3 & MASK)
+
+    def load_image(self, words: array, base: int):
+        """Copy little-endian words to memory at base, a page at a time"""
+        data = array('I', words)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        data = data.tobytes()
+        address, position = base & MASK, 0
+        while position < len(data):
+            offset = address & (self.PAGE_SIZE - 1)
+            count = min(self.PAGE_SIZE - offset, len(data) - position)
+            self._page(address)[offset:offset + count] = data[position:position + count]
+            address = (address + count) & MASK
+            position += count
+
+class CV32E40PInstructionSetSimulator:
+    """Executes a program image and reports its architectural end state.
+
+    The image is decoded once into a table of (handler, operands) entries; a
+    handler updates the register file and returns the index of the next
+    instruction, so the inner loop is one indexed call per instruction. The
+    program is loaded at base_address in a unified memory, but instructions
+    are fetched from the predecoded table: stores into the program do not
+    modify code.
+
+    Execution ends at the program's closing jump back to the entry point, when
+    control leaves the image (a jalr through a register not holding a code
+    address), or after max_instructions. The retire trace is summarized as a
+    SHA-256 signature over one (pc, rd, rd value) little-endian 32-bit triple
+    per retired instruction, with rd and value 0 for instructions that write
+    no register.
+    mcycle has no timing to follow and reads as the retired instruction count;
+    such reads are counted in cycle_reads so comparisons can discount them.
+    """
+
+    def __init__(self, words: array, base_address: int = DEFAULT_BASE_ADDRESS,
+                 end_index: int = None):
+        self.words = array('I', words)
+        self.base_address = base_address
+        self.memory = SparseMemory()
+        self.memory.load_image(self.words, base_address)
+        self.x = [0] * 33  # x0-x31, plus a sink for writes to x0
+        self.csrs = dict(CSR_RESET)
+        self.instret_offset = 0
+        self.cycle_offset = 0
+        self.cycle_reads = 0
+        self.retired = 0
+        self.index = 0
+        self.exit_reason = None
+        self.end_index = self._find_end() if end_index is None else end_index
+        self._trace = array('I')
+        self._hash = hashlib.sha256()
+        collecting = gc.isenabled()
+        gc.disable()  # The handler table is acyclic: skip collector passes while it grows
+        try:
+            self.program, self.rds = self._compile()
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _find_end(self) -> int:
+        """Index of the closing loop-back jump ('j _start', or the auipc of 'tail _start')"""
+        n = len(self.words)
+        if n >= 2 and self.words[-1] & 0x7F == OPCODE_JALR and self.words[-2] & 0x7F == OPCODE_AUIPC:
+            return n - 2
+        return max(n - 1, 0)
+
+    def _compile(self) -> Tuple[List[tuple], array]:
+        """Handler table entries, and the register each instruction writes (0 for none)"""
+        mnemonics, rds, rs1s, rs2s, imms = decode_image(self.words)
+        handlers = dict(HANDLERS, **self._handlers())
+        base, size = self.base_address, len(self.words)
+        program = []
+        append = program.append
+        written = []
+        for i, (mnemonic, rd, a, b, imm) in enumerate(zip(mnemonics, rds, rs1s, rs2s, imms)):
+            r = rd
+            if mnemonic in LOAD_TIME_OPERANDS:
+                pc = (base + 4 * i) & MASK
+                fmt = ENCODINGS[mnemonic][0]
+                if fmt in ('S', 'B'):
+                    r = 0
+                if mnemonic in ('jal', 'jalr'):
+                    b = (pc + 4) & MASK
+                if fmt in ('B', 'J'):
+                    # Targets outside the image fault, carrying their address past FAULT
+                    k, misaligned = divmod(imm, 4)
+                    imm = i + k if not misaligned and 0 <= i + k < size else FAULT + ((pc + imm) & MASK)
+                elif mnemonic == 'auipc':
+                    imm = (pc + imm) & MASK
+                elif mnemonic == 'cv.clip':
+                    # Clip to [-2^(Is2-1), 2^(Is2-1) - 1]; Is2 = 0 clips to [-1, 0]
+                    imm = (-(1 << (imm - 1)), (1 << (imm - 1)) - 1) if imm else (-1, 0)
+                elif fmt in ('CSR', 'CSRI'):
+                    imm = CSR_NAMES.get(imm, f"0x{imm:03x}")
+                elif mnemonic in ('andi', 'ori', 'xori'):
+                    imm &= MASK
+            written.append(r)
+            append((handlers[mnemonic], rd or 32, a, b, imm, r))
+        return program, array('I', written)
+
+    def _handlers(self) -> Dict[str, Callable]:
+        """Handlers bound to this simulator's memory, CSRs and image bounds"""
+        handlers = {}
+        memory = self.memory
+        for mnemonic, (size, signed) in LOAD_ACCESSES.items():
+            handlers[mnemonic] = self._load_handler(memory.load, size, signed)
+        for mnemonic, size in STORE_SIZES.items():
+            handlers[mnemonic] = self._store_handler(memory.store, size)
+
+        base, size = self.base_address, len(self.words)
+
+        def jalr(x, d, a, b, imm, i):
+            address = (x[a] + imm) & 0xFFFFFFFE
+            x[d] = b
+            k, r = divmod((address - base) & MASK, 4)
+            return FAULT + address if r or k >= size else k
+        handlers['jalr'] = jalr
+
+        access = self._csr_access
+        for mnemonic, (fmt, _, _, _) in ENCODINGS.items():
+            if fmt == 'CSR':
+                def csr(x, d, a, b, imm, i, mnemonic=mnemonic):
+                    x[d] = access(mnemonic, imm, x[a], a != 0)
+                    return i + 1
+                handlers[mnemonic] = csr
+            elif fmt == 'CSRI':
+                def csri(x, d, a, b, imm, i, mnemonic=mnemonic):
+                    x[d] = access(mnemonic, imm, a, a != 0)
+                    return i + 1
+                handlers[mnemonic] = csri
+        return handlers
+
+    @staticmethod
+    def _load_handler(load: Callable, size: int, signed: bool) -> Callable:
+        sign = 1 << (8 * size - 1)
+        extend = (MASK << (8 * size)) & MASK
+
+        def handler(x, d, a, b, imm, i):
+            value = load((x[a] + imm) & MASK, size)
+            x[d] = value | extend if signed and value & sign else value
+            return i + 1
+        return handler
+
+    @staticmethod
+    def _store_handler(store: Callable, size: int) -> Callable:
+        value_mask = (1 << (8 * size)) - 1
+
+        def handler(x, d, a, b, imm, i):
+            store((x[a] + imm) & MASK, x[b] & value_mask, size)
+            return i + 1
+        return handler
+
+    def _csr_access(self, mnemonic: str, csr: str, source: int, source_nonzero: bool) -> int:
+        """Read-modify-write of a CSR; returns the old value"""
+        retired = self.retired + len(self._trace) // 2  # Instructions retired before this one
+        if csr == 'minstret':
+            old = (retired + self.instret_offset) & MASK
+        elif csr == 'mcycle':
+            old = (retired + self.cycle_offset) & MASK
+            self.cycle_reads += 1
+        else:
+            old = self.csrs.get(csr, 0)
+
+        if mnemonic in ('csrrw', 'csrrwi'):
+            new = source
+        elif not source_nonzero:
+            return old  # csrrs/csrrc with x0 only read
+        elif mnemonic == 'csrrs':
+            new = old | source
+        else:
+            new = old & ~source & MASK
+
+        # Counter writes are seen by the next instruction
+        if csr == 'minstret':
+            self.instret_offset = new - (retired + 1)
+        elif csr == 'mcycle':
+            self.cycle_offset = new - (retired + 1)
+        elif csr in CSR_WRITE_MASKS:
+            mask = CSR_WRITE_MASKS[csr]
+            self.csrs[csr] = (CSR_RESET[csr] & ~mask) | (new & mask)
+        return old
+
+    def _flush_trace(self):
+        """Fold buffered (index, rd value) pairs into the trace signature"""
+        trace = self._trace
+        if not trace:
+            return
+        if np is not None:
+            pairs = np.frombuffer(trace, dtype=np.uint32).reshape(-1, 2)
+            records = np.empty((len(pairs), 3), dtype='<u4')
+            records[:, 0] = (pairs[:, 0].astype(np.uint64) * 4 + self.base_address) & MASK
+            records[:, 1] = np.frombuffer(self.rds, dtype=np.uint32)[pairs[:, 0]]
+            records[:, 2] = pairs[:, 1]
+            self._hash.update(records.tobytes())
+            del pairs  # Release the view on the trace buffer before it is cleared
+        else:
+            records = array('I')
+            for k in range(0, len(trace), 2):
+                i = trace[k]
+                records.extend(((self.base_address + 4 * i) & MASK, self.rds[i], trace[k + 1]))
+            if sys.byteorder == 'big':
+                records.byteswap()
+            self._hash.update(records.tobytes())
+        self.retired += len(trace) // 2
+        del trace[:]
+
+    def run(self, max_instructions: int = 1000000) -> str:
+        """Execute up to max_instructions more instructions; returns the exit reason"""
+        program, x = self.program, self.x
+        end = self.end_index
+        trace = self._trace
+        append = trace.append
+        i = self.index
+        remaining = max_instructions
+
+        while remaining > 0 and i < end:
+            for _ in range(min(remaining, TRACE_CHUNK)):
+                if i >= end:
+                    break
+                handler, d, a, b, imm, r = program[i]
+                nxt = handler(x, d, a, b, imm, i)
+                append(i)
+                append(x[r])
+                i = nxt
+            remaining -= len(trace) // 2
+            self._flush_trace()
+
+        self.index = i
+        if i >= FAULT:
+            self.exit_reason = 'fetch_fault'
+        elif i >= end:
+            self.exit_reason = 'end_of_program'
+        else:
+            self.exit_reason = 'instruction_limit'
+        return self.exit_reason
+
+    @property
+    def pc(self) -> int:
+        return self.index - FAULT if self.index >= FAULT else (self.base_address + 4 * self.index) & MASK
+
+    def signature(self) -> Dict:
+        """End-of-test state: registers, CSRs, memory writes and retire trace signature"""
+        retired = self.retired
+        csrs = {name: f"0x{value:08x}" for name, value in self.csrs.items()}
+        csrs['minstret'] = f"0x{(retired + self.instret_offset) & MASK:08x}"
+        csrs['mcycle'] = f"0x{(retired + self.cycle_offset) & MASK:08x}"
+        return {
+            'exit_reason': self.exit_reason,
+            'retired_instructions': retired,
+            'pc': f"0x{self.pc:08x}",
+            'base_address': f"0x{self.base_address:08x}",
+            'registers': [f"0x{value:08x}" for value in self.x[:32]],
+            'csrs': csrs,
+            'cycle_reads': self.cycle_reads,
+            'memory_writes': {f"0x{address:08x}": f"0x{self.memory.load(address, 4):08x}"
+                              for address in sorted(self.memory.written)},
+            'trace_signature': self._hash.hexdigest(),
+        }
+
+def load_program(path: str) -> array:
+    """Instruction words of a generated program (.s assembly, .hex or .bin image)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.hex':
+        with open(path, 'r') as f:
+            return array('I', (int(line, 16) for line in f if line.strip()))
+    if ext == '.bin':
+        words = array('I')
+        with open(path, 'rb') as f:
+            words.frombytes(f.read())
+        if sys.byteorder == 'big':
+            words.byteswap()
+        return words
+
+    from generate_assembly import CV32E40PAssemblyGenerator
+    encoder = CV32E40PAssemblyGenerator().create_encoder()
+    with open(path, 'r') as f:
+        return array('I', encoder.assemble_stream(f, forward_only=True))
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a generated CV32E40P program and compute its end-state signature')
+    parser.add_argument('input', nargs='?', help='Program written by generate_assembly.py (.s, .hex or .bin)')
+    parser.add_argument('--base-address', type=lambda v: int(v, 0), default=DEFAULT_BASE_ADDRESS,
+                       help='Load and boot address (default 0x180)')
+    parser.add_argument('--max-instructions', type=int, default=10000000,
+                       help='Stop after this many retired instructions')
+    parser.add_argument('--output', '-o',
+                       help='Signature JSON file (default <input stem>_signature.json)')
+    parser.add_argument('--self-check', action='store_true',
+                       help='Check the operation tables against known results, run generated programs '
+                            'to their end and exit')
+
+    args = parser.parse_args()
+
+    if args.self_check:
+        failures = self_check()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        checks = len(REFERENCE_RESULTS) + len(SELF_CHECK_PROGRAMS)
+        print(f"{checks - len(failures)}/{checks} reference results and generated programs check out")
+        return 1 if failures else 0
+    if args.input is None:
+        parser.error('an input program is required')
+
+    try:
+        words = load_program(args.input)
+        simulator = CV32E40PInstructionSetSimulator(words, args.base_address)
+    except (EncodingError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    start = time.perf_counter()
+    simulator.run(args.max_instructions)
+    elapsed = time.perf_counter() - start
+
+    signature = simulator.signature()
+    output = args.output or os.path.splitext(args.input)[0] + '_signature.json'
+    with open(output, 'w') as f:
+        json.dump(signature, f, indent=2)
+
+    rate = signature['retired_instructions'] / elapsed if elapsed > 0 else 0
+    print(f"Retired {signature['retired_instructions']} instructions ({signature['exit_reason']}, "
+          f"pc {signature['pc']}) at {rate:,.0f} instructions/s")
+    print(f"Trace signature: {signature['trace_signature']}")
+    print(f"Signature written to {output}")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Log Parse Cache
+Persistent store of per-log parse results for the coverage analyzers, so a
+repeated analysis only parses logs that are new or have changed
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+PARSE_CACHE = "parse_cache.db"
+DEFAULT_CACHE_MB = 256
+
+# Bytes hashed from each end of a log for its fingerprint; a rewrite changes the head or the report at the tail
+FINGERPRINT_BYTES = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    parser TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (parser, path)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+def fingerprint(path: Path, size: int) -> str:
+    """Hash of a file's size and its first and last FINGERPRINT_BYTES"""
+    h = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            h.update(f.read())
+    return h.hexdigest()
+
+class CV32E40PParseCache:
+    """Parse results of one parser, keyed by log path and validated by size, mtime and fingerprint.
+
+    Entries written by another parser version are dropped on open. The
+    stored results of all parsers are kept under max_bytes by evicting the
+    least recently used entries when the cache is closed.
+    """
+
+    def __init__(self, path: Path, parser: str, version: int, max_bytes: int):
+        self.path = Path(path)
+        self.parser = parser
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), timeout=60)
+        self.connection.executescript(SCHEMA)
+        with self.connection:
+            self.connection.execute("DELETE FROM entries WHERE parser = ? AND version != ?", (parser, version))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Evict beyond the size bound and commit this analysis's lookups and results in one transaction"""
+        with self.connection:
+            self.evict()
+        self.connection.close()
+
+    def lookup(self, log_file) -> Tuple[Optional[Dict], Tuple]:
+        """Cached result of a log (None when it must be parsed) and the identity to store a new one under"""
+        path = Path(log_file).resolve()
+        stat = path.stat()
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, fingerprint, result FROM entries WHERE parser = ? AND path = ?",
+            (self.parser, str(path))).fetchone()
+        # Size and mtime rule most changes out before the fingerprint reads anything
+        if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+            digest = fingerprint(path, stat.st_size)
+            if digest == row[2]:
+                self.hits += 1
+                self.connection.execute("UPDATE entries SET last_used = ? WHERE parser = ? AND path = ?",
+                                        (time.time(), self.parser, str(path)))
+                return json.loads(row[3]), (str(path), stat.st_size, stat.st_mtime_ns, digest)
+        else:
+            digest = None
+        self.misses += 1
+        return None, (str(path), stat.st_size, stat.st_mtime_ns, digest)
+
+    def store(self, identity: Tuple, result: Dict) -> None:
+        path, size, mtime_ns, digest = identity
+        if digest is None:
+            digest = fingerprint(Path(path), size)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.parser, path, size, mtime_ns, digest, self.version, json.dumps(result), time.time()))
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the stored results fit max_bytes"""
+        total = self.connection.execute("SELECT COALESCE(SUM(LENGTH(result)), 0) FROM entries").fetchone()[0]
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+        rows = self.connection.execute(
+            "SELECT parser, path, LENGTH(result) FROM entries ORDER BY last_used").fetchall()
+        for parser, path, length in rows:
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM entries WHERE parser = ? AND path = ?", (parser, path))
+            total -= length
+            evicted += 1
+        return evicted
+
+def parse_logs(log_files: Dict[str, str], worker: Callable[[str, str], Dict], jobs: int = 1,
+               cache: Optional[CV32E40PParseCache] = None) -> Dict[str, Dict]:
+    """Parse each test's log with worker(test_name, log_file), returning results in log_files order.
+
+    Logs with a valid cache entry are not parsed again; the rest are
+    parsed in `jobs` processes and cached. Merging in input order keeps
+    the outcome independent of the order workers finish in.
+    """
+    results, identities = {}, {}
+    if cache is not None:
+        for test_name, log_file in log_files.items():
+            results[test_name], identities[test_name] = cache.lookup(log_file)
+    pending = [test_name for test_name in log_files if results.get(test_name) is None]
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(pool.map(worker, pending, [log_files[t] for t in pending],
+                                   chunksize=max(1, len(pending) // (jobs * 4))))
+    else:
+        parsed = [worker(test_name, log_files[test_name]) for test_name in pending]
+    for test_name, result in zip(pending, parsed):
+        results[test_name] = result
+        if cache is not None:
+            cache.store(identities[test_name], result)
+    return {test_name: results[test_name] for test_name in log_files}
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+CV32E40P Pipeline Timing Model
+Static cycle estimate of generated programs on the 4-stage CV32E40P pipeline
+"""
+
+from typing import Dict, Sequence
+
+LOAD_MNEMONICS = {'lb', 'lbu', 'lh', 'lhu', 'lw'}
+
+# Kinds of instruction, by how they occupy the pipeline
+KIND_SINGLE = 0     # One cycle in EX, result forwarded to the next instruction
+KIND_LOAD = 1       # Result available from WB: one load-use stall for a direct consumer
+KIND_MULTI = 2      # Multi-cycle in EX (mulh*, div/rem), stalls the pipeline behind it
+KIND_BRANCH = 3     # Resolved in EX, taken branches flush IF and ID
+KIND_JAL = 4        # Target known in ID, one fetch bubble
+KIND_JALR = 5       # Like jal, but reads rs1 in ID without EX forwarding
+
+# Penalty cycles
+BRANCH_TAKEN_PENALTY = 2
+JUMP_PENALTY = 1
+
+STALL_CAUSES = ('load_use', 'jump_register', 'multicycle', 'branch', 'jump')
+
+class CV32E40PPipelineModel:
+    """Walks an instruction stream with a per-register ready-cycle scoreboard.
+
+    `cycle` is the cycle in which the next instruction can enter EX, and
+    ready[r] the first cycle in which an EX-stage consumer can read register
+    r through the forwarding paths. Assumptions: single-cycle memories, no
+    interrupts, multi-cycle instructions take the template's cycle count, and
+    branch direction is unknown statically, so each branch costs
+    branch_taken_probability * BRANCH_TAKEN_PENALTY cycles.
+    """
+
+    def __init__(self, branch_taken_probability: float = 0.5):
+        self.branch_taken_probability = branch_taken_probability
+        self.ready = [0] * 32
+        self.cycle = 0
+        self.instructions = 0
+        self.stalls = {cause: 0 for cause in STALL_CAUSES}
+        self._profiles = {}
+
+    def _profile(self, template) -> tuple:
+        """(kind, EX occupancy, reads rs1, reads rs2, writes rd) of a template"""
+        profile = self._profiles.get(template.mnemonic)
+        if profile is None:
+            fields = template.fields
+            if template.mnemonic in LOAD_MNEMONICS:
+                kind = KIND_LOAD
+            elif template.mnemonic == 'jal':
+                kind = KIND_JAL
+            elif template.mnemonic == 'jalr':
+                kind = KIND_JALR
+            elif 'label' in fields:
+                kind = KIND_BRANCH
+            elif template.cycles > 1:
+                kind = KIND_MULTI
+            else:
+                kind = KIND_SINGLE
+            occupancy = template.cycles if kind == KIND_MULTI else 1
+            profile = (kind, occupancy, 'rs1' in fields, 'rs2' in fields, 'rd' in fields)
+            self._profiles[template.mnemonic] = profile
+        return profile
+
+    def issue(self, template, rd: int, rs1: int, rs2: int):
+        """Account for one instruction"""
+        self.issue_many([template], [0], [rd], [rs1], [rs2])
+
+    def issue_many(self, templates: Sequence, template_idx: Sequence[int],
+                   rd: Sequence[int], rs1: Sequence[int], rs2: Sequence[int]):
+        """Account for a run of instructions; template_idx indexes templates"""
+        profiles = [self._profile(t) for t in templates]
+        ready = self.ready
+        cycle = self.cycle
+        load_use = jump_register = multicycle = branches = jumps = 0
+
+        for t, d, s1, s2 in zip(template_idx, rd, rs1, rs2):
+            kind, occupancy, reads_rs1, reads_rs2, writes_rd = profiles[t]
+
+            # RAW hazards: wait until every source can be forwarded
+            start = cycle
+            if kind == KIND_JALR:
+                # rs1 is read in ID, a cycle before EX forwarding could supply it
+                if ready[s1] + 1 > start:
+                    start = ready[s1] + 1
+                    jump_register += start - cycle
+            else:
+                if reads_rs1 and ready[s1] > start:
+                    start = ready[s1]
+                if reads_rs2 and ready[s2] > start:
+                    start = ready[s2]
+                load_use += start - cycle
+
+            cycle = start + occupancy
+            if writes_rd and d:
+                ready[d] = cycle + 1 if kind == KIND_LOAD else cycle
+            if kind == KIND_MULTI:
+                multicycle += occupancy - 1
+            elif kind == KIND_BRANCH:
+                branches += 1
+            elif kind >= KIND_JAL:
+                cycle += JUMP_PENALTY
+                jumps += JUMP_PENALTY
+
+        self.cycle = cycle
+        self.instructions += len(template_idx)
+        self.stalls['load_use'] += load_use
+        self.stalls['jump_register'] += jump_register
+        self.stalls['multicycle'] += multicycle
+        self.stalls['branch'] += branches * self.branch_taken_probability * BRANCH_TAKEN_PENALTY
+        self.stalls['jump'] += jumps
+
+    @property
+    def predicted_cycles(self) -> float:
+        return self.cycle + self.stalls['branch']
+
+    def report(self) -> Dict:
+        """Predicted cycles, IPC and stall cycles per cause"""
+        cycles = self.predicted_cycles
+        return {
+            'predicted_cycles': round(cycles, 2),
+            'predicted_ipc': self.instructions / cycles if cycles else 0,
+            'stall_cycles': {cause: round(n, 2) for cause, n in self.stalls.items()},
+            'branch_taken_probability': self.branch_taken_probability,
+        }
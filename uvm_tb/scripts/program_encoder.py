@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+CV32E40P Program Encoder
+Encodes generated assembly programs directly into machine code images,
+without an external assembler or linker
+"""
+
+import argparse
+import re
+import sys
+from array import array
+from collections import deque
+from contextlib import ExitStack
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Register names used by the generator (ABI names for x0-x2, xN otherwise)
+REGISTER_NUMBERS = {f"x{i}": i for i in range(32)}
+REGISTER_NUMBERS.update({'zero': 0, 'ra': 1, 'sp': 2})
+
+CSR_ADDRESSES = {
+    'mstatus': 0x300,
+    'mie': 0x304,
+    'mtvec': 0x305,
+    'mepc': 0x341,
+    'mcause': 0x342,
+    'mcycle': 0xB00,
+    'minstret': 0xB02,
+}
+
+# Major opcodes
+OPCODE_AUIPC = 0b0010111
+OPCODE_OP = 0b0110011
+OPCODE_OP_IMM = 0b0010011
+OPCODE_LOAD = 0b0000011
+OPCODE_STORE = 0b0100011
+OPCODE_BRANCH = 0b1100011
+OPCODE_JAL = 0b1101111
+OPCODE_JALR = 0b1100111
+OPCODE_SYSTEM = 0b1110011
+OPCODE_CUSTOM_1 = 0b0101011  # CORE-V ALU and bit manipulation
+OPCODE_CUSTOM_3 = 0b1111011  # CORE-V SIMD
+
+# mnemonic -> (format, opcode, funct3, funct7)
+ENCODINGS = {
+    # RV32I register-register
+    'add': ('R', OPCODE_OP, 0b000, 0b0000000),
+    'sub': ('R', OPCODE_OP, 0b000, 0b0100000),
+    'sll': ('R', OPCODE_OP, 0b001, 0b0000000),
+    'slt': ('R', OPCODE_OP, 0b010, 0b0000000),
+    'sltu': ('R', OPCODE_OP, 0b011, 0b0000000),
+    'xor': ('R', OPCODE_OP, 0b100, 0b0000000),
+    'srl': ('R', OPCODE_OP, 0b101, 0b0000000),
+    'sra': ('R', OPCODE_OP, 0b101, 0b0100000),
+    'or': ('R', OPCODE_OP, 0b110, 0b0000000),
+    'and': ('R', OPCODE_OP, 0b111, 0b0000000),
+    # RV32I register-immediate
+    'addi': ('I', OPCODE_OP_IMM, 0b000, 0),
+    'xori': ('I', OPCODE_OP_IMM, 0b100, 0),
+    'ori': ('I', OPCODE_OP_IMM, 0b110, 0),
+    'andi': ('I', OPCODE_OP_IMM, 0b111, 0),
+    'slli': ('SHIFT', OPCODE_OP_IMM, 0b001, 0b0000000),
+    'srli': ('SHIFT', OPCODE_OP_IMM, 0b101, 0b0000000),
+    'srai': ('SHIFT', OPCODE_OP_IMM, 0b101, 0b0100000),
+    # RV32M
+    'mul': ('R', OPCODE_OP, 0b000, 0b0000001),
+    'mulh': ('R', OPCODE_OP, 0b001, 0b0000001),
+    'mulhsu': ('R', OPCODE_OP, 0b010, 0b0000001),
+    'mulhu': ('R', OPCODE_OP, 0b011, 0b0000001),
+    'div': ('R', OPCODE_OP, 0b100, 0b0000001),
+    'divu': ('R', OPCODE_OP, 0b101, 0b0000001),
+    'rem': ('R', OPCODE_OP, 0b110, 0b0000001),
+    'remu': ('R', OPCODE_OP, 0b111, 0b0000001),
+    # Loads and stores
+    'lb': ('I', OPCODE_LOAD, 0b000, 0),
+    'lh': ('I', OPCODE_LOAD, 0b001, 0),
+    'lw': ('I', OPCODE_LOAD, 0b010, 0),
+    'lbu': ('I', OPCODE_LOAD, 0b100, 0),
+    'lhu': ('I', OPCODE_LOAD, 0b101, 0),
+    'sb': ('S', OPCODE_STORE, 0b000, 0),
+    'sh': ('S', OPCODE_STORE, 0b001, 0),
+    'sw': ('S', OPCODE_STORE, 0b010, 0),
+    # Control flow
+    'beq': ('B', OPCODE_BRANCH, 0b000, 0),
+    'bne': ('B', OPCODE_BRANCH, 0b001, 0),
+    'blt': ('B', OPCODE_BRANCH, 0b100, 0),
+    'bge': ('B', OPCODE_BRANCH, 0b101, 0),
+    'bltu': ('B', OPCODE_BRANCH, 0b110, 0),
+    'bgeu': ('B', OPCODE_BRANCH, 0b111, 0),
+    'jal': ('J', OPCODE_JAL, 0, 0),
+    'auipc': ('U', OPCODE_AUIPC, 0, 0),
+    'jalr': ('I', OPCODE_JALR, 0b000, 0),
+    # Zicsr
+    'csrrw': ('CSR', OPCODE_SYSTEM, 0b001, 0),
+    'csrrs': ('CSR', OPCODE_SYSTEM, 0b010, 0),
+    'csrrc': ('CSR', OPCODE_SYSTEM, 0b011, 0),
+    'csrrwi': ('CSRI', OPCODE_SYSTEM, 0b101, 0),
+    # CORE-V PULP ALU (immediate operand of cv.clip goes in the rs2 field)
+    'cv.abs': ('R', OPCODE_CUSTOM_1, 0b011, 0b0101000),
+    'cv.min': ('R', OPCODE_CUSTOM_1, 0b011, 0b0101011),
+    'cv.max': ('R', OPCODE_CUSTOM_1, 0b011, 0b0101101),
+    'cv.clip': ('R', OPCODE_CUSTOM_1, 0b011, 0b0111000),
+    'cv.cnt': ('R', OPCODE_CUSTOM_1, 0b011, 0b0100100),
+    # CORE-V SIMD (funct5/F/R packed into funct7, funct3 selects .h/.b)
+    'cv.add.h': ('R', OPCODE_CUSTOM_3, 0b000, 0b0000000),
+    'cv.add.b': ('R', OPCODE_CUSTOM_3, 0b001, 0b0000000),
+    'cv.sub.h': ('R', OPCODE_CUSTOM_3, 0b000, 0b0000100),
+    'cv.sub.b': ('R', OPCODE_CUSTOM_3, 0b001, 0b0000100),
+}
+
+# Pseudo-instructions emitted by the generator: mnemonic -> (real mnemonic, fixed operands)
+PSEUDO_INSTRUCTIONS = {
+    'nop': ('addi', {'rd': 'zero', 'rs1': 'zero', 'imm12': 0}),
+    'j': ('jal', {'rd': 'zero'}),
+}
+
+# Range of a jal offset; farther jumps use the two-word 'tail' pseudo-instruction
+JAL_RANGE = 1 << 20
+
+# Scratch register used by 'tail', as in the GNU assembler
+TAIL_SCRATCH = 'x6'
+
+# Legal ranges of immediate operands, before any field packing
+IMMEDIATE_LIMITS = {
+    'imm12': (-2048, 2047),
+    'offset': (-2048, 2047),
+    'shamt': (0, 31),
+    'uimm5': (0, 31),
+    'imm5': (-16, 15),
+}
+
+class EncodingError(ValueError):
+    pass
+
+def pack_instruction(fmt: str, opcode: int, funct3: int, funct7: int, rd, rs1, rs2, imm):
+    """Pack instruction fields into a word, or NumPy arrays of fields into an array of words.
+
+    imm is the byte offset or immediate value; for CSR formats it is the CSR
+    address, with the source register or 5-bit immediate in rs1. R-format
+    immediates (cv.clip) are passed in rs2. Ranges are not checked.
+    """
+    if fmt == 'R':
+        return (funct7 << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+    if fmt == 'I':
+        return ((imm & 0xFFF) << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+    if fmt == 'SHIFT':
+        return (funct7 << 25) | (imm << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+    if fmt == 'S':
+        return (((imm >> 5) & 0x7F) << 25) | (rs2 << 20) | (rs1 << 15) | (funct3 << 12) | \
+               ((imm & 0x1F) << 7) | opcode
+    if fmt == 'B':
+        return (((imm >> 12) & 1) << 31) | (((imm >> 5) & 0x3F) << 25) | (rs2 << 20) | \
+               (rs1 << 15) | (funct3 << 12) | (((imm >> 1) & 0xF) << 8) | \
+               (((imm >> 11) & 1) << 7) | opcode
+    if fmt == 'U':
+        return ((((imm + 0x800) >> 12) & 0xFFFFF) << 12) | (rd << 7) | opcode
+    if fmt == 'J':
+        return (((imm >> 20) & 1) << 31) | (((imm >> 1) & 0x3FF) << 21) | \
+               (((imm >> 11) & 1) << 20) | (((imm >> 12) & 0xFF) << 12) | (rd << 7) | opcode
+    if fmt in ('CSR', 'CSRI'):
+        return (imm << 20) | (rs1 << 15) | (funct3 << 12) | (rd << 7) | opcode
+    raise EncodingError(f"Unsupported format '{fmt}'")
+
+class CV32E40PInstructionEncoder:
+    """Encodes InstructionTemplate instances and their operands into 32-bit words"""
+
+    def __init__(self, templates: Iterable = ()):
+        self.templates = {}
+        self._operand_patterns = {}
+        for template in templates:
+            self.add_template(template)
+        # Pseudo-instructions take their operand syntax from the footer and la lines the generator writes
+        self._operand_patterns['nop'] = (re.compile(r'$'), ())
+        self._operand_patterns['j'] = (re.compile(r'(?P<label>[^,\s()]+)$'), ('label',))
+        self._operand_patterns['tail'] = self._operand_patterns['j']
+        self._operand_patterns['la'] = (re.compile(r'(?P<rd>[^,\s()]+), (?P<label>[^,\s()]+)$'), ('rd', 'label'))
+
+    def add_template(self, template):
+        """Register a template so its assembly text can be parsed"""
+        if template.mnemonic not in ENCODINGS:
+            raise EncodingError(f"No encoding for mnemonic '{template.mnemonic}'")
+        self.templates[template.mnemonic] = template
+        pattern = re.escape(template.operands)
+        for name in template.fields:
+            pattern = pattern.replace(re.escape(f"{{{name}}}"), f"(?P<{name}>[^,\\s()]+)")
+        self._operand_patterns[template.mnemonic] = (re.compile(pattern + '$'), template.fields)
+
+    @staticmethod
+    def _register(name) -> int:
+        try:
+            return REGISTER_NUMBERS[name]
+        except KeyError:
+            raise EncodingError(f"Unknown register '{name}'")
+
+    @staticmethod
+    def _immediate(name: str, value) -> int:
+        value = int(value)
+        low, high = IMMEDIATE_LIMITS[name]
+        if not low <= value <= high:
+            raise EncodingError(f"{name} value {value} out of range [{low}, {high}]")
+        return value
+
+    def encode(self, mnemonic: str, operands: Dict, pc: int = 0,
+               labels: Dict[str, int] = None) -> int:
+        """Encode one instruction at address pc; labels maps label names to addresses"""
+        if mnemonic in PSEUDO_INSTRUCTIONS:
+            mnemonic, fixed = PSEUDO_INSTRUCTIONS[mnemonic]
+            operands = {**operands, **fixed}
+        try:
+            fmt, opcode, funct3, funct7 = ENCODINGS[mnemonic]
+        except KeyError:
+            raise EncodingError(f"No encoding for mnemonic '{mnemonic}'")
+
+        rd = self._register(operands['rd']) if 'rd' in operands else 0
+        rs1 = self._register(operands['rs1']) if 'rs1' in operands else 0
+        rs2 = self._register(operands['rs2']) if 'rs2' in operands else 0
+
+        imm = 0
+        for name in IMMEDIATE_LIMITS:
+            if name in operands:
+                imm = self._immediate(name, operands[name])
+                break
+        if 'label' in operands:
+            label = operands['label']
+            if labels is None or label not in labels:
+                raise EncodingError(f"Undefined label '{label}'")
+            imm = labels[label] - pc
+            if 'anchor' in operands:
+                # Low half of an auipc/jalr or auipc/addi pair, relative to the auipc
+                imm = labels[label] - operands['anchor']
+                imm -= ((imm + 0x800) >> 12) << 12
+
+        if fmt == 'R' and ('imm5' in operands or 'uimm5' in operands):
+            rs2 = imm & 0x1F
+        elif fmt == 'B' and (imm & 1 or not -4096 <= imm <= 4094):
+            raise EncodingError(f"Branch offset {imm} out of range")
+        elif fmt == 'J' and (imm & 1 or not -(1 << 20) <= imm < (1 << 20)):
+            raise EncodingError(f"Jump offset {imm} out of range")
+        elif fmt in ('CSR', 'CSRI'):
+            csr = operands['csr']
+            if fmt == 'CSRI':
+                rs1 = imm
+            imm = CSR_ADDRESSES[csr] if csr in CSR_ADDRESSES else int(csr, 0)
+        return pack_instruction(fmt, opcode, funct3, funct7, rd, rs1, rs2, imm)
+
+    def parse_line(self, line: str) -> Tuple[str, object]:
+        """Classify one line of generator output.
+
+        Returns ('label', name), ('instr', (mnemonic, operands)) or (None, None)
+        for blank lines, comments and directives.
+        """
+        line = line.split('#', 1)[0].strip()
+        if not line or line.startswith('.'):
+            return None, None
+        if line.endswith(':'):
+            return 'label', line[:-1]
+        mnemonic, _, text = line.partition(' ')
+        try:
+            pattern, fields = self._operand_patterns[mnemonic]
+        except KeyError:
+            raise EncodingError(f"No template for mnemonic '{mnemonic}'")
+        match = pattern.match(text.strip())
+        if not match:
+            raise EncodingError(f"Cannot parse operands of '{line}'")
+        return 'instr', (mnemonic, match.groupdict())
+
+    def assemble_stream(self, lines: Iterable[str], forward_only: bool = False,
+                        origin: int = 0, labels: Dict[str, int] = None) -> Iterator[int]:
+        """Encode a generated program line by line, yielding words in address order.
+
+        Labels are resolved to PC-relative offsets; instructions that reference
+        a label not yet defined are held back until it is. The first
+        instruction sits at address 0 and every offset is PC-relative, so the
+        image can be loaded at any boot address.
+
+        With forward_only, the program promises to reference only labels ahead
+        of the referencing instruction, apart from entry labels defined before
+        the first instruction (such as _start). Other labels are then forgotten
+        once no pending instruction needs them, keeping memory bounded for
+        arbitrarily long programs.
+
+        origin and labels continue a program already encoded up to address
+        origin, with the addresses of its labels.
+        """
+        labels = dict(labels or {})
+        recent_labels = []
+        pending = deque()
+        pc = origin
+
+        def resolvable(operands):
+            return 'label' not in operands or operands['label'] in labels
+
+        for line in lines:
+            kind, payload = self.parse_line(line)
+            if kind == 'label':
+                labels[payload] = pc
+                if pc:
+                    recent_labels.append(payload)
+                while pending and resolvable(pending[0][1]):
+                    mnemonic, operands, address = pending.popleft()
+                    yield self.encode(mnemonic, operands, address, labels)
+                if forward_only and not pending:
+                    for label in recent_labels:
+                        del labels[label]
+                    recent_labels.clear()
+            elif kind == 'instr':
+                mnemonic, operands = payload
+                if mnemonic == 'tail':
+                    # auipc + jalr pair reaching the whole address space
+                    label = operands['label']
+                    expanded = [('auipc', {'rd': TAIL_SCRATCH, 'label': label}),
+                                ('jalr', {'rd': 'zero', 'rs1': TAIL_SCRATCH,
+                                          'label': label, 'anchor': pc})]
+                elif mnemonic == 'la':
+                    # auipc + addi pair loading a label's address
+                    rd, label = operands['rd'], operands['label']
+                    expanded = [('auipc', {'rd': rd, 'label': label}),
+                                ('addi', {'rd': rd, 'rs1': rd, 'label': label, 'anchor': pc})]
+                else:
+                    expanded = [payload]
+                for mnemonic, operands in expanded:
+                    if not pending and resolvable(operands):
+                        yield self.encode(mnemonic, operands, pc, labels)
+                    else:
+                        pending.append((mnemonic, operands, pc))
+                    pc += 4
+
+        if pending:
+            raise EncodingError(f"Undefined label '{pending[0][1]['label']}'")
+
+    def assemble(self, lines: Iterable[str]) -> List[int]:
+        """Encode a generated program, resolving labels to PC-relative offsets"""
+        return list(self.assemble_stream(lines))
+
+def write_images(words: Iterable[int], hex_path: str = None, bin_path: str = None, chunk_words: int = 65536):
+    """Write the same words to a hex and a binary image in one pass, either path being optional"""
+    words = iter(words)
+    with ExitStack() as stack:
+        hex_file = stack.enter_context(open(hex_path, 'w')) if hex_path else None
+        bin_file = stack.enter_context(open(bin_path, 'wb')) if bin_path else None
+        chunk = array('I', islice(words, chunk_words))
+        while chunk:
+            if hex_file:
+                hex_file.writelines(f"{word:08x}\n" for word in chunk)
+            if bin_file:
+                if sys.byteorder == 'big':
+                    chunk.byteswap()
+                chunk.tofile(bin_file)
+            chunk = array('I', islice(words, chunk_words))
+
+def main():
+    parser = argparse.ArgumentParser(description='Encode generated CV32E40P assembly into machine code')
+    parser.add_argument('input', help='Assembly file written by generate_assembly.py')
+    parser.add_argument('--hex', help='Output $readmemh hex image')
+    parser.add_argument('--bin', help='Output raw binary image')
+
+    args = parser.parse_args()
+
+    if not args.hex and not args.bin:
+        parser.error('at least one of --hex/--bin is required')
+
+    from generate_assembly import CV32E40PAssemblyGenerator
+    generator = CV32E40PAssemblyGenerator()
+    encoder = CV32E40PInstructionEncoder(
+        t for templates in generator.instruction_templates.values() for t in templates)
+
+    try:
+        with open(args.input, 'r') as f:
+            words = encoder.assemble(f)
+    except EncodingError as e:
+        print(f"Error: {e}")
+        return 1
+
+    write_images(words, args.hex, args.bin)
+    if args.hex:
+        print(f"Hex image written to {args.hex}")
+    if args.bin:
+        print(f"Binary image written to {args.bin}")
+    print(f"Encoded {len(words)} instructions")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+CV32E40P Regression Results Database
+Indexed SQLite store of run records written by the test runner and the
+coverage analyzers, with a query CLI over the run history
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RESULTS_DB = "results.db"
+
+# Stored as the database's user_version; bumped when the schema changes
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded TEXT NOT NULL,
+    regression TEXT,
+    simulator TEXT,
+    test TEXT NOT NULL,
+    seed INTEGER,
+    build_signature TEXT,
+    status TEXT,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    peak_rss_mb REAL,
+    sim_cycles INTEGER,
+    instructions INTEGER,
+    errors INTEGER,
+    fatals INTEGER,
+    warnings INTEGER,
+    log_path TEXT,
+    log_mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_test ON runs (test, recorded);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, recorded);
+CREATE INDEX IF NOT EXISTS runs_recorded ON runs (recorded);
+CREATE INDEX IF NOT EXISTS runs_log ON runs (log_path, log_mtime_ns);
+CREATE INDEX IF NOT EXISTS runs_signature ON runs (build_signature);
+CREATE TABLE IF NOT EXISTS coverage (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    percent REAL NOT NULL,
+    PRIMARY KEY (run_id, category)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS coverage_category ON coverage (category, run_id);
+"""
+
+# Run record fields, in table order after id and recorded
+RUN_FIELDS = ('regression', 'simulator', 'test', 'seed', 'build_signature', 'status', 'wall_seconds',
+              'cpu_seconds', 'peak_rss_mb', 'sim_cycles', 'instructions', 'errors', 'fatals', 'warnings',
+              'log_path', 'log_mtime_ns')
+
+# Columns added by each schema version, applied in order to older databases
+MIGRATIONS = {
+    2: ["ALTER TABLE runs ADD COLUMN cpu_seconds REAL",
+        "ALTER TABLE runs ADD COLUMN peak_rss_mb REAL"],
+}
+
+class CV32E40PResultsDatabase:
+    """Run records with per-category coverage, one row per simulation run.
+
+    The runner records a run when it finishes; an analyzer reading the same
+    log later attaches its coverage and counts to that row, matched by log
+    path and modification time, or adds a row of its own for logs the
+    runner did not record.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent regressions and analyzers wait for each other's writes
+        self.connection = sqlite3.connect(str(self.path), timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self._create_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _create_schema(self) -> None:
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{self.path} was written by a newer schema (version {version})")
+        with self.connection:
+            if version:
+                for migration in range(version + 1, SCHEMA_VERSION + 1):
+                    for statement in MIGRATIONS[migration]:
+                        self.connection.execute(statement)
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    @staticmethod
+    def log_identity(log_path) -> Dict:
+        """Path and modification time identifying one run's log"""
+        path = Path(log_path).resolve()
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        return {'log_path': str(path), 'log_mtime_ns': mtime_ns}
+
+    @staticmethod
+    def log_run(log_path) -> Dict:
+        """Simulator, test and seed of the run that wrote a log.
+
+        They come from the metrics the runner writes beside the log, else
+        from a "<test>_<seed>" log name; empty when neither tells.
+        """
+        log_path = Path(log_path)
+        try:
+            with open(log_path.with_suffix('.metrics.json'), 'r') as f:
+                metrics = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            metrics = {}
+        if metrics.get('stage') == 'simulate' and metrics.get('test'):
+            return {key: metrics.get(key) for key in ('simulator', 'test', 'seed')}
+        test, _, seed = log_path.stem.rpartition('_')
+        if not test or not seed.isdigit():
+            return {}
+        return {'test': test, 'seed': int(seed)}
+
+    def _insert_run(self, record: Dict) -> int:
+        values = [time.strftime('%Y-%m-%dT%H:%M:%S')] + [record.get(field) for field in RUN_FIELDS]
+        cursor = self.connection.execute(
+            f"INSERT INTO runs (recorded, {', '.join(RUN_FIELDS)}) VALUES ({', '.join('?' * len(values))})",
+            values)
+        return cursor.lastrowid
+
+    def _set_coverage(self, run_id: int, coverage: Dict[str, float]) -> None:
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO coverage (run_id, category, percent) VALUES (?, ?, ?)",
+            [(run_id, category, float(percent)) for category, percent in coverage.items()])
+
+    def record_runs(self, records: List[Dict]) -> List[int]:
+        """Insert finished runs in one transaction; a record's 'coverage' maps category to percent"""
+        run_ids = []
+        with self.connection:
+            for record in records:
+                if record.get('log_path') is not None and 'log_mtime_ns' not in record:
+                    record = dict(record, **self.log_identity(record['log_path']))
+                run_id = self._insert_run(record)
+                self._set_coverage(run_id, record.get('coverage', {}))
+                run_ids.append(run_id)
+        return run_ids
+
+    def record_analysis(self, test_name: str, log_path, fields: Dict,
+                        coverage: Optional[Dict[str, float]] = None) -> int:
+        """Attach what an analyzer read from a log to the run that wrote it.
+
+        Fields only fill in what the runner left unrecorded, since its
+        counts come from the whole log; coverage replaces earlier values.
+        A log the runner never recorded gets its test and seed from
+        log_run(), falling back to test_name.
+        """
+        identity = self.log_identity(log_path)
+        fields = {key: value for key, value in fields.items() if key in RUN_FIELDS and value is not None}
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT id FROM runs WHERE log_path = ? AND log_mtime_ns IS ? ORDER BY id DESC LIMIT 1",
+                (identity['log_path'], identity['log_mtime_ns'])).fetchone()
+            if row is None:
+                run_id = self._insert_run({**fields, 'test': test_name, **self.log_run(log_path), **identity})
+            else:
+                run_id = row['id']
+                if fields:
+                    assignments = ', '.join(f"{key} = COALESCE({key}, ?)" for key in fields)
+                    self.connection.execute(f"UPDATE runs SET {assignments} WHERE id = ?",
+                                            list(fields.values()) + [run_id])
+            self._set_coverage(run_id, coverage or {})
+        return run_id
+
+    def _where(self, filters: Dict) -> tuple:
+        clauses, params = [], []
+        for column in ('test', 'simulator', 'status', 'seed', 'regression', 'build_signature'):
+            value = filters.get(column)
+            if value is not None:
+                clauses.append(f"runs.{column} = ?")
+                params.append(value)
+        if filters.get('since'):
+            clauses.append("runs.recorded >= ?")
+            params.append(filters['since'])
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def runs(self, limit: int = 50, **filters) -> List[Dict]:
+        """Matching runs, newest first, each with its coverage by category"""
+        where, params = self._where(filters)
+        rows = self.connection.execute(
+            f"SELECT * FROM runs{where} ORDER BY runs.id DESC LIMIT ?", params + [limit]).fetchall()
+        runs = {row['id']: dict(row, coverage={}) for row in rows}
+        if runs:
+            placeholders = ', '.join('?' * len(runs))
+            for row in self.connection.execute(
+                    f"SELECT run_id, category, percent FROM coverage WHERE run_id IN ({placeholders})",
+                    list(runs)):
+                runs[row['run_id']]['coverage'][row['category']] = row['percent']
+        return list(runs.values())
+
+    def summary(self, **filters) -> List[Dict]:
+        """Per-test run counts, pass rate, mean wall and CPU time, peak memory, cycles and overall coverage"""
+        where, params = self._where(filters)
+        rows = self.connection.execute(f"""
+            SELECT runs.test AS test, COUNT(*) AS runs,
+                   SUM(runs.status = 'PASS') AS passed,
+                   AVG(runs.wall_seconds) AS wall_seconds,
+                   AVG(runs.cpu_seconds) AS cpu_seconds,
+                   MAX(runs.peak_rss_mb) AS peak_rss_mb,
+                   AVG(runs.sim_cycles) AS sim_cycles,
+                   AVG(coverage.percent) AS overall_coverage,
+                   MAX(runs.recorded) AS last_run
+            FROM runs LEFT JOIN coverage
+                ON coverage.run_id = runs.id AND coverage.category = 'overall_coverage'{where}
+            GROUP BY runs.test ORDER BY runs.test""", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def coverage_trend(self, category: str = 'overall_coverage', **filters) -> List[Dict]:
+        """Daily mean and best coverage of a category per test"""
+        where, params = self._where(filters)
+        where = (where + " AND" if where else " WHERE") + " coverage.category = ?"
+        rows = self.connection.execute(f"""
+            SELECT runs.test AS test, substr(runs.recorded, 1, 10) AS day, COUNT(*) AS runs,
+                   AVG(coverage.percent) AS mean, MAX(coverage.percent) AS best
+            FROM coverage JOIN runs ON runs.id = coverage.run_id{where}
+            GROUP BY runs.test, day ORDER BY runs.test, day""", params + [category]).fetchall()
+        return [dict(row) for row in rows]
+
+def since_timestamp(value: str) -> str:
+    """--since as a recorded-time lower bound: a date, or a number of days like '7d'"""
+    if value.endswith('d') and value[:-1].isdigit():
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - int(value[:-1]) * 86400))
+    return value
+
+def format_value(value, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+def main():
+    parser = argparse.ArgumentParser(description='Query recorded CV32E40P regression results')
+    parser.add_argument('--db', default=str(Path(__file__).parent.parent / 'work' / RESULTS_DB),
+                       help=f'Results database (default work/{RESULTS_DB})')
+    parser.add_argument('--test', '-t', help='Only runs of this test')
+    parser.add_argument('--simulator', '-s', help='Only runs on this simulator')
+    parser.add_argument('--status', help='Only runs with this status (PASS, FAIL, KILLED, BUILD_FAIL, ERROR)')
+    parser.add_argument('--seed', type=int, help='Only runs with this seed')
+    parser.add_argument('--regression', help='Only runs of this regression')
+    parser.add_argument('--since', help="Only runs recorded since a date (YYYY-MM-DD) or for N days ('7d')")
+    parser.add_argument('--limit', '-n', type=int, default=50, help='Runs to list (default 50)')
+    parser.add_argument('--summary', action='store_true', help='Per-test totals instead of a run list')
+    parser.add_argument('--trend', nargs='?', const='overall_coverage', metavar='CATEGORY',
+                       help='Daily coverage trend of a category per test (default overall_coverage)')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Error: Results database {args.db} does not exist")
+        return 1
+    filters = {'test': args.test, 'simulator': args.simulator, 'status': args.status, 'seed': args.seed,
+               'regression': args.regression, 'since': since_timestamp(args.since) if args.since else None}
+
+    with CV32E40PResultsDatabase(Path(args.db)) as db:
+        if args.summary:
+            rows = db.summary(**filters)
+        elif args.trend:
+            rows = db.coverage_trend(args.trend, **filters)
+        else:
+            rows = db.runs(args.limit, **filters)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    if not rows:
+        print("No matching runs")
+        return 0
+
+    if args.summary:
+        print(f"{'Test':40s} {'Runs':>6s} {'Passed':>7s} {'Mean time':>10s} {'Mean CPU':>9s} {'Peak RSS':>9s} "
+              f"{'Mean cycles':>12s} {'Coverage':>9s}  Last run")
+        for row in rows:
+            print(f"{row['test']:40s} {row['runs']:>6d} {row['passed'] or 0:>7d} "
+                  f"{format_value(row['wall_seconds'], '.1f'):>9s}s {format_value(row['cpu_seconds'], '.1f'):>8s}s "
+                  f"{format_value(row['peak_rss_mb'], '.0f'):>6s} MB {format_value(row['sim_cycles'], '.0f'):>12s} "
+                  f"{format_value(row['overall_coverage'], '.2f'):>8s}%  {row['last_run']}")
+    elif args.trend:
+        print(f"{args.trend} by day:")
+        print(f"{'Test':40s} {'Day':10s} {'Runs':>6s} {'Mean':>8s} {'Best':>8s}")
+        for row in rows:
+            print(f"{row['test']:40s} {row['day']:10s} {row['runs']:>6d} {row['mean']:>7.2f}% {row['best']:>7.2f}%")
+    else:
+        print(f"{'Recorded':19s} {'Simulator':10s} {'Test':40s} {'Seed':>10s} {'Status':10s} "
+              f"{'Time':>7s} {'Cycles':>10s} {'Errors':>6s} {'Coverage':>9s}")
+        for row in rows:
+            print(f"{row['recorded']:19s} {row['simulator'] or '-':10s} {row['test']:40s} "
+                  f"{format_value(row['seed'], 'd'):>10s} {row['status'] or '-':10s} "
+                  f"{format_value(row['wall_seconds'], '.1f'):>6s}s {format_value(row['sim_cycles'], 'd'):>10s} "
+                  f"{format_value(row['errors'], 'd'):>6s} "
+                  f"{format_value(row['coverage'].get('overall_coverage'), '.2f'):>8s}%")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,17 +9,127 @@ import os
 import sys
 import json
 import argparse
+import contextlib
+import heapq
+import random
+import re
+import shutil
+import signal
+import sqlite3
 import subprocess
+import threading
+import time
 from pathlib import Path
 
+from results_db import RESULTS_DB, CV32E40PResultsDatabase
+from simulator_backends import BACKENDS, create_backend
+from simv_cache import DEFAULT_QUOTA_GB, CV32E40PSimulatorCache
+
+# Regression scheduling
+HISTORY_FILE = "regression_history.json"
+# Weight of the newest runtime in the recorded moving average
+HISTORY_SMOOTHING = 0.3
+# Rough runtime estimates for tests that have no recorded history yet
+DEFAULT_COMPILE_SECONDS = 60.0
+DEFAULT_SECONDS_PER_CYCLE = 0.01
+
+# Simulation kill rules; default_config and tests may override them under "kill_rules"
+DEFAULT_KILL_RULES = {
+    "abort_on_fatal": True,      # stop at the first UVM_FATAL
+    "max_uvm_errors": 10,        # stop once more UVM_ERRORs than this are reported
+    "idle_seconds": 600,         # stop when the simulator prints nothing for this long
+}
+# UVM report lines, but not the "UVM_ERROR :    3" rows of the closing report summary
+UVM_SEVERITY_RE = re.compile(r'^(UVM_FATAL|UVM_ERROR)\s+(?!:)')
+# Simulation time of a UVM report line, in ns (the testbench time unit)
+UVM_TIME_RE = re.compile(r'^UVM_\w+\s.*?@\s*(\d+)')
+UVM_WARNING_RE = re.compile(r'^UVM_WARNING\s+(?!:)')
+INSTRUCTIONS_RE = re.compile(r'Total Instructions Processed: (\d+)')
+# tb_top clock period, converting report times to simulated cycles
+CLOCK_PERIOD_NS = 10
+
+# Failing runs are simulated again with waves around the first error; default_config
+# "wave_rerun" overrides these, and an empty format picks the simulator's default
+DEFAULT_WAVE_RERUN = {
+    "window_ns": 10000,          # dump this long before the first error
+    "after_ns": 1000,            # and this long after it
+    "scope": "dut",              # tb_top, dut_if, dut or core
+    "depth": 0,                  # levels below the scope, 0 for all
+    "format": "",
+}
+
+def resource_usage(wall_seconds, rusage):
+    """Wall and CPU seconds and peak resident memory of a finished child process"""
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "user_seconds": round(rusage.ru_utime, 3),
+        "system_seconds": round(rusage.ru_stime, 3),
+        "cpu_seconds": round(rusage.ru_utime + rusage.ru_stime, 3),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+    }
+
+def write_metrics(log_path, metrics):
+    """Write a run's metrics as <log>.metrics.json beside its log"""
+    with open(log_path.with_suffix(".metrics.json"), 'w') as f:
+        json.dump(metrics, f, indent=2)
+
+def read_run_list(path):
+    """Seeds per test of a run list: one "<test> <seed>" per line, '#' starting a comment"""
+    runs = {}
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) != 2 or not fields[1].isdigit():
+                raise ValueError(f"{path}:{number}: expected '<test> <seed>', got '{line.strip()}'")
+            seeds = runs.setdefault(fields[0], [])
+            if int(fields[1]) not in seeds:
+                seeds.append(int(fields[1]))
+    return runs
+
+def seed_list(text):
+    """argparse type for --seeds: comma-separated non-negative integers"""
+    seeds = text.split(",")
+    if not all(seed.strip().isdigit() for seed in seeds):
+        raise argparse.ArgumentTypeError(f"expected comma-separated integer seeds, got '{text}'")
+    return [int(seed) for seed in seeds]
+
 class CV32E40PTestRunner:
-    def __init__(self):
-        self.script_dir = Path(__file__).parent
+    def __init__(self, simulator=None):
+        self.script_dir = Path(__file__).resolve().parent
         self.tb_root = self.script_dir.parent
         self.cv32e40p_root = self.tb_root.parent
         self.config_file = self.tb_root / "config" / "test_config.json"
         self.work_dir = self.tb_root / "work"
         self.config_data = None
+        # Simulator name (default_config "simulator" when None) and its backend, set up on first compile
+        self.simulator = simulator
+        self.backend = None
+        # Appended to log and run directory names so several simulators can share a work directory
+        self.run_suffix = ""
+        self.use_build_cache = True
+        self.build_cache = None
+        # Simulator image, build cache outcome ("hit"/"miss") and build signature per compiled test
+        self.images = {}
+        self.cache_results = {}
+        self.signatures = {}
+        # Resource usage of each compile, and metrics of each simulation by run name
+        self.compile_metrics = {}
+        self.run_metrics = {}
+        # Finished runs are recorded here; None turns recording off
+        self.results_db = self.work_dir / RESULTS_DB
+        # Why each killed run was stopped early, and command-line kill rule overrides
+        self.kill_reasons = {}
+        self.kill_rule_overrides = {}
+        # Rerun failures with waves: None follows each test's enable_waves, True/False forces it
+        self.wave_rerun = None
+        self.wave_rerun_overrides = {}
+        # Outcome of each test's wave image build, built once under its test's lock however many runs fail
+        self.wave_builds = {}
+        self.wave_build_locks = {}
+        self.wave_build_guard = threading.Lock()
         
     def load_config(self):
         """Load configuration from JSON file"""
@@ -48,7 +158,7 @@ class CV32E40PTestRunner:
             print(f"    Test Class:  {config['test_class']}")
             print(f"    Sequence:    {config['sequence']}")
             print(f"    Coverage:    {config['enable_coverage']}")
-            print(f"    Waves:       {config['build_options']['enable_waves']}")
+            print(f"    Waves:       {'on failure' if config['build_options']['enable_waves'] else 'off'}")
             print()
         return True
     
@@ -158,104 +268,431 @@ class CV32E40PTestRunner:
         
         return plusargs
     
-    def compile_vcs(self, test_name, test_config):
-        """Compile with VCS using configuration"""
-        print(f"Compiling with VCS for test: {test_name}")
-        print(f"Description: {test_config['description']}")
+    def build_settings(self, test_config, waves=None):
+        """The parts of a test configuration that change the compiled image.
+        
+        Everything else only feeds the run-time plusargs, so tests with equal
+        build settings can share one image. Images are built without wave
+        support unless a waves format is given for a failure rerun.
+        """
+        return {
+            'enable_coverage': test_config.get('enable_coverage', False),
+            'waves': waves,
+            'dut_config': dict(test_config.get('dut_config', {})),
+        }
+    
+    def get_backend(self):
+        """Simulator backend selected by --simulator or default_config"""
+        if self.backend is None:
+            default_config = self.config_data.get("default_config", {})
+            self.simulator = self.simulator or default_config.get("simulator", "vcs")
+            self.backend = create_backend(self.simulator, default_config)
+        return self.backend
+    
+    def run_name(self, test_name, seed=None):
+        """Name of a run's log and work directory"""
+        name = test_name if seed is None else f"{test_name}_{seed}"
+        return name + self.run_suffix
+    
+    def compile_simulator(self, test_name, test_config, quiet=False, waves=None):
+        """Compile the simulator image for the build settings of a test configuration"""
+        backend = self.get_backend()
+        if not quiet:
+            print(f"Compiling with {backend.name} for test: {test_name}")
+            print(f"Description: {test_config.get('description', '')}")
+        build = self.build_settings(test_config, waves)
+        # Wave-capable images are kept apart from the regular image of the same test
+        key = test_name if not waves else f"{test_name}_waves"
         
         rtl_files, tb_files = self.get_file_lists()
+        incdirs = [
+            self.cv32e40p_root / "rtl" / "include",
+            self.cv32e40p_root / "bhv" / "include",
+        ] + [self.tb_root / d for d in ("config", "sequences", "agents", "env", "tests", "coverage")]
+        try:
+            compile_cmd = backend.compile_command(build, rtl_files + tb_files, incdirs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
         
-        # Get default compile options
-        default_config = self.config_data.get("default_config", {})
-        compile_options = default_config.get("compile_options", [])
-        
-        # VCS compile command with UVM support
-        uvm_home = "/home/ubuntu/tools/synopsys/tools/verdi/W-2024.09-SP1/etc/uvm-1.2"
-        vcs_cmd = ["vcs"] + compile_options + [
-            "-ntb_opts", "uvm-1.2",
-            f"+incdir+{self.cv32e40p_root}/rtl/include",
-            f"+incdir+{self.cv32e40p_root}/bhv/include",
-            f"+incdir+{self.tb_root}/config",
-            f"+incdir+{self.tb_root}/sequences",
-            f"+incdir+{self.tb_root}/agents",
-            f"+incdir+{self.tb_root}/env",
-            f"+incdir+{self.tb_root}/tests",
-            f"+incdir+{self.tb_root}/coverage",
-        ]
+        if not self.use_build_cache:
+            # A private build directory lets tests compile concurrently
+            build_dir = self.work_dir / "builds" / self.run_name(key)
+            shutil.rmtree(build_dir, ignore_errors=True)
+            build_dir.mkdir(parents=True, exist_ok=True)
+            layout, image = backend.build_layout(build_dir, test_name, build)
+            if not self.run_compile(key, compile_cmd + layout, quiet):
+                return False
+            backend.finish_build(build_dir)
+            self.images[key] = str(image)
+            return True
         
-        # Add coverage options
-        if test_config.get('enable_coverage', False):
-            vcs_cmd.extend([
-                "-cm", "line+cond+fsm+branch+tgl",
-                "-cm_name", f"{test_name}_coverage",
-                "-cm_dir", "./coverage"
-            ])
+        # The compile command decides the image; tests with the same signature share it
+        cache = self.get_build_cache()
+        signature = cache.signature(compile_cmd, rtl_files + tb_files, incdirs)
+        entry = cache.entry(signature)
+        layout, image = backend.build_layout(entry, test_name, build)
+        with cache.locked(signature):
+            if cache.is_built(signature):
+                cache.touch(signature)
+                self.cache_results[key] = "hit"
+            else:
+                self.cache_results[key] = "miss"
+                cache.prepare(signature)
+                if not self.run_compile(key, compile_cmd + layout, quiet):
+                    cache.discard(signature)
+                    return False
+                backend.finish_build(entry)
+                cache.commit(signature, key)
+            cache.acquire(signature)
+        if self.cache_results[key] == "miss":
+            cache.evict(keep=signature)
+        self.images[key] = str(image)
+        self.signatures[key] = signature
+        if not quiet:
+            print(f"Build cache {self.cache_results[key]}: {signature[:12]} ({entry})")
+        return True
+    
+    def get_build_cache(self):
+        """Compiled image cache configured by default_config"""
+        if self.build_cache is None:
+            default_config = self.config_data.get("default_config", {})
+            directory = self.work_dir / default_config.get("build_cache_dir", "simv_cache")
+            quota_gb = default_config.get("build_cache_quota_gb", DEFAULT_QUOTA_GB)
+            self.build_cache = CV32E40PSimulatorCache(directory, int(quota_gb * 2**30))
+        return self.build_cache
+    
+    def run_compile(self, test_name, compile_cmd, quiet=False):
+        """Run a compile command from the work directory"""
+        if not quiet:
+            print("Compile Command:", " ".join(compile_cmd))
         
-        # Add wave dumping
-        if test_config.get('build_options', {}).get('enable_waves', False):
-            vcs_cmd.append("+define+DUMP_WAVES")
+        log_path = self.work_dir / "logs" / f"compile_{self.run_name(test_name)}.log"
+        try:
+            returncode, _, usage = self.run_streamed(compile_cmd, self.work_dir, log_path, echo=not quiet)
+        except FileNotFoundError:
+            print(f"Error: {compile_cmd[0]} not found; is {self.backend.name} installed and on PATH?")
+            return False
+        self.compile_metrics[test_name] = usage
+        write_metrics(log_path, {"stage": "compile", "build": self.run_name(test_name),
+                                 "simulator": self.backend.name, "returncode": returncode, **usage})
+        if returncode != 0:
+            print(f"Compilation failed for {test_name} (exit status {returncode}), see {log_path}")
+            with open(log_path, 'r', errors='replace') as f:
+                for line in f.readlines()[-20:]:
+                    print(f"  {line.rstrip()}")
+            return False
+        if not quiet:
+            print("Compilation successful!")
+        return True
+    
+    def get_kill_rules(self, test_config):
+        """Kill rules for a run: defaults, then default_config, the test and the command line"""
+        rules = dict(DEFAULT_KILL_RULES)
+        rules.update(self.config_data.get("default_config", {}).get("kill_rules", {}))
+        rules.update(test_config.get("kill_rules", {}))
+        rules.update(self.kill_rule_overrides)
+        return rules
+    
+    def run_streamed(self, cmd, cwd, log_path, echo=False, kill_rules=None):
+        """Run a command, writing its output line by line to log_path and, with echo, the console.
         
-        # Add DUT parameter overrides
-        dut_config = test_config.get('dut_config', {})
-        for param, value in dut_config.items():
-            vcs_cmd.append(f"-pvalue+tb_top.dut_if.dut.{param}={value}")
+        With kill_rules the process is killed at the first UVM_FATAL, after too
+        many UVM_ERRORs or when it goes quiet. Returns the exit status, the
+        reason it was killed (None when it ran to completion) and the
+        process's resource usage from resource_usage().
+        """
+        rules = kill_rules or {}
+        idle_seconds = rules.get("idle_seconds")
+        max_errors = rules.get("max_uvm_errors")
+        errors = 0
+        reason = None
+        last_output = time.monotonic()
+        finished = threading.Event()
         
-        # Add all source files
-        vcs_cmd.extend(rtl_files)
-        vcs_cmd.extend(tb_files)
+        # A session of its own lets a kill take the simulator's child processes along
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, errors='replace', bufsize=1, start_new_session=True)
         
-        # Output executable name
-        vcs_cmd.extend(["-o", f"{test_name}_simv"])
+        def kill(why):
+            nonlocal reason
+            if reason is None:
+                reason = why
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
         
-        print("VCS Command:", " ".join(vcs_cmd))
+        def watchdog():
+            while not finished.wait(1.0):
+                if time.monotonic() - last_output > idle_seconds:
+                    kill(f"no output for {idle_seconds}s")
+                    return
         
-        try:
-            result = subprocess.run(vcs_cmd, check=True, capture_output=True, text=True)
-            print("Compilation successful!")
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"Compilation failed: {e}")
-            print("STDOUT:", e.stdout)
-            print("STDERR:", e.stderr)
-            return False
+        if idle_seconds:
+            threading.Thread(target=watchdog, daemon=True).start()
+        with open(log_path, 'w') as log:
+            for line in process.stdout:
+                last_output = time.monotonic()
+                log.write(line)
+                if echo:
+                    sys.stdout.write(line)
+                match = UVM_SEVERITY_RE.match(line) if rules else None
+                if match is None or reason is not None:
+                    continue
+                if match.group(1) == 'UVM_FATAL':
+                    if rules.get("abort_on_fatal"):
+                        kill("UVM_FATAL")
+                else:
+                    errors += 1
+                    if max_errors is not None and errors > max_errors:
+                        kill(f"more than {max_errors} UVM_ERROR")
+            # wait4 reaps the process with the CPU time and peak RSS of it and its waited-for children
+            _, status, rusage = os.wait4(process.pid, 0)
+            returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            process.returncode = returncode
+            finished.set()
+            if reason is not None:
+                log.write(f"run_test.py: simulation killed: {reason}\n")
+        return returncode, reason, resource_usage(time.perf_counter() - start, rusage)
     
-    def run_simulation(self, test_name, test_config):
-        """Run the simulation using configuration"""
-        print(f"Running simulation: {test_name}")
+    def simulation_plusargs(self, test_config):
+        """Test selection plusargs followed by the test's configured stimulus plusargs"""
+        return [
+            f"+UVM_TESTNAME={test_config['test_class']}",
+            f"+UVM_VERBOSITY={test_config.get('verbosity', 'UVM_LOW')}",
+        ] + self.build_plusargs_from_config(test_config)
+    
+    def save_checkpoint(self, test_name, test_config, quiet=False):
+        """Simulate through reset and save the simulation for seed runs to restore.
         
-        # Build plusargs from configuration
-        plusargs = self.build_plusargs_from_config(test_config)
+        The testbench stops a few cycles after reset when given +CHECKPOINT,
+        before any stimulus is generated, so every seed can resume from the
+        same snapshot. Returns the checkpoint file, or None if the simulator
+        cannot save one or the save run failed.
+        """
+        backend = self.get_backend()
+        if not backend.checkpoints:
+            if not quiet:
+                print(f"{backend.name} cannot save checkpoints; running {test_name} seeds from time 0")
+            return None
+        run_name = self.run_name(test_name) + "_checkpoint"
+        checkpoint_dir = self.work_dir / "checkpoints" / self.run_name(test_name)
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        checkpoint_dir.mkdir(parents=True)
+        checkpoint = checkpoint_dir / "post_reset"
+        run_dir = self.work_dir / "runs" / run_name
+        run_dir.mkdir(parents=True, exist_ok=True)
         
-        # Get default simulation options
-        default_config = self.config_data.get("default_config", {})
-        sim_options = default_config.get("simulation_options", [])
+        cmd = backend.checkpoint_command(self.images[test_name], self.simulation_plusargs(test_config),
+                                         checkpoint, test_config.get('enable_coverage', False))
+        if not quiet:
+            print("Checkpoint Command:", " ".join(cmd))
+        # Only a hang can stop the run before the checkpoint; errors come from the seed runs
+        kill_rules = dict(self.get_kill_rules(test_config), abort_on_fatal=False, max_uvm_errors=None)
+        log_path = self.work_dir / "logs" / f"{run_name}.log"
+        returncode, reason, _ = self.run_streamed(cmd, run_dir, log_path, echo=not quiet, kill_rules=kill_rules)
+        if returncode != 0 or reason is not None or not checkpoint.exists():
+            if not quiet:
+                print(f"Checkpoint of {test_name} failed, see {log_path}")
+            return None
+        return checkpoint
+    
+    def run_simulation(self, test_name, test_config, seed=None, quiet=False, waves=None, restore=None):
+        """Run the simulation using configuration, optionally with a fixed seed.
         
-        sim_cmd = [f"./{test_name}_simv"] + sim_options + [
-            f"+UVM_TESTNAME={test_config['test_class']}",
-            f"+UVM_VERBOSITY={test_config.get('verbosity', 'UVM_LOW')}",
-            "-l", f"./logs/{test_name}.log"
-        ] + plusargs
+        Each run executes in its own work/runs/<run> directory so coverage
+        databases and waveforms of concurrent runs stay apart; the log goes
+        to work/logs/<run>.log as the simulator prints it. `waves` holds the
+        WAVES_* plusargs of a wave rerun, which uses the test's wave image.
+        `restore` resumes from a save_checkpoint() file instead of time 0.
+        """
+        if not quiet:
+            print(f"Running simulation: {test_name}")
+        run_name = self.run_name(test_name, seed) + ("_waves" if waves else "")
+        run_dir = self.work_dir / "runs" / run_name
+        run_dir.mkdir(parents=True, exist_ok=True)
         
-        # Add coverage options
-        if test_config.get('enable_coverage', False):
-            sim_cmd.extend([
-                "-cm", "line+cond+fsm+branch+tgl",
-                "-cm_name", f"{test_name}_coverage",
-                "-cm_dir", "./coverage"
-            ])
+        plusargs = self.simulation_plusargs(test_config)
         
-        print("Simulation Command:", " ".join(sim_cmd))
+        if waves:
+            plusargs += ["+WAVES"] + [f"+WAVES_{key.upper()}={value}" for key, value in waves.items()]
         
-        try:
-            result = subprocess.run(sim_cmd, check=True, capture_output=True, text=True)
-            print("Simulation completed successfully!")
-            print("STDOUT:", result.stdout)
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"Simulation failed: {e}")
-            print("STDOUT:", e.stdout)
-            print("STDERR:", e.stderr)
+        simv = self.images[f"{test_name}_waves" if waves else test_name]
+        coverage = test_config.get('enable_coverage', False)
+        log_path = self.work_dir / "logs" / f"{run_name}.log"
+        if coverage:
+            # Per-bin hit counts land next to the log for the analyzer to merge
+            plusargs.append(f"+COVERAGE_BINS={log_path.with_suffix('.bins')}")
+        if restore is not None:
+            sim_cmd = self.get_backend().restore_command(simv, plusargs, restore, run_name, seed, coverage)
+        else:
+            sim_cmd = self.get_backend().run_command(simv, plusargs, run_name, seed, coverage)
+        
+        if not quiet:
+            print("Simulation Command:", " ".join(sim_cmd))
+        
+        kill_rules = self.get_kill_rules(test_config)
+        if waves:
+            # The error is expected now; a kill would cut the dump short before its window closes
+            kill_rules.update(abort_on_fatal=False, max_uvm_errors=None)
+        returncode, reason, usage = self.run_streamed(sim_cmd, run_dir, log_path, echo=not quiet,
+                                                      kill_rules=kill_rules)
+        if not waves:
+            self.record_metrics(test_name, seed, run_name, log_path, usage, returncode, reason)
+        if reason is not None:
+            self.kill_reasons[run_name] = reason
+            if not quiet:
+                print(f"Simulation killed: {reason}, see {log_path}")
             return False
+        if returncode != 0:
+            if not quiet:
+                print(f"Simulation failed with exit status {returncode}, see {log_path}")
+            return False
+        if not quiet:
+            print("Simulation completed successfully!")
+        return True
+    
+    def get_wave_rerun(self):
+        """Wave rerun settings: defaults, then default_config and the command line"""
+        settings = dict(DEFAULT_WAVE_RERUN)
+        settings.update(self.config_data.get("default_config", {}).get("wave_rerun", {}))
+        settings.update(self.wave_rerun_overrides)
+        if not settings["format"]:
+            settings["format"] = self.get_backend().wave_formats[0]
+        return settings
+    
+    def wants_wave_rerun(self, test_config):
+        if self.wave_rerun is not None:
+            return self.wave_rerun
+        return test_config.get('build_options', {}).get('enable_waves', False)
+    
+    def report_times(self, log_path):
+        """Time of the first UVM_ERROR/UVM_FATAL in a log (None without one) and of its last report"""
+        first_error = last = None
+        with open(log_path, 'r', errors='replace') as f:
+            for line in f:
+                match = UVM_TIME_RE.match(line)
+                if match is None:
+                    continue
+                last = int(match.group(1))
+                if first_error is None and UVM_SEVERITY_RE.match(line):
+                    first_error = last
+        return first_error, last
+    
+    def log_counts(self, log_path):
+        """UVM report counts, instructions processed and simulated cycles, read from a log in one pass"""
+        errors = fatals = warnings = 0
+        last = instructions = None
+        with open(log_path, 'r', errors='replace') as f:
+            for line in f:
+                if line.startswith('UVM_'):
+                    match = UVM_TIME_RE.match(line)
+                    if match:
+                        last = int(match.group(1))
+                    severity = UVM_SEVERITY_RE.match(line)
+                    if severity:
+                        if severity.group(1) == 'UVM_FATAL':
+                            fatals += 1
+                        else:
+                            errors += 1
+                    elif UVM_WARNING_RE.match(line):
+                        warnings += 1
+                match = INSTRUCTIONS_RE.search(line)
+                if match:
+                    instructions = int(match.group(1))
+        return {'errors': errors, 'fatals': fatals, 'warnings': warnings, 'instructions': instructions,
+                'sim_cycles': last // CLOCK_PERIOD_NS if last is not None else None}
+    
+    def record_metrics(self, test_name, seed, run_name, log_path, usage, returncode, reason):
+        """Derive a simulation's throughput and write its metrics beside the log.
+        
+        The compile entry is the build of the image the run used, or None
+        when it came from the build cache.
+        """
+        counts = self.log_counts(log_path)
+        wall = usage["wall_seconds"]
+        
+        def rate(count):
+            return round(count / wall, 1) if count is not None and wall > 0 else None
+        
+        metrics = {
+            "stage": "simulate", "run": run_name, "test": test_name, "seed": seed,
+            "simulator": self.backend.name, "returncode": returncode, "killed": reason,
+            "simulate": usage,
+            "compile": self.compile_metrics.get(test_name),
+            **counts,
+            "cycles_per_second": rate(counts["sim_cycles"]),
+            "instructions_per_second": rate(counts["instructions"]),
+        }
+        self.run_metrics[run_name] = metrics
+        write_metrics(log_path, metrics)
+    
+    def run_record(self, test_name, seed, status, seconds):
+        """Results database record of a finished run, with its metrics"""
+        run_name = self.run_name(test_name, seed)
+        record = {
+            'simulator': self.get_backend().name, 'test': test_name, 'seed': seed, 'status': status,
+            'build_signature': self.signatures.get(test_name), 'wall_seconds': round(seconds, 3),
+        }
+        metrics = self.run_metrics.get(run_name)
+        if status == 'BUILD_FAIL' or metrics is None:
+            return record
+        record.update({key: metrics[key] for key in ('errors', 'fatals', 'warnings', 'instructions', 'sim_cycles')})
+        record.update(cpu_seconds=metrics['simulate']['cpu_seconds'], peak_rss_mb=metrics['simulate']['peak_rss_mb'],
+                      log_path=str(self.work_dir / "logs" / f"{run_name}.log"))
+        return record
+    
+    def record_runs(self, records, regression=None):
+        """Store finished runs in the results database"""
+        if self.results_db is None or not records:
+            return
+        try:
+            with CV32E40PResultsDatabase(self.results_db) as db:
+                db.record_runs([dict(record, regression=regression) for record in records])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Warning: Could not record results in {self.results_db}: {e}")
+    
+    def rerun_with_waves(self, test_name, test_config, seed=None, quiet=False):
+        """Simulate a failed run again, dumping waves only around its first error.
+        
+        Without a reported error (a crash or a hang) the window ends at the
+        last report instead. Returns the dump file, or None if the rerun
+        could not be built.
+        """
+        settings = self.get_wave_rerun()
+        run_name = self.run_name(test_name, seed)
+        if settings["format"] not in self.backend.wave_formats:
+            print(f"Error: {self.backend.name} cannot dump {settings['format']} waves "
+                  f"(supported: {', '.join(self.backend.wave_formats)})")
+            return None
+        first_error, last = self.report_times(self.work_dir / "logs" / f"{run_name}.log")
+        end = first_error if first_error is not None else last
+        if not quiet:
+            where = f"first error at {end}ns" if first_error is not None else "no reported error"
+            print(f"Rerunning {run_name} with waves ({where})")
+        if not self.compile_wave_image(test_name, test_config, settings["format"], quiet):
+            return None
+        
+        waves_file = self.work_dir / "waves" / f"{run_name}.{settings['format']}"
+        waves = {"file": waves_file, "scope": settings["scope"], "depth": settings["depth"]}
+        if end is not None:
+            waves["start"] = max(0, end - settings["window_ns"])
+            waves["stop"] = end + settings["after_ns"]
+        self.run_simulation(test_name, test_config, seed, quiet=quiet, waves=waves)
+        if not quiet:
+            print(f"Waves written to {waves_file}")
+        return waves_file
+    
+    def compile_wave_image(self, test_name, test_config, wave_format, quiet=False):
+        """Compile a test's wave-capable image on its first failure; later reruns wait for and reuse it"""
+        with self.wave_build_guard:
+            lock = self.wave_build_locks.setdefault(test_name, threading.Lock())
+        with lock:
+            if test_name not in self.wave_builds:
+                self.wave_builds[test_name] = self.compile_simulator(test_name, test_config, quiet, waves=wave_format)
+            return self.wave_builds[test_name]
     
     def run_test(self, test_name):
         """Complete test flow: load config, compile and run"""
@@ -271,16 +708,395 @@ class CV32E40PTestRunner:
         print(f"Configuration: {test_config['description']}")
         
         # Compile
-        if not self.compile_vcs(test_name, test_config):
+        if not self.compile_simulator(test_name, test_config):
             return False
         
-        # Run
-        if not self.run_simulation(test_name, test_config):
+        # Run, and on failure once more with waves around the first error
+        start = time.perf_counter()
+        passed = self.run_simulation(test_name, test_config)
+        status = 'PASS' if passed else 'KILLED' if self.run_name(test_name) in self.kill_reasons else 'FAIL'
+        self.record_runs([self.run_record(test_name, None, status, time.perf_counter() - start)])
+        if not passed:
+            if self.wants_wave_rerun(test_config):
+                self.rerun_with_waves(test_name, test_config)
             return False
         
         print(f"Test {test_name} completed successfully!")
         return True
 
+class CV32E40PRegressionScheduler:
+    """Runs a list of tests x seeds concurrently, longest expected work first.
+
+    Tests are grouped by simulator and build settings; each group is compiled
+    once and the seeds of all its tests become runnable when the compile
+    succeeds. Runnable work is handed to at most `jobs` workers, of which at
+    most `licenses` run a licensed simulator at the same time. Expected
+    durations come from runtimes recorded by earlier regressions, falling
+    back to an estimate from the test's max_cycles.
+    
+    With `checkpoint`, each test is first simulated through reset and saved
+    once per build, and its seeds restore from that snapshot instead of
+    repeating reset from time 0.
+    """
+    
+    def __init__(self, runners, jobs=1, licenses=None, history_file=None, checkpoint=False):
+        self.runners = runners
+        self.jobs = max(1, jobs)
+        self.checkpoint = checkpoint
+        self.licenses = threading.Semaphore(licenses or self.jobs)
+        self.history_file = Path(history_file) if history_file else runners[0].work_dir / HISTORY_FILE
+        self.history = self.load_history()
+        self.lock = threading.Condition()
+        self.results = []
+        # Results database records of the finished runs
+        self.records = []
+        # Compile seconds per (simulator, test)
+        self.build_seconds = {}
+        # Redraw a progress line under the job results when attached to a terminal
+        self.live = sys.stdout.isatty()
+        
+    def load_history(self):
+        """Recorded runtimes per simulator and test, empty when there are none yet"""
+        try:
+            with open(self.history_file, 'r') as f:
+                history = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # Histories written before simulators were selectable hold VCS runtimes per test
+        if any('samples' in entry for entry in history.values()):
+            history = {'vcs': history}
+        return history
+    
+    def save_history(self):
+        """Fold this regression's runtimes into the moving averages"""
+        measured = {}
+        for result in self.results:
+            if result['status'] not in ('BUILD_FAIL', 'ERROR'):
+                measured.setdefault((result['simulator'], result['test']), []).append(result['seconds'])
+        runners = {runner.simulator: runner for runner in self.runners}
+        for (simulator, test_name), runs in measured.items():
+            entry = self.history.setdefault(simulator, {}).setdefault(test_name, {'samples': 0})
+            # A cache hit says nothing about how long the test takes to compile
+            compiled = runners[simulator].cache_results.get(test_name) != 'hit'
+            samples = {'compile_seconds': self.build_seconds.get((simulator, test_name)) if compiled else None,
+                       'run_seconds': sum(runs) / len(runs)}
+            for key, value in samples.items():
+                if value is None:
+                    continue
+                previous = entry.get(key)
+                entry[key] = round(value if previous is None else
+                                   previous + HISTORY_SMOOTHING * (value - previous), 3)
+            entry['samples'] += len(runs)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.history_file, 'w') as f:
+            json.dump(self.history, f, indent=2, sort_keys=True)
+    
+    def expected_seconds(self, simulator, test_name, test_config):
+        """Expected (compile, run) seconds for a test on a simulator"""
+        entry = self.history.get(simulator, {}).get(test_name, {})
+        estimate = test_config.get('max_cycles', 1000) * DEFAULT_SECONDS_PER_CYCLE
+        return (entry.get('compile_seconds', DEFAULT_COMPILE_SECONDS),
+                entry.get('run_seconds', estimate))
+    
+    def run(self, tests, seeds):
+        """Compile and run every test with every seed on every simulator; returns the per-run results
+        
+        `seeds` is a list run for every test, or a dict of each test's own
+        seeds as read from a run list.
+        """
+        configs = {}
+        for test_name in tests:
+            test_config = self.runners[0].get_test_config(test_name)
+            if not test_config:
+                return None
+            configs[test_name] = test_config
+        test_seeds = seeds if isinstance(seeds, dict) else {test_name: seeds for test_name in tests}
+        for runner in self.runners[1:]:
+            runner.config_data = self.runners[0].config_data
+        for runner in self.runners:
+            runner.get_backend()
+        self.runners[0].setup_environment(None)
+        
+        groups = {}
+        for runner in self.runners:
+            for test_name in tests:
+                key = (runner.simulator, json.dumps(runner.build_settings(configs[test_name]), sort_keys=True))
+                groups.setdefault(key, (runner, []))[1].append(test_name)
+        groups = list(groups.values())
+        
+        # Ready work is a heap of (-expected seconds, tiebreak, kind, target, seed), the target
+        # being a group index or (runner, test, ...) depending on the kind;
+        # a compile is ranked by the longest chain it unblocks so long tests start first
+        ready = []
+        for order, (runner, group) in enumerate(groups):
+            expected = [self.expected_seconds(runner.simulator, t, configs[t]) for t in group]
+            chain = max(c for c, _ in expected) + max(r for _, r in expected)
+            ready.append((-chain, order, 'compile', order, None))
+        heapq.heapify(ready)
+        self.total_runs = len(self.runners) * sum(len(test_seeds[t]) for t in tests)
+        # Identifies this regression's runs in the results database
+        self.regression = time.strftime('%Y%m%d-%H%M%S')
+        self.running = 0
+        outstanding = len(groups) + self.total_runs
+        counter = len(groups)
+        simulators = ', '.join(runner.simulator for runner in self.runners)
+        shape = (f"{self.total_runs // len(self.runners)} runs of {len(tests)} tests" if isinstance(seeds, dict)
+                 else f"{len(tests)} tests x {len(seeds)} seeds")
+        print(f"Regression: {shape} on {simulators}, {len(groups)} builds on {self.jobs} jobs")
+        if self.checkpoint:
+            for runner in self.runners:
+                if not runner.backend.checkpoints:
+                    print(f"  {runner.simulator} cannot save checkpoints; its seeds run from time 0")
+        
+        def push_runs(runner, test_name, restore):
+            """Make every seed of a built test runnable; call with the lock held"""
+            nonlocal counter
+            _, run_seconds = self.expected_seconds(runner.simulator, test_name, configs[test_name])
+            for seed in test_seeds[test_name]:
+                counter += 1
+                heapq.heappush(ready, (-run_seconds, counter, 'run', (runner, test_name, restore), seed))
+        
+        def worker():
+            nonlocal outstanding, counter
+            while True:
+                with self.lock:
+                    while not ready and outstanding > 0:
+                        self.lock.wait()
+                    if not ready:
+                        return
+                    _, order, kind, target, seed = heapq.heappop(ready)
+                    self.running += 1
+                    self.report()
+                # A group's image is built under its first test's name and shared by the rest
+                if kind == 'compile':
+                    runner, group = groups[target]
+                    test_name = group[0]
+                elif kind == 'waves':
+                    runner, test_name, failed = target
+                elif kind == 'checkpoint':
+                    runner, test_name = target
+                else:
+                    runner, test_name, restore = target
+                try:
+                    test_config = configs[test_name]
+                    start = time.perf_counter()
+                    with self.licenses if runner.backend.licensed else contextlib.nullcontext():
+                        if kind == 'compile':
+                            passed = runner.compile_simulator(test_name, test_config, quiet=True)
+                        elif kind == 'waves':
+                            waves_file = runner.rerun_with_waves(test_name, test_config, seed, quiet=True)
+                        elif kind == 'checkpoint':
+                            checkpoint = runner.save_checkpoint(test_name, test_config, quiet=True)
+                        else:
+                            passed = runner.run_simulation(test_name, test_config, seed, quiet=True,
+                                                           restore=restore)
+                    seconds = time.perf_counter() - start
+                    if kind == 'run':
+                        run_name = runner.run_name(test_name, seed)
+                        reason = runner.kill_reasons.get(run_name)
+                        status = 'PASS' if passed else 'KILLED' if reason else 'FAIL'
+                        record = runner.run_record(test_name, seed, status, seconds)
+                    with self.lock:
+                        if kind == 'compile':
+                            cached = runner.cache_results.get(test_name)
+                            for member in group:
+                                self.build_seconds[(runner.simulator, member)] = seconds
+                                if test_name in runner.images:
+                                    runner.images[member] = runner.images[test_name]
+                                if test_name in runner.compile_metrics:
+                                    runner.compile_metrics[member] = runner.compile_metrics[test_name]
+                                if test_name in runner.signatures:
+                                    runner.signatures[member] = runner.signatures[test_name]
+                                if cached:
+                                    runner.cache_results[member] = cached
+                            cached = f", cache {cached}" if cached else ""
+                            self.report(f"  [{'BUILT' if passed else 'BUILD_FAIL':10s}] {runner.simulator}: "
+                                        f"{', '.join(group)} ({seconds:.1f}s{cached})")
+                            for member in group:
+                                if passed and self.checkpoint and runner.backend.checkpoints:
+                                    # Ranked like the seed runs it unblocks
+                                    _, run_seconds = self.expected_seconds(runner.simulator, member, configs[member])
+                                    counter += 1
+                                    outstanding += 1
+                                    heapq.heappush(ready, (-run_seconds, counter, 'checkpoint', (runner, member), None))
+                                elif passed:
+                                    push_runs(runner, member, None)
+                                else:
+                                    self.results.extend({'simulator': runner.simulator, 'test': member, 'seed': seed,
+                                                         'status': 'BUILD_FAIL', 'seconds': 0.0}
+                                                        for seed in test_seeds[member])
+                                    self.records.extend(runner.run_record(member, seed, 'BUILD_FAIL', 0.0)
+                                                        for seed in test_seeds[member])
+                                    outstanding -= len(test_seeds[member])
+                        elif kind == 'checkpoint':
+                            if checkpoint:
+                                self.report(f"  [{'CHECKPOINT':10s}] {runner.simulator}: {test_name} ({seconds:.1f}s)")
+                            else:
+                                run_name = runner.run_name(test_name) + "_checkpoint"
+                                self.report(f"  [{'NO_CKPT':10s}] {runner.simulator}: {test_name} ({seconds:.1f}s, "
+                                            f"seeds run from time 0, see logs/{run_name}.log)")
+                            push_runs(runner, test_name, checkpoint)
+                        elif kind == 'waves':
+                            if waves_file:
+                                failed['waves'] = str(waves_file)
+                            self.report(f"  [{'WAVES' if waves_file else 'NO_WAVES':10s}] {runner.simulator}: "
+                                        f"{test_name} seed {seed} ({seconds:.1f}s"
+                                        f"{', ' + str(waves_file) if waves_file else ''})")
+                        else:
+                            self.records.append(record)
+                            self.results.append({'simulator': runner.simulator, 'test': test_name, 'seed': seed,
+                                                 'status': status, 'seconds': round(seconds, 3)})
+                            note = '' if passed else f", see logs/{run_name}.log"
+                            if reason:
+                                note = f", {reason}{note}"
+                            self.report(f"  [{status:10s}] {runner.simulator}: {test_name} seed {seed} "
+                                        f"({seconds:.1f}s{note})")
+                            if not passed and runner.wants_wave_rerun(test_config):
+                                counter += 1
+                                outstanding += 1
+                                heapq.heappush(ready, (-seconds, counter, 'waves',
+                                                       (runner, test_name, self.results[-1]), seed))
+                except Exception as e:
+                    # A job that raises must not take its worker down or leave its runs unaccounted for
+                    with self.lock:
+                        if kind == 'compile':
+                            lost = [(member, seed) for member in group for seed in test_seeds[member]]
+                        elif kind == 'checkpoint':
+                            lost = [(test_name, seed) for seed in test_seeds[test_name]]
+                        elif kind == 'run':
+                            lost = [(test_name, seed)]
+                        else:
+                            lost = []
+                        self.results.extend({'simulator': runner.simulator, 'test': member, 'seed': lost_seed,
+                                             'status': 'ERROR', 'seconds': 0.0} for member, lost_seed in lost)
+                        self.records.extend(runner.run_record(member, lost_seed, 'ERROR', 0.0)
+                                            for member, lost_seed in lost)
+                        # The job itself is released below; the runs it would have made runnable are not
+                        if kind in ('compile', 'checkpoint'):
+                            outstanding -= len(lost)
+                        seed_text = f" seed {seed}" if seed is not None else ""
+                        self.report(f"  [{'ERROR':10s}] {runner.simulator}: {kind} {test_name}{seed_text} "
+                                    f"raised {type(e).__name__}: {e}")
+                finally:
+                    with self.lock:
+                        outstanding -= 1
+                        self.running -= 1
+                        self.report()
+                        self.lock.notify_all()
+        
+        start = time.perf_counter()
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(self.jobs)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - start
+        if self.live:
+            sys.stdout.write("\r\033[K")
+        for runner in self.runners:
+            if runner.build_cache is not None:
+                runner.build_cache.release()
+        
+        self.groups = groups
+        order = [runner.simulator for runner in self.runners]
+        self.results.sort(key=lambda r: (order.index(r['simulator']), tests.index(r['test']),
+                                         test_seeds[r['test']].index(r['seed'])))
+        self.save_history()
+        self.runners[0].record_runs(self.records, regression=self.regression)
+        return self.results
+    
+    def report(self, line=None):
+        """Print a job result above the live progress line; call with the lock held"""
+        if self.live:
+            sys.stdout.write("\r\033[K")
+        if line:
+            print(line)
+        if self.live:
+            failed = sum(1 for r in self.results if r['status'] != 'PASS')
+            sys.stdout.write(f"  {len(self.results)}/{self.total_runs} runs finished, "
+                             f"{self.running} jobs running, {failed} failed")
+            sys.stdout.flush()
+    
+    def print_summary(self):
+        """Single pass/fail table for the whole regression, with throughput per simulator"""
+        print()
+        print("Regression summary:")
+        print("=" * 80)
+        print(f"  {'Simulator':10s} {'Test':40s} {'Seed':>10s}  {'Status':10s} {'Time':>6s}")
+        for result in self.results:
+            print(f"  {result['simulator']:10s} {result['test']:40s} {result['seed']:>10d}  "
+                  f"{result['status']:10s} {result['seconds']:>5.1f}s")
+        print("=" * 80)
+        passed = sum(1 for r in self.results if r['status'] == 'PASS')
+        build_seconds = {runner.simulator: 0.0 for runner in self.runners}
+        for runner, group in self.groups:
+            build_seconds[runner.simulator] += self.build_seconds.get((runner.simulator, group[0]), 0.0)
+        busy = sum(r['seconds'] for r in self.results) + sum(build_seconds.values())
+        print(f"  {passed}/{len(self.results)} passed, {len(self.results) - passed} failed")
+        missing = self.total_runs - len(self.results)
+        if missing:
+            print(f"  {missing} of {self.total_runs} runs never finished")
+        print(f"  Wall time {self.wall_seconds:.1f}s for {busy:.1f}s of compile and simulation")
+        cache_results = [runner.cache_results[group[0]] for runner, group in self.groups
+                         if group[0] in runner.cache_results]
+        if cache_results:
+            print(f"  Build cache: {cache_results.count('hit')} hits, {cache_results.count('miss')} misses")
+        waves = [r for r in self.results if 'waves' in r]
+        if waves:
+            print("  Waves of failing runs:")
+            for result in waves:
+                print(f"    {result['test']} seed {result['seed']}: {result['waves']}")
+        
+        print()
+        print("Throughput by simulator:")
+        print(f"  {'Simulator':10s} {'Builds':>6s} {'Build time':>10s} {'Runs':>5s} {'Passed':>6s} "
+              f"{'Mean run':>9s} {'Runs/hour/job':>14s}")
+        for runner in self.runners:
+            runs = [r for r in self.results
+                    if r['simulator'] == runner.simulator and r['status'] not in ('BUILD_FAIL', 'ERROR')]
+            builds = sum(1 for r, _ in self.groups if r is runner)
+            run_seconds = sum(r['seconds'] for r in runs)
+            mean = run_seconds / len(runs) if runs else 0.0
+            per_hour = 3600 / mean if mean else 0.0
+            print(f"  {runner.simulator:10s} {builds:>6d} {build_seconds[runner.simulator]:>9.1f}s "
+                  f"{len(runs):>5d} {sum(1 for r in runs if r['status'] == 'PASS'):>6d} "
+                  f"{mean:>8.1f}s {per_hour:>14.0f}")
+        self.print_resources()
+        return passed == len(self.results) == self.total_runs
+    
+    def print_resources(self):
+        """Compile and simulation resource usage and simulated throughput per test"""
+        print()
+        print("Resources and throughput by test (compile '-' for cached images):")
+        print(f"  {'Simulator':10s} {'Test':32s} {'Compile':>8s} {'Comp RSS':>9s} {'Runs':>5s} {'Sim wall':>9s} "
+              f"{'Sim CPU':>8s} {'Peak RSS':>9s} {'Cycles/s':>10s} {'Instr/s':>10s}")
+        for runner in self.runners:
+            tests = list(dict.fromkeys(r['test'] for r in self.results if r['simulator'] == runner.simulator))
+            for test_name in tests:
+                build = runner.compile_metrics.get(test_name)
+                metrics = [runner.run_metrics[name] for name in
+                           (runner.run_name(test_name, r['seed']) for r in self.results
+                            if r['simulator'] == runner.simulator and r['test'] == test_name)
+                           if name in runner.run_metrics]
+                compile_text = f"{build['wall_seconds']:>7.1f}s {build['peak_rss_mb']:>6.0f} MB" if build else \
+                    f"{'-':>8s} {'-':>9s}"
+                if not metrics:
+                    print(f"  {runner.simulator:10s} {test_name:32s} {compile_text} {0:>5d}")
+                    continue
+                wall = sum(m['simulate']['wall_seconds'] for m in metrics)
+                cpu = sum(m['simulate']['cpu_seconds'] for m in metrics)
+                rss = max(m['simulate']['peak_rss_mb'] for m in metrics)
+                
+                def rate(key):
+                    # Overall rate of the runs that reported the count
+                    counted = [m for m in metrics if m[key] is not None]
+                    seconds = sum(m['simulate']['wall_seconds'] for m in counted)
+                    return f"{sum(m[key] for m in counted) / seconds:>10.0f}" if counted and seconds else f"{'-':>10s}"
+                
+                print(f"  {runner.simulator:10s} {test_name:32s} {compile_text} {len(metrics):>5d} "
+                      f"{wall / len(metrics):>8.1f}s {cpu / len(metrics):>7.1f}s {rss:>6.0f} MB "
+                      f"{rate('sim_cycles')} {rate('instructions')}")
+
 def main():
     parser = argparse.ArgumentParser(description="CV32E40P UVM Test Runner")
     parser.add_argument("--test", default="cv32e40p_basic_test", 
@@ -289,18 +1105,120 @@ def main():
                        help="List available test configurations")
     parser.add_argument("--config", 
                        help="Override default configuration file path")
+    parser.add_argument("--simulator", "-s",
+                       help=f"Simulator to use: {', '.join(BACKENDS)} (default from configuration); "
+                            "a comma-separated list runs a regression on each and compares them")
+    parser.add_argument("--no-build-cache", action="store_true",
+                       help="Always compile a fresh image under work/builds/ instead of reusing cached images")
+    parser.add_argument("--max-errors", type=int,
+                       help="Kill a simulation once it reports more UVM_ERRORs than this")
+    parser.add_argument("--idle-timeout", type=float,
+                       help="Kill a simulation that prints nothing for this many seconds")
+    parser.add_argument("--wave-rerun", dest="wave_rerun", action="store_true", default=None,
+                       help="Rerun every failing run with waves (default: tests with enable_waves)")
+    parser.add_argument("--no-wave-rerun", dest="wave_rerun", action="store_false",
+                       help="Never rerun failures with waves")
+    parser.add_argument("--waves-window", type=int,
+                       help=f"Dump this many ns before the first error (default {DEFAULT_WAVE_RERUN['window_ns']})")
+    parser.add_argument("--waves-scope", choices=["tb_top", "dut_if", "dut", "core"],
+                       help=f"Hierarchy to dump (default {DEFAULT_WAVE_RERUN['scope']})")
+    parser.add_argument("--waves-depth", type=int,
+                       help="Levels to dump below the scope, 0 for all")
+    parser.add_argument("--waves-format",
+                       help="Dump format: fsdb or vcd on VCS, fst or vcd on Verilator (default: the first)")
+    parser.add_argument("--tests",
+                       help="Run a regression over these comma-separated tests ('all' for every configuration)")
+    parser.add_argument("--seeds", type=seed_list,
+                       help="Comma-separated simulation seeds for the regression")
+    parser.add_argument("--num-seeds", type=int, default=1,
+                       help="Number of random seeds per test when --seeds is not given (default 1)")
+    parser.add_argument("--run-list",
+                       help="Run a regression over the test/seed pairs of this file, as written by analyze_coverage.py --rank")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                       help="Maximum concurrent compiles and simulations (default 1)")
+    parser.add_argument("--licenses", type=int,
+                       help="Maximum concurrent simulator licenses (default: --jobs)")
+    parser.add_argument("--history",
+                       help=f"Runtime history file used to order the regression (default work/{HISTORY_FILE})")
+    parser.add_argument("--results-db",
+                       help=f"Record finished runs in this results database (default work/{RESULTS_DB})")
+    parser.add_argument("--no-results-db", action="store_true",
+                       help="Do not record runs in the results database")
+    parser.add_argument("--checkpoint", action="store_true",
+                       help="Save each test once after reset and restore its seeds from that snapshot")
     
     args = parser.parse_args()
     
-    runner = CV32E40PTestRunner()
+    simulators = args.simulator.split(",") if args.simulator else [None]
+    unknown = [s for s in simulators if s is not None and s not in BACKENDS]
+    if unknown:
+        print(f"Error: Unknown simulator: {', '.join(unknown)} (available: {', '.join(BACKENDS)})")
+        return 1
+    if args.run_list and args.tests:
+        print("Error: --run-list and --tests both select the regression's runs; give one")
+        return 1
+    regression = args.tests or args.run_list
+    if len(simulators) > 1 and not regression:
+        print("Error: Several simulators can only be compared in a regression (--tests or --run-list)")
+        return 1
+    if args.checkpoint and not regression:
+        print("Error: Checkpoints are restored by the seeds of a regression (--tests or --run-list)")
+        return 1
     
-    # Override config file if specified
-    if args.config:
-        runner.config_file = Path(args.config)
+    runners = [CV32E40PTestRunner(simulator) for simulator in simulators]
+    for runner in runners:
+        # Override config file if specified
+        if args.config:
+            runner.config_file = Path(args.config)
+        runner.use_build_cache = not args.no_build_cache
+        if args.no_results_db:
+            runner.results_db = None
+        elif args.results_db:
+            runner.results_db = Path(args.results_db).resolve()
+        if len(runners) > 1:
+            runner.run_suffix = f"_{runner.simulator}"
+        if args.max_errors is not None:
+            runner.kill_rule_overrides["max_uvm_errors"] = args.max_errors
+        if args.idle_timeout is not None:
+            runner.kill_rule_overrides["idle_seconds"] = args.idle_timeout
+        runner.wave_rerun = args.wave_rerun
+        for key, value in (("window_ns", args.waves_window), ("scope", args.waves_scope),
+                           ("depth", args.waves_depth), ("format", args.waves_format)):
+            if value is not None:
+                runner.wave_rerun_overrides[key] = value
+    runner = runners[0]
     
     if args.list_tests:
         return 0 if runner.list_available_tests() else 1
     
+    if regression:
+        if not runner.load_config():
+            return 1
+        if args.run_list:
+            try:
+                seeds = read_run_list(args.run_list)
+            except (OSError, ValueError) as e:
+                print(f"Error: Cannot read run list: {e}")
+                return 1
+            if not seeds:
+                print(f"Error: Run list {args.run_list} has no runs")
+                return 1
+            tests = list(seeds)
+        else:
+            if args.tests == "all":
+                tests = list(runner.config_data["test_configurations"])
+            else:
+                tests = list(dict.fromkeys(args.tests.split(",")))
+            if args.seeds:
+                seeds = args.seeds
+            else:
+                seeds = random.sample(range(1, 2**31), args.num_seeds)
+        scheduler = CV32E40PRegressionScheduler(runners, args.jobs, args.licenses, args.history,
+                                                args.checkpoint)
+        if scheduler.run(tests, seeds) is None:
+            return 1
+        return 0 if scheduler.print_summary() else 1
+    
     success = runner.run_test(args.test)
     
     return 0 if success else 1
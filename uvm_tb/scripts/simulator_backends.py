@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Simulator Backends for the CV32E40P UVM Testbench
+Tool-specific compile and run command lines behind one interface, so the
+same test configurations run on VCS or Verilator
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+class CV32E40PSimulatorBackend:
+    """Builds the compile and run commands of one simulator.
+
+    `options` is the simulator's section of default_config. compile_command()
+    holds everything that decides the image, so it doubles as the build
+    cache signature; output placement is kept apart in build_layout().
+    """
+
+    name = None
+    # Runs take a simulator license and count against --licenses
+    licensed = False
+    # Waveform formats the backend can dump, the first being the default
+    wave_formats = ('vcd',)
+    # Can save a simulation at the post-reset checkpoint and restore it per seed
+    checkpoints = False
+
+    def __init__(self, options: Dict):
+        self.options = options
+
+    def compile_command(self, build: Dict, sources: List[str], incdirs: List[Path]) -> List[str]:
+        raise NotImplementedError
+
+    def build_layout(self, build_dir: Path, name: str, build: Dict) -> Tuple[List[str], Path]:
+        """Arguments placing the build in build_dir, and the image they produce"""
+        raise NotImplementedError
+
+    def finish_build(self, build_dir: Path) -> None:
+        """Drop intermediate build products the image does not need"""
+
+    def run_command(self, image: str, plusargs: List[str], run_name: str, seed, coverage: bool) -> List[str]:
+        raise NotImplementedError
+
+    def checkpoint_command(self, image: str, plusargs: List[str], checkpoint: Path, coverage: bool) -> List[str]:
+        """Run to the +CHECKPOINT stop after reset, save the simulation to `checkpoint` and exit"""
+        raise NotImplementedError
+
+    def restore_command(self, image: str, plusargs: List[str], checkpoint: Path, run_name: str, seed,
+                        coverage: bool) -> List[str]:
+        """Resume a saved checkpoint with new plusargs and seed and run it to the end"""
+        raise NotImplementedError
+
+class VCSBackend(CV32E40PSimulatorBackend):
+    """Synopsys VCS with its bundled UVM 1.2"""
+
+    name = 'vcs'
+    licensed = True
+    wave_formats = ('fsdb', 'vcd')
+    checkpoints = True
+
+    def compile_command(self, build, sources, incdirs):
+        cmd = ["vcs"] + self.options.get("compile_options", []) + ["-ntb_opts", "uvm-1.2"]
+        cmd.extend(f"+incdir+{d}" for d in incdirs)
+        if build['enable_coverage']:
+            cmd.extend(["-cm", "line+cond+fsm+branch+tgl", "-cm_dir", "./coverage"])
+        if build['waves'] == 'fsdb':
+            cmd.extend(["-kdb", "+define+DUMP_WAVES", "+define+WAVES_FSDB"])
+        elif build['waves']:
+            cmd.append("+define+DUMP_WAVES")
+        for param, value in build['dut_config'].items():
+            cmd.append(f"-pvalue+tb_top.dut_if.dut.{param}={value}")
+        return cmd + sources
+
+    def build_layout(self, build_dir, name, build):
+        args = ["-Mdir", str(build_dir / "csrc"), "-o", str(build_dir / "simv")]
+        if build['enable_coverage']:
+            args.extend(["-cm_name", f"{name}_coverage"])
+        return args, build_dir / "simv"
+
+    def finish_build(self, build_dir):
+        # Object files are only needed to relink; the image runs from simv and simv.daidir
+        shutil.rmtree(build_dir / "csrc", ignore_errors=True)
+
+    def run_command(self, image, plusargs, run_name, seed, coverage):
+        cmd = [image] + self.options.get("simulation_options", []) + plusargs
+        if seed is not None:
+            cmd.append(f"+ntb_random_seed={seed}")
+        if coverage:
+            cmd.extend(["-cm", "line+cond+fsm+branch+tgl", "-cm_name", f"{run_name}_coverage",
+                        "-cm_dir", "./coverage"])
+        return cmd
+
+    def checkpoint_command(self, image, plusargs, checkpoint, coverage):
+        # The testbench $stops at the checkpoint, handing control back to the UCLI script.
+        # The restore script is written alongside so concurrent seed runs only read it.
+        (checkpoint.parent / "save.tcl").write_text(f"run\nsave {checkpoint}\nquit\n")
+        (checkpoint.parent / "restore.tcl").write_text(f"restore {checkpoint}\nrun\nquit\n")
+        cmd = self.run_command(image, plusargs + ["+CHECKPOINT"], checkpoint.parent.name, None, coverage)
+        return cmd + ["-ucli", "-do", str(checkpoint.parent / "save.tcl")]
+
+    def restore_command(self, image, plusargs, checkpoint, run_name, seed, coverage):
+        cmd = self.run_command(image, plusargs, run_name, None, coverage)
+        if seed is not None:
+            # +ntb_random_seed only applies at time 0; a restored run takes its new seed from these
+            cmd.extend([f"+ntb_random_reseed={seed}", f"+RESTORE_SEED={seed}"])
+        return cmd + ["-ucli", "-do", str(checkpoint.parent / "restore.tcl")]
+
+class VerilatorBackend(CV32E40PSimulatorBackend):
+    """Verilator 5 with --timing, compiling UVM from UVM_HOME into a multi-threaded model"""
+
+    name = 'verilator'
+    wave_formats = ('fst', 'vcd')
+
+    def uvm_home(self) -> str:
+        return os.environ.get("UVM_HOME") or self.options.get("uvm_home", "")
+
+    def compile_command(self, build, sources, incdirs):
+        if not self.uvm_home():
+            raise ValueError("Verilator compiles UVM from source: set UVM_HOME or default_config.verilator.uvm_home")
+        uvm_src = Path(self.uvm_home()) / "src"
+        cmd = ["verilator", "--binary", "--timing", "--top-module", "tb_top",
+               "--threads", str(self.options.get("threads", 1))]
+        cmd += self.options.get("compile_options", [])
+        cmd += [f"+incdir+{uvm_src}", "+define+UVM_NO_DPI"]
+        cmd.extend(f"+incdir+{d}" for d in incdirs)
+        if build['enable_coverage']:
+            cmd.append("--coverage")
+        if build['waves']:
+            cmd.extend(["--trace-fst" if build['waves'] == "fst" else "--trace", "+define+DUMP_WAVES"])
+        # Verilator only overrides top-level parameters; tb_top forwards them to the DUT
+        for param, value in build['dut_config'].items():
+            cmd.append(f"-G{param}={value}")
+        return cmd + [str(uvm_src / "uvm_pkg.sv")] + sources
+
+    def build_layout(self, build_dir, name, build):
+        # C++ compile parallelism does not change the model, so it stays out of the signature
+        jobs = self.options.get("build_jobs", 0) or os.cpu_count() or 1
+        return ["--Mdir", str(build_dir), "-o", "simv", "-j", str(jobs)], build_dir / "simv"
+
+    def run_command(self, image, plusargs, run_name, seed, coverage):
+        cmd = [image] + self.options.get("simulation_options", []) + plusargs
+        if seed is not None:
+            cmd.append(f"+verilator+seed+{seed}")
+        if coverage:
+            cmd.append(f"+verilator+coverage+file+{run_name}_coverage.dat")
+        return cmd
+
+BACKENDS = {backend.name: backend for backend in (VCSBackend, VerilatorBackend)}
+
+def create_backend(name: str, default_config: Dict) -> CV32E40PSimulatorBackend:
+    """Backend for a simulator name, configured from default_config.
+
+    VCS reads the top-level compile/simulation options; other simulators
+    read the default_config section named after them.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown simulator '{name}' (available: {', '.join(BACKENDS)})")
+    options = default_config if name == 'vcs' else default_config.get(name, {})
+    return BACKENDS[name](options)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compiled Simulator Cache
+Content-addressed store of compiled simulator images, keyed by a hash of
+everything that affects the build, with a disk quota and LRU eviction
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, ContextManager, Dict, Iterator, List, Optional
+
+# Files hashed inside include directories; others (JSON configs, docs) do not affect the build
+SOURCE_SUFFIXES = ('.sv', '.svh', '.v', '.vh')
+
+# Environment variables that select the tool or the sources it reads
+SIGNATURE_ENVIRONMENT = ('VCS_HOME', 'UVM_HOME', 'DESIGN_RTL_DIR')
+
+MANIFEST = 'manifest.json'
+DEFAULT_QUOTA_GB = 20.0
+
+class CV32E40PSimulatorCache:
+    """Compiled images under <directory>/<signature>/, evicted least recently used first"""
+
+    def __init__(self, directory: Path, quota_bytes: int):
+        self.directory = Path(directory)
+        self.quota_bytes = quota_bytes
+        # File digests keyed by (path, size, mtime) so a regression hashes each source once
+        self._digests: Dict[tuple, str] = {}
+        # Shared use locks this process holds, keyed by signature
+        self._in_use: Dict[str, IO] = {}
+
+    def file_digest(self, path: Path) -> str:
+        try:
+            stat = path.stat()
+        except OSError:
+            return 'missing'
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self._digests[key] = digest
+        return digest
+
+    def signature(self, command: List[str], sources: List[str], incdirs: List[Path]) -> str:
+        """Hash of the build command, source and include file contents, and tool environment"""
+        h = hashlib.sha256()
+        for arg in command:
+            h.update(f"arg {arg}\n".encode())
+        for source in sources:
+            h.update(f"src {source} {self.file_digest(Path(source))}\n".encode())
+        for incdir in incdirs:
+            incdir = Path(incdir)
+            files = sorted(p for p in incdir.rglob('*') if p.suffix in SOURCE_SUFFIXES) if incdir.is_dir() else []
+            for path in files:
+                h.update(f"inc {path.relative_to(incdir)} {self.file_digest(path)}\n".encode())
+        for name in SIGNATURE_ENVIRONMENT:
+            h.update(f"env {name}={os.environ.get(name, '')}\n".encode())
+        return h.hexdigest()
+
+    def entry(self, signature: str) -> Path:
+        return self.directory / signature
+
+    def is_built(self, signature: str) -> bool:
+        return (self.entry(signature) / MANIFEST).exists()
+
+    @contextmanager
+    def _flock(self, name: str, operation: int) -> Iterator[bool]:
+        """Hold a flock on a file beside the entries; yields False when a LOCK_NB request fails"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / name, 'w') as lock:
+            try:
+                fcntl.flock(lock, operation)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def locked(self, signature: str, blocking: bool = True) -> ContextManager[bool]:
+        """Hold the signature's lock, serializing builds of the same image across processes and threads.
+
+        Yields False without waiting when blocking is off and someone else holds it.
+        """
+        return self._flock(f"{signature}.lock", fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+
+    def acquire(self, signature: str) -> None:
+        """Mark an entry in use until release() or process exit, so no eviction removes it.
+
+        Call with the signature's lock held, so the entry cannot be evicted in between.
+        """
+        if signature in self._in_use:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = open(self.directory / f"{signature}.use", 'w')
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        if self._in_use.setdefault(signature, lock) is not lock:
+            lock.close()
+
+    def release(self) -> None:
+        """Drop the use locks of every entry this process acquired"""
+        for lock in self._in_use.values():
+            lock.close()
+        self._in_use.clear()
+
+    def prepare(self, signature: str) -> Path:
+        """Empty entry directory for a new build, discarding any partial earlier attempt"""
+        entry = self.entry(signature)
+        shutil.rmtree(entry, ignore_errors=True)
+        entry.mkdir(parents=True)
+        return entry
+
+    def commit(self, signature: str, test_name: str) -> None:
+        """Mark a finished build valid and record its size for the quota"""
+        entry = self.entry(signature)
+        size = sum(p.stat().st_size for p in entry.rglob('*') if p.is_file() and not p.is_symlink())
+        manifest = {
+            'signature': signature,
+            'built_for': test_name,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'size_bytes': size,
+        }
+        with open(entry / MANIFEST, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def discard(self, signature: str) -> None:
+        shutil.rmtree(self.entry(signature), ignore_errors=True)
+
+    def touch(self, signature: str) -> None:
+        """Record a use; the manifest's mtime orders entries for eviction"""
+        os.utime(self.entry(signature) / MANIFEST)
+
+    def entries(self) -> List[Dict]:
+        """Valid entries, least recently used first"""
+        entries = []
+        for manifest_file in self.directory.glob(f"*/{MANIFEST}"):
+            try:
+                with open(manifest_file, 'r') as f:
+                    manifest = json.load(f)
+                manifest['last_used'] = manifest_file.stat().st_mtime
+            except (OSError, json.JSONDecodeError):
+                continue
+            entries.append(manifest)
+        return sorted(entries, key=lambda e: e['last_used'])
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least recently used entries not in use until the cache fits its quota"""
+        entries = self.entries()
+        total = sum(e['size_bytes'] for e in entries)
+        evicted = []
+        for manifest in entries:
+            if total <= self.quota_bytes:
+                break
+            signature = manifest['signature']
+            if signature == keep:
+                continue
+            # Skip entries being built, or used by a regression of this or another process
+            with self.locked(signature, blocking=False) as acquired, \
+                    self._flock(f"{signature}.use", fcntl.LOCK_EX | fcntl.LOCK_NB) as unused:
+                if not (acquired and unused):
+                    continue
+                self.discard(signature)
+            total -= manifest['size_bytes']
+            evicted.append(signature)
+        return evicted
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or trim the compiled simulator cache')
+    parser.add_argument('directory', nargs='?', default=str(Path(__file__).parent.parent / 'work' / 'simv_cache'),
+                       help='Cache directory (default work/simv_cache)')
+    parser.add_argument('--quota-gb', type=float, default=DEFAULT_QUOTA_GB,
+                       help=f'Evict least recently used images beyond this size (default {DEFAULT_QUOTA_GB:g})')
+    parser.add_argument('--evict', action='store_true',
+                       help='Trim the cache to the quota')
+    parser.add_argument('--clear', action='store_true',
+                       help='Remove every cached image')
+
+    args = parser.parse_args()
+
+    cache = CV32E40PSimulatorCache(Path(args.directory), int(args.quota_gb * 2**30))
+    if args.clear:
+        cache.quota_bytes = 0
+    if args.evict or args.clear:
+        evicted = cache.evict()
+        print(f"Evicted {len(evicted)} cached images")
+
+    entries = cache.entries()
+    for manifest in reversed(entries):
+        last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['last_used']))
+        print(f"  {manifest['signature'][:12]}  {manifest['size_bytes'] / 2**20:>9.1f} MB  "
+              f"last used {last_used}  built for {manifest['built_for']}")
+    total = sum(e['size_bytes'] for e in entries)
+    print(f"{len(entries)} cached images, {total / 2**30:.2f} of {args.quota_gb:g} GB")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,16 @@
 // Copyright 2024 ChipAgents
 // Testbench Top Module for CV32E40P UVM Testbench
 
-module tb_top;
+module tb_top #(
+  // DUT configuration, forwarded to cv32e40p_top; overridable at compile time (e.g. Verilator -G)
+  parameter int COREV_PULP       = 0,
+  parameter int COREV_CLUSTER    = 0,
+  parameter int FPU              = 0,
+  parameter int FPU_ADDMUL_LAT   = 0,
+  parameter int FPU_OTHERS_LAT   = 0,
+  parameter int ZFINX            = 0,
+  parameter int NUM_MHPMCOUNTERS = 1
+);
 
   import uvm_pkg::*;
   import cv32e40p_uvm_pkg::*;
@@ -32,7 +41,15 @@ module tb_top;
   );
 
   // DUT instantiation
-  cv32e40p_top dut (
+  cv32e40p_top #(
+    .COREV_PULP      (COREV_PULP),
+    .COREV_CLUSTER   (COREV_CLUSTER),
+    .FPU             (FPU),
+    .FPU_ADDMUL_LAT  (FPU_ADDMUL_LAT),
+    .FPU_OTHERS_LAT  (FPU_OTHERS_LAT),
+    .ZFINX           (ZFINX),
+    .NUM_MHPMCOUNTERS(NUM_MHPMCOUNTERS)
+  ) dut (
     .clk_i(clk),
     .rst_ni(rst_n),
     .fetch_enable_i(dut_if.fetch_enable_i),
@@ -78,12 +95,49 @@ module tb_top;
     $finish;
   end
 
-  // Waveform dumping
+  // Waveform dumping, off unless +WAVES (or the older +DUMP_WAVES) is given:
+  //   +WAVES_FILE=<file>         dump file (default cv32e40p_test.vcd)
+  //   +WAVES_SCOPE=<scope>       tb_top (default), dut_if, dut or core
+  //   +WAVES_DEPTH=<n>           levels below the scope, 0 for all
+  //   +WAVES_START=<ns>          start dumping at this time
+  //   +WAVES_STOP=<ns>           flush the dump and finish at this time
+  // Images compiled with WAVES_FSDB dump FSDB through the Verdi PLI instead.
+`ifdef WAVES_FSDB
+  `define TB_DUMPFILE  $fsdbDumpfile
+  `define TB_DUMPVARS  $fsdbDumpvars
+  `define TB_DUMPFLUSH $fsdbDumpflush
+`else
+  `define TB_DUMPFILE  $dumpfile
+  `define TB_DUMPVARS  $dumpvars
+  `define TB_DUMPFLUSH $dumpflush
+`endif
+  string  waves_file;
+  string  waves_scope;
+  int     waves_depth;
+  longint waves_start;
+  longint waves_stop;
+
   initial begin
-    if ($test$plusargs("DUMP_WAVES")) begin
-      $dumpfile("cv32e40p_test.vcd");
-      $dumpvars(0, tb_top);
-      `uvm_info("TB_TOP", "Waveform dumping enabled", UVM_LOW)
+    if ($test$plusargs("WAVES") || $test$plusargs("DUMP_WAVES")) begin
+      if (!$value$plusargs("WAVES_FILE=%s", waves_file)) waves_file = "cv32e40p_test.vcd";
+      if (!$value$plusargs("WAVES_SCOPE=%s", waves_scope)) waves_scope = "tb_top";
+      if (!$value$plusargs("WAVES_DEPTH=%d", waves_depth)) waves_depth = 0;
+      if (!$value$plusargs("WAVES_START=%d", waves_start)) waves_start = 0;
+      #(waves_start * 1ns);
+      `TB_DUMPFILE(waves_file);
+      case (waves_scope)
+        "dut_if": `TB_DUMPVARS(waves_depth, tb_top.dut_if);
+        "dut":    `TB_DUMPVARS(waves_depth, tb_top.dut);
+        "core":   `TB_DUMPVARS(waves_depth, tb_top.dut.core_i);
+        default:  `TB_DUMPVARS(waves_depth, tb_top);
+      endcase
+      `uvm_info("TB_TOP", $sformatf("Waveform dumping of %s to %s enabled", waves_scope, waves_file), UVM_LOW)
+      if ($value$plusargs("WAVES_STOP=%d", waves_stop)) begin
+        #((waves_stop - waves_start) * 1ns);
+        `TB_DUMPFLUSH;
+        `uvm_info("TB_TOP", "Waveform window complete", UVM_LOW)
+        $finish;
+      end
     end
   end
 
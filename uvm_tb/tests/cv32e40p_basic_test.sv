@@ -48,6 +48,7 @@ class cv32e40p_basic_test extends uvm_test;
     cv32e40p_basic_sequence basic_seq;
     
     phase.raise_objection(this, "Starting basic test");
+    env.wait_for_checkpoint();
     
     `uvm_info("TEST", "Starting basic test run phase", UVM_LOW)
     
@@ -107,6 +108,7 @@ class cv32e40p_edge_test extends uvm_test;
     cv32e40p_edge_case_sequence edge_seq;
     
     phase.raise_objection(this, "Starting edge case test");
+    env.wait_for_checkpoint();
     
     `uvm_info("TEST", "Starting edge case test", UVM_LOW)
     
@@ -19,6 +19,7 @@ class cv32e40p_comprehensive_test extends cv32e40p_basic_test;
     cv32e40p_hazard_injection_sequence hazard_seq;
     
     phase.raise_objection(this);
+    env.wait_for_checkpoint();
     
     `uvm_info("COMP_TEST", "Starting comprehensive CV32E40P verification", UVM_LOW)
     